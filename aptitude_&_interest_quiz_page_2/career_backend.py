@@ -1,42 +1,88 @@
 #!/usr/bin/env python3
 """
 Career Results Backend Server
-Handles saving and retrieving career assessment results
+Handles saving and retrieving career assessment results.
+Results are stored per user in the career_test_results table of the main
+app's ai_chat database; every submission is kept as history. The user comes
+from the main app's signed session cookie, never from the request; anonymous
+visitors are not stored, the quiz page keeps their results in localStorage.
 """
 
-from flask import Flask, request, jsonify, send_from_directory
+from flask import Flask, request, jsonify, send_from_directory, session
 from flask_cors import CORS
-import json
 import os
+import sys
 from datetime import datetime
 
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+
+# ai_chat.py lives in login/ (this file's parent directory when run from login/templates)
+LOGIN_DIR = next(
+    d for d in (os.path.join(BASE_DIR, '..', 'login'), os.path.join(BASE_DIR, '..'))
+    if os.path.isfile(os.path.join(d, 'ai_chat.py'))
+)
+sys.path.append(LOGIN_DIR)
+import ai_chat
+import quiz_scoring
+
+ai_chat.DB_PATH = os.environ.get('EDUPATH_CHAT_DB', os.path.abspath(os.path.join(LOGIN_DIR, 'ai_chat.db')))
+ai_chat.init_db()
+
 app = Flask(__name__)
-CORS(app)  # Enable CORS for all routes
+# Same key as the main app: its session cookie is sent to this port too, and this lets us verify it
+app.secret_key = os.environ.get('EDUPATH_SECRET_KEY', 'dev-secret')
+# Credentialed requests (carrying that cookie) are only allowed from the EduPath pages
+APP_ORIGINS = os.environ.get(
+    'EDUPATH_APP_ORIGINS',
+    'http://localhost:5000,http://127.0.0.1:5000,http://localhost:5002,http://127.0.0.1:5002'
+).split(',')
+CORS(app, origins=[origin.strip() for origin in APP_ORIGINS], supports_credentials=True)
+
+def get_session_user_id():
+    """Logged-in user from the main app's session; None for anonymous visitors."""
+    return session.get('user_id')
 
-# File to store career results
-RESULTS_FILE = 'career_results.json'
+def login_required_response():
+    return jsonify({'success': False, 'error': 'Please log in'}), 401
 
 @app.route('/save_career_results', methods=['POST'])
 def save_career_results():
-    """Save career assessment results to JSON file"""
+    """Save career assessment results for the user"""
+    # Anonymous visitors keep their results in the browser's localStorage only
+    user_id = get_session_user_id()
+    if user_id is None:
+        return login_required_response()
     try:
         data = request.get_json()
         
         if not data:
             return jsonify({'error': 'No data provided'}), 400
         
-        # Add timestamp if not present
-        if 'timestamp' not in data:
-            data['timestamp'] = datetime.now().isoformat()
+        # Stamped here, not by the browser: the date decides which result is the latest
+        data['timestamp'] = datetime.now().isoformat()
         
-        # Save to JSON file
-        with open(RESULTS_FILE, 'w', encoding='utf-8') as f:
-            json.dump(data, f, indent=2, ensure_ascii=False)
+        # Score on the server from the raw answers; browser-computed scores are not trusted
+        scored = quiz_scoring.score_quiz_results(data)
+        if scored is None:
+            return jsonify({'error': 'Quiz responses are required'}), 400
+        data.update(scored)
+        
+        result_id = ai_chat.save_career_test_result(
+            user_id,
+            domain_scores=data.get('domain_scores'),
+            top_careers=data.get('top_careers'),
+            career_recommendations=data.get('career_recommendations'),
+            assessment_date=data['timestamp'],
+            total_score=data.get('total_score'),
+            responses=data.get('responses'),
+        )
         
         return jsonify({
             'success': True, 
             'message': 'Career results saved successfully',
-            'timestamp': data['timestamp']
+            'timestamp': data['timestamp'],
+            'id': result_id,
+            'top_careers': data.get('top_careers')
         })
     
     except Exception as e:
@@ -44,18 +90,19 @@ def save_career_results():
 
 @app.route('/get_career_results', methods=['GET'])
 def get_career_results():
-    """Retrieve saved career assessment results"""
+    """Retrieve the user's latest career assessment results"""
+    user_id = get_session_user_id()
+    if user_id is None:
+        return login_required_response()
     try:
-        if not os.path.exists(RESULTS_FILE):
+        data = ai_chat.get_latest_career_test_result(user_id)
+        if data is None:
             return jsonify({
                 'success': False,
                 'message': 'No career results found. Please take the assessment first.',
                 'data': None
             })
         
-        with open(RESULTS_FILE, 'r', encoding='utf-8') as f:
-            data = json.load(f)
-        
         return jsonify({
             'success': True,
             'message': 'Career results retrieved successfully',
@@ -65,12 +112,32 @@ def get_career_results():
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
+@app.route('/get_career_history', methods=['GET'])
+def get_career_history():
+    """Retrieve the user's past career assessment results, newest first"""
+    user_id = get_session_user_id()
+    if user_id is None:
+        return login_required_response()
+    try:
+        limit = min(int(request.args.get('limit', 20)), 100)
+        history = ai_chat.get_career_test_history(user_id, limit=limit)
+        return jsonify({
+            'success': True,
+            'count': len(history),
+            'data': history
+        })
+    
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
 @app.route('/clear_career_results', methods=['DELETE'])
 def clear_career_results():
-    """Clear saved career assessment results"""
+    """Clear the user's saved career assessment results"""
+    user_id = get_session_user_id()
+    if user_id is None:
+        return login_required_response()
     try:
-        if os.path.exists(RESULTS_FILE):
-            os.remove(RESULTS_FILE)
+        if ai_chat.clear_career_test_results(user_id):
             return jsonify({
                 'success': True,
                 'message': 'Career results cleared successfully'
@@ -93,6 +160,11 @@ def health_check():
         'timestamp': datetime.now().isoformat()
     })
 
+@app.route('/healthz')
+def healthz():
+    """Cheap readiness probe for the launcher"""
+    return jsonify({'status': 'ok'})
+
 @app.route('/')
 def index():
     """Root endpoint"""
@@ -102,7 +174,9 @@ def index():
         'endpoints': {
             'save_results': '/save_career_results (POST)',
             'get_results': '/get_career_results (GET)',
-            'health': '/health (GET)'
+            'history': '/get_career_history (GET)',
+            'health': '/health (GET)',
+            'healthz': '/healthz (GET)'
         }
     })
 
@@ -110,7 +184,7 @@ if __name__ == '__main__':
     print("🚀 Starting Career Results Backend Server...")
     port = int(os.environ.get("PORT", 5003))
     print(f"📍 Server will run at: http://localhost:{port}")
-    print("📁 Results will be saved to:", os.path.abspath(RESULTS_FILE))
+    print("📁 Results will be saved to:", ai_chat.DB_PATH)
     print("💡 Press Ctrl+C to stop the server")
     
     launched = os.environ.get("EDUPATH_LAUNCHER") == "1"
@@ -1,10 +1,19 @@
 import ai_chat
+import confidence_scorer
+import response_cache
+import prompt_builder
+import quiz_scoring
 import re
+import json
 import requests
-from collections import Counter
+import http_client
+from gemini_scheduler import GeminiScheduler
+from collections import Counter, OrderedDict
 import time
-import random
 import os
+import datetime
+import threading
+from concurrent.futures import ThreadPoolExecutor
 
 # Init DB
 ai_chat.init_db()
@@ -20,29 +29,50 @@ GOOGLE_MAPS_API_KEY = os.environ.get("GOOGLE_MAPS_API_KEY", "")
 GEOCODE_URL = "https://maps.googleapis.com/maps/api/geocode/json"
 PLACES_URL = "https://maps.googleapis.com/maps/api/place/nearbysearch/json"
 
-MAX_CONTEXT_CHARS = 800
+# Places lookups are keyed on rounded coordinates + keyword; saved profiles rarely move
+PLACES_CACHE_TTL = float(os.environ.get("EDUPATH_PLACES_CACHE_TTL", 7 * 24 * 3600))
+PLACES_CACHE_SIZE = 1024
+_places_cache = OrderedDict()  # (lat, lng, keyword, radius) -> (fetched_at, colleges)
+_places_lock = threading.Lock()  # get_nearby_colleges runs on the LLM thread pool
+# app.py sets a CollegeCache (places_cache.json) here so results persist across restarts
+college_store = None
+
+# Process-wide Gemini quota: token bucket and shared 429/503 backoff per key, fair across users
+gemini_scheduler = GeminiScheduler(
+    rate_per_minute=float(os.environ.get("EDUPATH_GEMINI_RPM", 60)),
+    burst=int(os.environ.get("EDUPATH_GEMINI_BURST", 10)),
+    balance=os.environ.get("EDUPATH_GEMINI_BALANCE") == "1",
+)
+for _key in {API_KEY, API_KEY2} - {""}:
+    gemini_scheduler.register_key(_key)
+
+# Shared pool for running Gemini calls of one chat turn concurrently
+_llm_executor = ThreadPoolExecutor(max_workers=int(os.environ.get("EDUPATH_LLM_WORKERS", 16)),
+                                   thread_name_prefix="llm")
 
 # Retry configuration for API calls
 MAX_RETRIES = 3
 BASE_DELAY = 1  # Base delay in seconds
 MAX_DELAY = 10  # Maximum delay in seconds
 
-def make_api_request_with_retry(url, data, headers, max_retries=MAX_RETRIES):
+def make_api_request_with_retry(url, data, headers, max_retries=MAX_RETRIES, stream=False, user_id=None):
     """
-    Make API request with exponential backoff retry for 503 errors
+    Make API request through the Gemini scheduler, retrying 429/503 errors.
+    The backoff is shared: the scheduler holds every request for an overloaded
+    key, so retries wait in the same fair queue instead of sleeping here.
     """
     for attempt in range(max_retries):
         try:
-            response = requests.post(url, headers=headers, json=data, timeout=30)
+            request_url = gemini_scheduler.acquire(url, user_id)
+            response = http_client.post(request_url, headers=headers, json=data, timeout=30, stream=stream)
+            gemini_scheduler.report(request_url, response.status_code, response.headers.get("Retry-After"))
             
             if response.status_code == 200:
                 return response
-            elif response.status_code == 503:
-                if attempt < max_retries - 1:  # Don't sleep on last attempt
-                    # Exponential backoff with jitter
-                    delay = min(BASE_DELAY * (2 ** attempt) + random.uniform(0, 1), MAX_DELAY)
-                    print(f"API overloaded (503), retrying in {delay:.1f}s... (attempt {attempt + 1}/{max_retries})")
-                    time.sleep(delay)
+            elif response.status_code in (429, 503):
+                if attempt < max_retries - 1:  # Don't retry after the last attempt
+                    print(f"API overloaded ({response.status_code}), retrying... (attempt {attempt + 1}/{max_retries})")
+                    response.close()
                     continue
                 else:
                     print("API still overloaded after all retries. Please try again later.")
@@ -67,13 +97,53 @@ def make_api_request_with_retry(url, data, headers, max_retries=MAX_RETRIES):
     return response
 
 
+def _gemini_payload(prompt_text):
+    return {
+        "contents": [
+            {
+                "parts": [
+                    {"text": prompt_text}
+                ]
+            }
+        ]
+    }
+
+
+def stream_gemini(url, data, user_id=None):
+    """
+    Yield reply text chunks from Gemini's streamGenerateContent (SSE) endpoint.
+    Yields nothing if the request is rejected; retries 503s like make_api_request_with_retry.
+    """
+    stream_url = url.replace(":generateContent", ":streamGenerateContent", 1)
+    stream_url += ("&" if "?" in stream_url else "?") + "alt=sse"
+    response = make_api_request_with_retry(stream_url, data, {"Content-Type": "application/json"}, stream=True,
+                                           user_id=user_id)
+    if response is None:
+        return
+    with response:
+        if response.status_code != 200:
+            print(f"Streaming API Error: {response.status_code} {response.text}")
+            return
+        for line in response.iter_lines(decode_unicode=True):
+            if not line or not line.startswith("data:"):
+                continue
+            try:
+                event = json.loads(line[len("data:"):])
+                parts = event["candidates"][0]["content"]["parts"]
+            except (ValueError, KeyError, IndexError):
+                continue
+            text = "".join(part.get("text", "") for part in parts)
+            if text:
+                yield text
+
+
 # ---------- Location Utilities ----------
 def geocode_city(city_name):
     """Convert a city name into latitude & longitude."""
     if not GOOGLE_MAPS_API_KEY:
         return None, None
     params = {"address": city_name, "key": GOOGLE_MAPS_API_KEY}
-    response = requests.get(GEOCODE_URL, params=params)
+    response = http_client.get(GEOCODE_URL, params=params)
     if response.status_code == 200:
         data = response.json()
         if data["results"]:
@@ -87,30 +157,53 @@ def get_nearby_colleges(lat, lng, keyword="college", radius=20000):
     """Fetch nearby colleges from Google Places API."""
     if not GOOGLE_MAPS_API_KEY:
         return []
-    params = {
-        "location": f"{lat},{lng}",
-        "radius": radius,
-        "keyword": keyword,
-        "key": GOOGLE_MAPS_API_KEY
-    }
-    response = requests.get(PLACES_URL, params=params)
-    if response.status_code == 200:
-        data = response.json()
-        print("DEBUG Google Places API response:", data)  # debug
+    cache_key = (round(lat, 3), round(lng, 3), keyword.lower(), radius)
+    with _places_lock:
+        cached = _places_cache.get(cache_key)
+        if cached and time.time() - cached[0] < PLACES_CACHE_TTL:
+            _places_cache.move_to_end(cache_key)
+            return cached[1]
+
+    store_stream = f"places:{keyword.lower()}"
+    colleges = None
+    if college_store:
+        colleges = college_store.get_cached_colleges(
+            lat, lng, radius, store_stream, max_age=datetime.timedelta(seconds=PLACES_CACHE_TTL)
+        )
+    if colleges is None:
+        params = {
+            "location": f"{lat},{lng}",
+            "radius": radius,
+            "keyword": keyword,
+            "key": GOOGLE_MAPS_API_KEY
+        }
+        response = http_client.get(PLACES_URL, params=params, timeout=10)
+        if response.status_code != 200:
+            return []
         colleges = []
-        for place in data.get("results", []):
+        for place in response.json().get("results", []):
+            location = place.get("geometry", {}).get("location", {})
             colleges.append({
                 "name": place.get("name"),
                 "address": place.get("vicinity"),
-                "rating": place.get("rating", "N/A")
+                "rating": place.get("rating", "N/A"),
+                # Coordinates let the shared store serve nearby lookups too
+                "lat": location.get("lat", lat),
+                "lon": location.get("lng", lng),
             })
-        return colleges
-    return []
+        if college_store:
+            college_store.cache_colleges(lat, lng, radius, store_stream, colleges)
+
+    with _places_lock:
+        _places_cache[cache_key] = (time.time(), colleges)
+        if len(_places_cache) > PLACES_CACHE_SIZE:
+            _places_cache.popitem(last=False)
+    return colleges
 
 
 # ---------- Confidence Scoring ----------
-def get_confidence_from_ai(user_input, profile_data):
-    data = {
+def _confidence_payload(user_input, profile_data):
+    return {
         "contents": [
             {
                 "parts": [
@@ -129,7 +222,8 @@ Return only a number between 0 and 100:
         ]
     }
 
-    response = make_api_request_with_retry(API_URL, data, {"Content-Type": "application/json"})
+
+def _parse_confidence(response):
     if response.status_code == 200:
         result = response.json()
         score_text = result["candidates"][0]["content"]["parts"][0]["text"]
@@ -140,6 +234,12 @@ Return only a number between 0 and 100:
     return 0
 
 
+def get_confidence_from_ai(user_input, profile_data):
+    data = _confidence_payload(user_input, profile_data)
+    response = make_api_request_with_retry(API_URL, data, {"Content-Type": "application/json"})
+    return _parse_confidence(response)
+
+
 # ---------- Helpers ----------
 def clean_and_shorten(text, confidence_level=0):
     """Clean reply text (remove markdown artifacts like **) and preserve proper spacing."""
@@ -167,6 +267,73 @@ def clean_and_shorten(text, confidence_level=0):
     
     return result.strip()
 
+class StreamCleaner:
+    """
+    Incremental version of clean_and_shorten for streamed replies.
+    Only whole lines, or a long line up to its last space, are cleaned and emitted,
+    so markdown markers are never split; blank-line runs collapse to one paragraph break.
+    Whitespace at the end of an emitted piece is held back until the next one, so runs
+    that straddle a flush still collapse (and trailing spaces are still stripped).
+    """
+
+    PARTIAL_FLUSH_CHARS = 80
+
+    def __init__(self):
+        self._line = ""
+        self._at_line_start = True
+        self._pending_newlines = 0
+        self._started = False
+        self._held = ""
+
+    @staticmethod
+    def _clean_fragment(text):
+        cleaned = re.sub(r"\*\*", "", text)
+        cleaned = re.sub(r'\.([A-Z])', r'. \1', cleaned)
+        cleaned = re.sub(r':([A-Za-z])', r': \1', cleaned)
+        return re.sub(r'[ \t]+', ' ', cleaned)
+
+    def _emit(self, fragment, line_done):
+        fragment = self._held + fragment
+        if self._at_line_start:
+            fragment = fragment.lstrip()
+        body = fragment.rstrip()
+        self._held = "" if line_done else fragment[len(body):]
+        fragment = re.sub(r'[ \t]+', ' ', body)
+        out = ""
+        if fragment:
+            if self._started and self._at_line_start:
+                out = "\n" * self._pending_newlines
+            out += fragment
+            self._started = True
+            self._at_line_start = False
+        if line_done:
+            if not self._at_line_start:
+                self._pending_newlines = 1
+            elif self._started:
+                self._pending_newlines = 2  # blank line -> paragraph break
+            self._at_line_start = True
+        return out
+
+    def feed(self, chunk):
+        """Add raw text; returns the cleaned text that is now safe to send."""
+        self._line += chunk
+        out = []
+        while "\n" in self._line:
+            line, self._line = self._line.split("\n", 1)
+            out.append(self._emit(self._clean_fragment(line), line_done=True))
+        if len(self._line) > self.PARTIAL_FLUSH_CHARS:
+            cut = self._line.rfind(" ")
+            if cut > 0:
+                partial, self._line = self._line[:cut], self._line[cut:]
+                out.append(self._emit(self._clean_fragment(partial), line_done=False))
+        return "".join(out)
+
+    def finish(self):
+        """Flush whatever is left at the end of the stream."""
+        line, self._line = self._line, ""
+        return self._emit(self._clean_fragment(line), line_done=True)
+
+
 def save_career_recommendations_from_response(response_text, user_id, confidence_score):
     """Parse AI response and save career recommendations when confidence >= 90%."""
     try:
@@ -262,17 +429,14 @@ def Career_Guidance_Chat(user_input, user_id=None, session_context=None):
 
 
 # ---------- Toggle Button Chatbot Function ----------
-def Toggle_Button_Chat(user_input, user_id=None, session_context=None):
-    """
-    New specialized chatbot function for toggle button interface.
-    Provides comprehensive educational guidance with a focus on interactive assistance.
-    Uses API_KEY (first API key) to differentiate from Career_Guidance_Chat.
-    """
-    
+TOGGLE_UNAVAILABLE_MESSAGE = "I apologize, but I'm experiencing technical difficulties. Please try again in a moment, and I'll be happy to provide you with personalized career guidance."
+TOGGLE_ERROR_MESSAGE = "I'm currently unable to access my counseling resources. Please try again shortly for personalized career guidance."
+
+def build_toggle_prompt(user_input, user_id=None):
+    """Build the EduPath Assistant prompt; returns (prompt_text, profile_data, recent_context)."""
     # Get user profile and recent conversation context
     profile_data = ai_chat.get_profile_data(user_id=user_id)
-    recent_messages = ai_chat.get_recent_messages(limit=3, user_id=user_id)
-    recent_context = "\n".join([f"User: {u}\nAssistant: {a}" for u, a in recent_messages])
+    recent_context = prompt_builder.conversation_context(user_id, ai_label="Assistant")
     
     # Build comprehensive educational assistance context
     toggle_chat_context = f"""
@@ -288,12 +452,7 @@ def Toggle_Button_Chat(user_input, user_id=None, session_context=None):
     - Educational resource recommendations
     
     Student Profile:
-    - Name: {profile_data.get('name', 'Student')}
-    - Class: {profile_data.get('class', 'Not specified')}
-    - Stream: {profile_data.get('stream', 'Not specified')}
-    - Interests: {profile_data.get('interests', 'Not specified')}
-    - Career Goals: {profile_data.get('career_goal', 'Not specified')}
-    - Location: {profile_data.get('location', 'Not specified')}
+    {prompt_builder.format_profile(profile_data, "toggle") or "- Not specified yet"}
     
     Recent Conversation Context:
     {recent_context}
@@ -307,25 +466,48 @@ def Toggle_Button_Chat(user_input, user_id=None, session_context=None):
     - Provide step-by-step guidance when needed
     - Be encouraging and supportive in career discussions
     
-    Current Student Query: "{user_input}"
+    Current Student Query: "{prompt_builder.user_message(user_input)}"
     
     Provide focused career guidance addressing their question.
     """
     
+    return toggle_chat_context, profile_data, recent_context
+
+
+def _record_toggle_reply(user_input, user_id, profile_data, formatted_response):
+    # Save the counseling session to chat history with special prefix
+    ai_chat.save_chat(f"[COUNSELING] {user_input}", f"[Dr. Spark] {formatted_response}", user_id=user_id)
+    
+    # Update profile confidence if counseling provides new insights
+    current_confidence = int(profile_data.get("confidence", 0))
+    if current_confidence < 95:  # Only boost if not already very high
+        new_confidence = min(current_confidence + 5, 100)  # Small boost for counseling session
+        ai_chat.save_profile_data("confidence", str(new_confidence), user_id=user_id)
+    
+    print(f"[Career Counseling Session - Confidence: {profile_data.get('confidence', 0)}%]")
+    print("Dr. Spark (Career Counselor):", formatted_response)
+
+
+def Toggle_Button_Chat(user_input, user_id=None, session_context=None):
+    """
+    New specialized chatbot function for toggle button interface.
+    Provides comprehensive educational guidance with a focus on interactive assistance.
+    Uses API_KEY (first API key) to differentiate from Career_Guidance_Chat.
+    """
+    
+    toggle_chat_context, profile_data, recent_context = build_toggle_prompt(user_input, user_id=user_id)
+    
+    cached = response_cache.lookup(user_input, profile_data, "toggle", recent_context)
+    if cached is not None:
+        _record_toggle_reply(user_input, user_id, profile_data, cached)
+        return cached
+    
     # Prepare Gemini API request using API_KEY2
-    data = {
-        "contents": [
-            {
-                "parts": [
-                    {"text": counseling_context}
-                ]
-            }
-        ]
-    }
+    data = _gemini_payload(toggle_chat_context)
     
     try:
         # Make request to Gemini API using API_KEY2
-        response = make_api_request_with_retry(API_URL2, data, {"Content-Type": "application/json"})
+        response = make_api_request_with_retry(API_URL2, data, {"Content-Type": "application/json"}, user_id=user_id)
         
         if response.status_code == 200:
             result = response.json()
@@ -333,28 +515,51 @@ def Toggle_Button_Chat(user_input, user_id=None, session_context=None):
             
             # Clean and format the response
             formatted_response = clean_and_shorten(counseling_response)
-            
-            # Save the counseling session to chat history with special prefix
-            ai_chat.save_chat(f"[COUNSELING] {user_input}", f"[Dr. Spark] {formatted_response}", user_id=user_id)
-            
-            # Update profile confidence if counseling provides new insights
-            current_confidence = int(profile_data.get("confidence", 0))
-            if current_confidence < 95:  # Only boost if not already very high
-                new_confidence = min(current_confidence + 5, 100)  # Small boost for counseling session
-                ai_chat.save_profile_data("confidence", str(new_confidence), user_id=user_id)
-            
-            print(f"[Career Counseling Session - Confidence: {profile_data.get('confidence', 0)}%]")
-            print("Dr. Spark (Career Counselor):", formatted_response)
+            response_cache.store(user_input, formatted_response, profile_data, "toggle", recent_context)
+            _record_toggle_reply(user_input, user_id, profile_data, formatted_response)
             return formatted_response
             
         else:
             error_msg = f"Counseling API Error: {response.status_code} {response.text}"
             print(error_msg)
-            return "I apologize, but I'm experiencing technical difficulties. Please try again in a moment, and I'll be happy to provide you with personalized career guidance."
+            return TOGGLE_UNAVAILABLE_MESSAGE
             
     except Exception as e:
         print(f"Error in Career Guidance Chat: {e}")
-        return "I'm currently unable to access my counseling resources. Please try again shortly for personalized career guidance."
+        return TOGGLE_ERROR_MESSAGE
+
+
+def Toggle_Button_Chat_Stream(user_input, user_id=None, session_context=None):
+    """Streaming variant of Toggle_Button_Chat: yields cleaned text as it arrives."""
+    toggle_chat_context, profile_data, recent_context = build_toggle_prompt(user_input, user_id=user_id)
+    
+    cached = response_cache.lookup(user_input, profile_data, "toggle", recent_context)
+    if cached is not None:
+        _record_toggle_reply(user_input, user_id, profile_data, cached)
+        yield cached
+        return
+    
+    cleaner = StreamCleaner()
+    parts = []
+    try:
+        for chunk in stream_gemini(API_URL2, _gemini_payload(toggle_chat_context), user_id=user_id):
+            text = cleaner.feed(chunk)
+            if text:
+                parts.append(text)
+                yield text
+    except requests.exceptions.RequestException as e:
+        print(f"Error in Career Guidance Chat: {e}")
+    text = cleaner.finish()
+    if text:
+        parts.append(text)
+        yield text
+    
+    if parts:
+        formatted_response = "".join(parts)
+        response_cache.store(user_input, formatted_response, profile_data, "toggle", recent_context)
+        _record_toggle_reply(user_input, user_id, profile_data, formatted_response)
+    else:
+        yield TOGGLE_UNAVAILABLE_MESSAGE
 
 
 def Interactive_Career_Counselor(user_id=None):
@@ -404,64 +609,24 @@ def load_career_quiz_data(user_id=None):
 def populate_profile_from_quiz(quiz_results, user_id=None):
     """Populate profile data from career quiz results"""
     try:
-        if not quiz_results or 'top_careers' not in quiz_results:
+        if not quiz_results:
             return False
+        # Scores are recomputed server-side rather than trusted from the browser
+        scored = quiz_scoring.score_quiz_results(quiz_results)
+        if scored is None:
+            return False
+        quiz_results = dict(quiz_results, **scored)
             
         top_careers = quiz_results['top_careers']
-        domain_scores = quiz_results.get('domain_scores', {})
         
         if top_careers:
-            # Get the top career domain and details
-            top_career = top_careers[0]
-            career_domain = top_career['domain']
-            career_score = top_career['score']
-            career_options = top_career.get('careers', [])
-            competitive_exams = top_career.get('competitive_exams', [])
-            higher_studies = top_career.get('higher_studies', [])
-            
-            # Map domain to subjects and interests
-            domain_to_subjects = {
-                'Engineering': 'Mathematics, Physics, Computer Science',
-                'Medical': 'Biology, Chemistry, Physics', 
-                'Business': 'Commerce, Economics, Mathematics',
-                'Arts': 'Literature, Fine Arts, Creative Writing',
-                'Science': 'Physics, Chemistry, Biology, Mathematics',
-                'Education': 'Psychology, Sociology, Subject specialization',
-                'Law': 'Political Science, History, Economics',
-                'Finance': 'Mathematics, Economics, Accounting'
-            }
-            
-            domain_to_class = {
-                'Engineering': '11th/12th PCM',
-                'Medical': '11th/12th PCB', 
-                'Business': '11th/12th Commerce',
-                'Arts': '11th/12th Arts',
-                'Science': '11th/12th Science',
-                'Education': '11th/12th (Any stream)',
-                'Law': '11th/12th (Any stream)',
-                'Finance': '11th/12th Commerce/Science'
-            }
-            
             # Save comprehensive profile data
-            ai_chat.save_profile_data('career_quiz_completed', 'true', user_id=user_id)
-            ai_chat.save_profile_data('top_career_domain', career_domain, user_id=user_id)
-            ai_chat.save_profile_data('career_score', str(career_score), user_id=user_id)
-            ai_chat.save_profile_data('career_goal', f"{career_domain} field - {', '.join(career_options[:3])}", user_id=user_id)
-            ai_chat.save_profile_data('subjects', domain_to_subjects.get(career_domain, 'Not specified'), user_id=user_id)
-            ai_chat.save_profile_data('interests', f"{career_domain}, {', '.join(career_options[:2])}", user_id=user_id)
-            ai_chat.save_profile_data('class', domain_to_class.get(career_domain, 'High School'), user_id=user_id)
-            ai_chat.save_profile_data('competitive_exams', ', '.join(competitive_exams[:3]), user_id=user_id)
-            ai_chat.save_profile_data('higher_studies', ', '.join(higher_studies[:3]), user_id=user_id)
+            for key, value in quiz_scoring.profile_fields(quiz_results).items():
+                ai_chat.save_profile_data(key, value, user_id=user_id)
             
             # Set high confidence since we have comprehensive data
             ai_chat.save_profile_data('confidence', '85', user_id=user_id)
             
-            # Store all career recommendations for reference
-            career_summary = f"Top 3 Career Domains: "
-            for i, career in enumerate(top_careers[:3]):
-                career_summary += f"{i+1}. {career['domain']} (Score: {career['score']}) "
-            ai_chat.save_profile_data('career_recommendations', career_summary, user_id=user_id)
-            
             return True
             
     except Exception as e:
@@ -470,59 +635,13 @@ def populate_profile_from_quiz(quiz_results, user_id=None):
     
     return False
 
-def Talk_Chat(user_input, user_id=None, quiz_results=None):
-    # If quiz results are provided, populate profile first
-    if quiz_results:
-        populate_profile_from_quiz(quiz_results, user_id=user_id)
-    
-    profile_data = ai_chat.get_profile_data(user_id=user_id)
-
-    # --- Detect city (improved) ---
-    city = None
-    # Case 1: "in Pune" / "from Delhi" / "at Mumbai"
-    match = re.search(r"(?:in|from|at)\s+([A-Z][a-zA-Z]+)", user_input, re.IGNORECASE)
-    if match:
-        city = match.group(1)
-    else:
-        # Case 2: user typed only a city name like "pune"
-        tokens = user_input.strip().split()
-        if len(tokens) == 1 and tokens[0].isalpha():
-            city = tokens[0].capitalize()
+def build_talk_prompt(mode, new_conf, profile_data, has_quiz_data, recent_text, user_input):
+    """Build the Gemini prompt for one Talk_Chat turn in "ask" or "advise" mode.
 
-    if city:
-        lat, lng = geocode_city(city)
-        if lat and lng:
-            ai_chat.save_profile_data("city", city, user_id=user_id)
-            ai_chat.save_profile_data("lat", str(lat), user_id=user_id)
-            ai_chat.save_profile_data("lng", str(lng), user_id=user_id)
-
-    # --- Confidence ---
-    # Check if we have career quiz data - if so, start with higher confidence
-    has_quiz_data = profile_data.get('career_quiz_completed') == 'true'
-    
-    if has_quiz_data:
-        # We have comprehensive data from quiz, so add less confidence boost from chat
-        added_conf = get_confidence_from_ai(user_input, profile_data) // 2  # Reduce impact
-        prev_conf = int(profile_data.get("confidence", 85))  # Start higher
-    else:
-        # No quiz data, use original logic
-        added_conf = get_confidence_from_ai(user_input, profile_data)
-        prev_conf = int(profile_data.get("confidence", 0))
-    
-    new_conf = min(prev_conf + added_conf, 100)
-    ai_chat.save_profile_data("confidence", str(new_conf), user_id=user_id)
-
-    # Lower threshold for advice mode if we have quiz data
-    confidence_threshold = 75 if has_quiz_data else 90
-    mode = "ask" if new_conf < confidence_threshold else "advise"
-
-    # --- Context ---
-    recent_messages = ai_chat.get_recent_messages(limit=5, user_id=user_id)
-    recent_text = "\n".join([f"User: {u}\nAI: {a}" for u, a in recent_messages])
-    if len(recent_text) > MAX_CONTEXT_CHARS:
-        recent_text = recent_text[-MAX_CONTEXT_CHARS:]
+    Returns (prompt_text, nearby_colleges); colleges are only looked up in advise mode.
+    """
+    nearby_colleges = []
 
-    # --- System Instruction ---
     if mode == "ask":
         # Check what information we still need
         missing_info = []
@@ -600,29 +719,20 @@ def Talk_Chat(user_input, user_id=None, quiz_results=None):
             for c in nearby_colleges[:5]
         ]) or "No nearby colleges found."
 
-        # Build comprehensive profile summary
-        profile_summary = f"""
-        Student Profile:
-        - Class/Level: {profile_data.get('class', 'Not specified')}
-        - Favorite Subjects: {profile_data.get('subjects', 'Not specified')}
-        - Areas of Interest: {profile_data.get('interests', 'Not specified')}
-        - Career Goal: {profile_data.get('career_goal', 'Not specified')}
-        - Skills & Strengths: {profile_data.get('skills', 'Not specified')}
-        - Location: {city or 'Not specified'}
-        - Additional Info: {profile_data.get('additional_info', 'None')}
-        """
+        # Build comprehensive profile summary (each section within its token budget)
+        profile_summary = "Student Profile:\n" + (
+            prompt_builder.format_profile(profile_data, "advise") or "- Not specified yet"
+        )
         
         # Add career quiz data if available
         if has_quiz_data:
-            profile_summary += f"""
-        
-        Career Assessment Results:
-        - Top Career Domain: {profile_data.get('top_career_domain', 'Not specified')} (Score: {profile_data.get('career_score', 'N/A')})
-        - Career Recommendations: {profile_data.get('career_recommendations', 'Not specified')}
-        - Recommended Competitive Exams: {profile_data.get('competitive_exams', 'Not specified')}
-        - Higher Studies Options: {profile_data.get('higher_studies', 'Not specified')}
-        - Assessment Confidence: {new_conf}% (Enhanced by career quiz data)
-        """
+            assessment = prompt_builder.format_profile(
+                profile_data, "assessment", prompt_builder.BUDGETS["assessment"]
+            )
+            profile_summary += (
+                f"\n\nCareer Assessment Results:\n{assessment}\n"
+                f"- Assessment Confidence: {new_conf}% (Enhanced by career quiz data)"
+            )
         
         if has_quiz_data:
             system_instruction = (
@@ -673,65 +783,284 @@ def Talk_Chat(user_input, user_id=None, quiz_results=None):
                 "Be encouraging, practical, and specific. Use their actual interests and goals to make recommendations feel personal and achievable.\n\n"
                 "CRITICAL: Format your response with proper paragraph spacing. Use double line breaks (\\n\\n) between each major section and after bullet points to ensure readability."
             )
-#  
 
-    # --- Gemini Request ---
-    data = {
-        "contents": [
-            {
-                "parts": [
-                    {"text": (
-                        f"{system_instruction}\n\n"
-                        f"Recent conversation:\n{recent_text}\n\n"
-                        f"User’s profile so far: {profile_data}\n\n"
-                        f"My new message is:\n{user_input}"
-                    )}
-                ]
-            }
-        ]
-    }
+    sections = [system_instruction]
+    if recent_text:
+        sections.append(f"Recent conversation:\n{recent_text}")
+    # Advise mode already carries the profile in its instructions
+    profile_text = prompt_builder.format_profile(profile_data, mode) if mode == "ask" else ""
+    if profile_text:
+        sections.append(f"User’s profile so far:\n{profile_text}")
+    sections.append(f"My new message is:\n{prompt_builder.user_message(user_input)}")
+    prompt_text = "\n\n".join(sections)
+    return prompt_text, nearby_colleges
 
-    response = make_api_request_with_retry(API_URL, data, {"Content-Type": "application/json"})
 
+def _generate_talk_reply(mode, new_conf, profile_data, has_quiz_data, recent_text, user_input, user_id=None):
+    """Build the prompt for ``mode`` and request the reply; returns (reply or None, nearby_colleges)."""
+    prompt_text, nearby_colleges = build_talk_prompt(
+        mode, new_conf, profile_data, has_quiz_data, recent_text, user_input
+    )
+    data = _gemini_payload(prompt_text)
+
+    response = make_api_request_with_retry(API_URL, data, {"Content-Type": "application/json"}, user_id=user_id)
+    return _reply_text(response), nearby_colleges
+
+
+def _reply_text(response):
+    """Text of a successful Gemini reply, or None."""
     if response is not None and response.status_code == 200:
         result = response.json()
-        reply = result["candidates"][0]["content"]["parts"][0]["text"]
-        short_reply = clean_and_shorten(reply, new_conf)
+        return result["candidates"][0]["content"]["parts"][0]["text"]
+    return None
+
+
+def _score_confidence(user_input, profile_data):
+    """Confidence scoring for the pipeline; a failed scoring call counts as 0."""
+    try:
+        return get_confidence_from_ai(user_input, profile_data)
+    except Exception as e:
+        print(f"Confidence scoring failed: {e}")
+        return 0
+
+
+def _calibrate_confidence(user_input, profile_data):
+    """Score remotely and log the pair so the local model can be retrained."""
+    remote_score = _score_confidence(user_input, profile_data)
+    confidence_scorer.log_calibration_sample(user_input, profile_data, remote_score)
+
 
-        ai_chat.save_chat(user_input, short_reply, user_id=user_id)
+def _prepare_talk_turn(user_input, user_id=None, quiz_results=None):
+    """Profile, location, confidence baseline and context shared by Talk_Chat and Talk_Chat_Stream."""
+    # If quiz results are provided, populate profile first
+    if quiz_results:
+        populate_profile_from_quiz(quiz_results, user_id=user_id)
+    
+    profile_data = ai_chat.get_profile_data(user_id=user_id)
 
-        if new_conf >= 90:
-            save_career_recommendations_from_response(short_reply, user_id, new_conf)
+    # --- Detect city (improved) ---
+    city = None
+    # Case 1: "in Pune" / "from Delhi" / "at Mumbai"
+    match = re.search(r"(?:in|from|at)\s+([A-Z][a-zA-Z]+)", user_input, re.IGNORECASE)
+    if match:
+        city = match.group(1)
+    else:
+        # Case 2: user typed only a city name like "pune"
+        tokens = user_input.strip().split()
+        if len(tokens) == 1 and tokens[0].isalpha():
+            city = tokens[0].capitalize()
 
-        print(f"[Confidence: {new_conf}%]")
-        print("AI says:", short_reply)
+    if city:
+        lat, lng = geocode_city(city)
+        if lat and lng:
+            ai_chat.save_profile_data("city", city, user_id=user_id)
+            ai_chat.save_profile_data("lat", str(lat), user_id=user_id)
+            ai_chat.save_profile_data("lng", str(lng), user_id=user_id)
+
+    # --- Confidence ---
+    # Check if we have career quiz data - if so, start with higher confidence
+    has_quiz_data = profile_data.get('career_quiz_completed') == 'true'
+    
+    if has_quiz_data:
+        # We have comprehensive data from quiz, so add less confidence boost from chat
+        score_divisor = 2  # Reduce impact
+        prev_conf = int(profile_data.get("confidence", 85))  # Start higher
+    else:
+        # No quiz data, use original logic
+        score_divisor = 1
+        prev_conf = int(profile_data.get("confidence", 0))
+
+    # --- Context (rolling summary + last exchanges, token-budgeted) ---
+    recent_text = prompt_builder.conversation_context(user_id)
+
+    return {
+        "profile_data": profile_data,
+        "city": city,
+        "has_quiz_data": has_quiz_data,
+        "score_divisor": score_divisor,
+        "prev_conf": prev_conf,
+        # Lower threshold for advice mode if we have quiz data
+        "confidence_threshold": 75 if has_quiz_data else 90,
+        "recent_text": recent_text,
+    }
+
+
+def _local_confidence(user_input, turn):
+    """Added confidence from the local scorer, or None when scoring is remote-only."""
+    # Scored locally by default; the Gemini scorer is kept for "remote" and "calibrate" modes
+    if confidence_scorer.CONFIDENCE_MODE == "remote":
+        return None
+    if confidence_scorer.CONFIDENCE_MODE == "calibrate":
+        _llm_executor.submit(_calibrate_confidence, user_input, turn["profile_data"])
+    return confidence_scorer.score_message(user_input, turn["profile_data"]) // turn["score_divisor"]
+
+
+def _record_talk_reply(user_input, user_id, short_reply, new_conf):
+    ai_chat.save_chat(user_input, short_reply, user_id=user_id)
+
+    if new_conf >= 90:
+        save_career_recommendations_from_response(short_reply, user_id, new_conf)
+
+    print(f"[Confidence: {new_conf}%]")
+    print("AI says:", short_reply)
+
+
+def _talk_fallback(user_input, user_id, turn, nearby_colleges, new_conf):
+    """Local fallback to avoid user-facing errors when API fails."""
+    profile_data = turn["profile_data"]
+    city = turn["city"] or profile_data.get("city", "")
+    fallback = []
+    greeting = "Hi there! "
+    if profile_data.get("class"):
+        greeting = f"Hi! Since you're in {profile_data.get('class')}, "
+    fallback.append(greeting + "here’s some immediate guidance based on what I know about you.")
+    if profile_data.get("interests"):
+        fallback.append(f"- Interests: {profile_data.get('interests')}")
+    if profile_data.get("career_goal"):
+        fallback.append(f"- Career goal: {profile_data.get('career_goal')}")
+    if city:
+        fallback.append(f"- Location preference: {city}")
+    if nearby_colleges:
+        fallback.append("Nearby colleges I found:")
+        for c in nearby_colleges[:3]:
+            fallback.append(f"  • {c['name']} ({c.get('address', 'address N/A')})")
+    fallback.append("")
+    fallback.append("Next steps:")
+    fallback.append("1) Tell me your favorite subjects and any exams you plan to take (JEE, NEET, etc.).")
+    fallback.append("2) I’ll suggest a focused roadmap with skills, exams, and top colleges.")
+    fallback.append("")
+    fallback_text = clean_and_shorten("\n".join(fallback), new_conf)
+    ai_chat.save_chat(user_input, fallback_text, user_id=user_id)
+    print("AI (fallback) says:", fallback_text)
+    return fallback_text
+
+
+def _talk_candidate_modes(turn, added_conf):
+    """Return (conf_estimate, candidate_modes) for a turn; added_conf is None while remote scoring runs.
+
+    The score only decides between "ask" and "advise". When it is already known, or
+    the previous confidence settles the mode, a single reply is requested; otherwise
+    both candidate replies are requested speculatively alongside the remote scoring
+    call and the score picks one, so the user waits for one LLM round trip.
+    """
+    prev_conf = turn["prev_conf"]
+    confidence_threshold = turn["confidence_threshold"]
+    max_added = 100 // turn["score_divisor"]
+    if added_conf is not None:
+        conf_estimate = min(prev_conf + added_conf, 100)
+        return conf_estimate, ["ask" if conf_estimate < confidence_threshold else "advise"]
+    conf_estimate = min(max(prev_conf, confidence_threshold), 100)
+    if prev_conf >= confidence_threshold:
+        return conf_estimate, ["advise"]
+    if prev_conf + max_added < confidence_threshold:
+        return conf_estimate, ["ask"]
+    return conf_estimate, ["ask", "advise"]
+
+
+def Talk_Chat(user_input, user_id=None, quiz_results=None):
+    turn = _prepare_talk_turn(user_input, user_id=user_id, quiz_results=quiz_results)
+    profile_data = turn["profile_data"]
+    prev_conf = turn["prev_conf"]
+    score_divisor = turn["score_divisor"]
+    confidence_threshold = turn["confidence_threshold"]
+
+    # --- Confidence score ---
+    added_conf = _local_confidence(user_input, turn)
+    score_future = None
+    if added_conf is None:
+        score_future = _llm_executor.submit(_score_confidence, user_input, profile_data)
+
+    # --- Reply (concurrent with remote scoring) ---
+    conf_estimate, candidate_modes = _talk_candidate_modes(turn, added_conf)
+    # An opening question similar to one from a student in the same class/subjects/domain skips the LLM call
+    cached_replies = {m: response_cache.lookup(user_input, profile_data, m, turn["recent_text"]) for m in candidate_modes}
+    reply_futures = {
+        m: _llm_executor.submit(
+            _generate_talk_reply, m, conf_estimate if m == "advise" else prev_conf,
+            profile_data, turn["has_quiz_data"], turn["recent_text"], user_input, user_id
+        )
+        for m in candidate_modes
+        if cached_replies[m] is None
+    }
+
+    if score_future is not None:
+        added_conf = score_future.result() // score_divisor
+    new_conf = min(prev_conf + added_conf, 100)
+    ai_chat.save_profile_data("confidence", str(new_conf), user_id=user_id)
+
+    mode = "ask" if new_conf < confidence_threshold else "advise"
+    for other_mode, future in reply_futures.items():
+        if other_mode != mode:
+            future.cancel()
+    if cached_replies.get(mode) is not None:
+        _record_talk_reply(user_input, user_id, cached_replies[mode], new_conf)
+        return cached_replies[mode]
+    reply, nearby_colleges = reply_futures[mode].result()
+
+    if reply is not None:
+        short_reply = clean_and_shorten(reply, new_conf)
+        response_cache.store(user_input, short_reply, profile_data, mode, turn["recent_text"])
+        _record_talk_reply(user_input, user_id, short_reply, new_conf)
         return short_reply
+    return _talk_fallback(user_input, user_id, turn, nearby_colleges, new_conf)
+
+
+def Talk_Chat_Stream(user_input, user_id=None, quiz_results=None):
+    """Streaming variant of Talk_Chat: yields cleaned reply text as Gemini produces it.
+
+    The full reply is saved to chat history once the stream completes.
+    """
+    turn = _prepare_talk_turn(user_input, user_id=user_id, quiz_results=quiz_results)
+    profile_data = turn["profile_data"]
+
+    added_conf = _local_confidence(user_input, turn)
+    score_future = None
+    if added_conf is None:
+        # Only one reply can be streamed, so the local estimate picks the mode and the
+        # remote score runs alongside the stream instead of delaying the first token
+        score_future = _llm_executor.submit(_score_confidence, user_input, profile_data)
+        added_conf = confidence_scorer.score_message(user_input, profile_data) // turn["score_divisor"]
+    new_conf = min(turn["prev_conf"] + added_conf, 100)
+
+    def saved_conf():
+        conf = new_conf
+        if score_future is not None:
+            conf = min(turn["prev_conf"] + score_future.result() // turn["score_divisor"], 100)
+        ai_chat.save_profile_data("confidence", str(conf), user_id=user_id)
+        return conf
+
+    mode = "ask" if new_conf < turn["confidence_threshold"] else "advise"
+    cached = response_cache.lookup(user_input, profile_data, mode, turn["recent_text"])
+    if cached is not None:
+        _record_talk_reply(user_input, user_id, cached, saved_conf())
+        yield cached
+        return
+
+    prompt_text, nearby_colleges = build_talk_prompt(
+        mode, new_conf, profile_data, turn["has_quiz_data"], turn["recent_text"], user_input
+    )
+
+    cleaner = StreamCleaner()
+    parts = []
+    try:
+        for chunk in stream_gemini(API_URL, _gemini_payload(prompt_text), user_id=user_id):
+            text = cleaner.feed(chunk)
+            if text:
+                parts.append(text)
+                yield text
+    except requests.exceptions.RequestException as e:
+        print(f"Streaming request failed: {e}")
+    text = cleaner.finish()
+    if text:
+        parts.append(text)
+        yield text
+
+    if parts:
+        short_reply = "".join(parts)
+        response_cache.store(user_input, short_reply, profile_data, mode, turn["recent_text"])
+        _record_talk_reply(user_input, user_id, short_reply, saved_conf())
     else:
-        # Local fallback to avoid user-facing errors when API fails
-        fallback = []
-        greeting = "Hi there! "
-        if profile_data.get("class"):
-            greeting = f"Hi! Since you're in {profile_data.get('class')}, "
-        fallback.append(greeting + "here’s some immediate guidance based on what I know about you.")
-        if profile_data.get("interests"):
-            fallback.append(f"- Interests: {profile_data.get('interests')}")
-        if profile_data.get("career_goal"):
-            fallback.append(f"- Career goal: {profile_data.get('career_goal')}")
-        if city:
-            fallback.append(f"- Location preference: {city}")
-        if nearby_colleges:
-            fallback.append("Nearby colleges I found:")
-            for c in nearby_colleges[:3]:
-                fallback.append(f"  • {c['name']} ({c.get('address', 'address N/A')})")
-        fallback.append("")
-        fallback.append("Next steps:")
-        fallback.append("1) Tell me your favorite subjects and any exams you plan to take (JEE, NEET, etc.).")
-        fallback.append("2) I’ll suggest a focused roadmap with skills, exams, and top colleges.")
-        fallback.append("")
-        fallback_text = clean_and_shorten("\n".join(fallback), new_conf)
-        ai_chat.save_chat(user_input, fallback_text, user_id=user_id)
-        print("AI (fallback) says:", fallback_text)
-        return fallback_text
+        yield _talk_fallback(user_input, user_id, turn, nearby_colleges, saved_conf())
 
 
 
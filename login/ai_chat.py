@@ -1,9 +1,17 @@
 import sqlite3
 import datetime
 import hashlib
+import re
+import atexit
+import json
+import zlib
+from itertools import groupby
 
 DB_PATH = "ai_chat.db"  
 
+# Optional background writer for chat rows (see enable_write_batching)
+_chat_writer = None
+
 def init_db():
     conn = sqlite3.connect(DB_PATH)
     c = conn.cursor()
@@ -61,6 +69,24 @@ def init_db():
         """
     )
 
+    # Career assessment submissions, one row per attempt
+    c.execute(
+        """
+        CREATE TABLE IF NOT EXISTS career_test_results (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            user_id INTEGER,
+            test_type TEXT DEFAULT 'career_assessment',
+            domain_scores TEXT,
+            top_careers TEXT,
+            career_recommendations TEXT,
+            assessment_date TEXT,
+            total_score INTEGER,
+            completed BOOLEAN DEFAULT 1,
+            FOREIGN KEY (user_id) REFERENCES users (id)
+        )
+        """
+    )
+
     # User preferences and interactions
     c.execute(
         """
@@ -86,11 +112,172 @@ def init_db():
     ensure_column("chat_history", "user_id", "INTEGER")
     ensure_column("user_profile", "user_id", "INTEGER")
 
+    ensure_column("user_preferences", "metadata", "TEXT DEFAULT ''")
+    # Raw quiz answers, so results can be re-scored when the weights change
+    ensure_column("career_test_results", "responses", "TEXT")
+
+    # Cold storage for trimmed chat history: zlib-compressed JSON chunks per user
+    c.execute(
+        """
+        CREATE TABLE IF NOT EXISTS chat_history_archive (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            user_id INTEGER,
+            first_message_id INTEGER,
+            last_message_id INTEGER,
+            first_timestamp TEXT,
+            last_timestamp TEXT,
+            message_count INTEGER,
+            payload BLOB,
+            archived_at TEXT
+        )
+        """
+    )
+
+    # Rolling per-user conversation summary; covers chat_history up to last_message_id
+    c.execute(
+        """
+        CREATE TABLE IF NOT EXISTS chat_summary (
+            user_id INTEGER PRIMARY KEY,
+            summary TEXT,
+            last_message_id INTEGER,
+            updated_at TEXT
+        )
+        """
+    )
+
+    # Per-user notification state; a row exists once a notification was read or dismissed
+    c.execute(
+        """
+        CREATE TABLE IF NOT EXISTS notification_state (
+            user_id INTEGER NOT NULL,
+            notification_id TEXT NOT NULL,
+            read_at TEXT,
+            dismissed INTEGER DEFAULT 0,
+            PRIMARY KEY (user_id, notification_id)
+        )
+        """
+    )
+
+    # Per-user counter of notification_state rows, kept in step by the notification
+    # functions below so unread counts never scan; version changes on every update
+    c.execute(
+        """
+        CREATE TABLE IF NOT EXISTS notification_counters (
+            user_id INTEGER PRIMARY KEY,
+            seen_count INTEGER DEFAULT 0,
+            version INTEGER DEFAULT 0
+        )
+        """
+    )
+
+    # Per-user history is always read newest-first by id
+    c.execute("CREATE INDEX IF NOT EXISTS idx_chat_history_user_id ON chat_history (user_id, id)")
+    c.execute("CREATE INDEX IF NOT EXISTS idx_chat_history_timestamp ON chat_history (timestamp)")
+    c.execute("CREATE INDEX IF NOT EXISTS idx_chat_history_archive_user_id ON chat_history_archive (user_id, first_message_id)")
+    c.execute("CREATE INDEX IF NOT EXISTS idx_user_profile_user_id ON user_profile (user_id, id)")
+    c.execute(
+        "CREATE INDEX IF NOT EXISTS idx_career_recommendations_user_id "
+        "ON career_recommendations (user_id, career_path, timestamp)"
+    )
+    c.execute("CREATE INDEX IF NOT EXISTS idx_user_preferences_user_id ON user_preferences (user_id, timestamp)")
+    # Latest result and history are read newest-first per user
+    c.execute(
+        "CREATE INDEX IF NOT EXISTS idx_career_test_results_user_id "
+        "ON career_test_results (user_id, assessment_date, id)"
+    )
+    # Pruning expired notifications deletes by notification_id across users
+    c.execute("CREATE INDEX IF NOT EXISTS idx_notification_state_notification_id ON notification_state (notification_id)")
+
+    # Full-text index over chat history (external content table kept in sync by triggers)
+    try:
+        c.execute("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'chat_history_fts'")
+        fts_exists = c.fetchone() is not None
+        c.execute(
+            """
+            CREATE VIRTUAL TABLE IF NOT EXISTS chat_history_fts USING fts5(
+                user_message,
+                ai_response,
+                content='chat_history',
+                content_rowid='id'
+            )
+            """
+        )
+        c.execute(
+            """
+            CREATE TRIGGER IF NOT EXISTS chat_history_fts_ai AFTER INSERT ON chat_history BEGIN
+                INSERT INTO chat_history_fts (rowid, user_message, ai_response)
+                VALUES (new.id, new.user_message, new.ai_response);
+            END
+            """
+        )
+        c.execute(
+            """
+            CREATE TRIGGER IF NOT EXISTS chat_history_fts_ad AFTER DELETE ON chat_history BEGIN
+                INSERT INTO chat_history_fts (chat_history_fts, rowid, user_message, ai_response)
+                VALUES ('delete', old.id, old.user_message, old.ai_response);
+            END
+            """
+        )
+        c.execute(
+            """
+            CREATE TRIGGER IF NOT EXISTS chat_history_fts_au AFTER UPDATE ON chat_history BEGIN
+                INSERT INTO chat_history_fts (chat_history_fts, rowid, user_message, ai_response)
+                VALUES ('delete', old.id, old.user_message, old.ai_response);
+                INSERT INTO chat_history_fts (rowid, user_message, ai_response)
+                VALUES (new.id, new.user_message, new.ai_response);
+            END
+            """
+        )
+        if not fts_exists:
+            # Index rows that were written before the FTS table existed
+            c.execute("INSERT INTO chat_history_fts (chat_history_fts) VALUES ('rebuild')")
+    except sqlite3.OperationalError as e:
+        # SQLite built without FTS5; search_messages falls back to LIKE
+        print(f"Chat search index unavailable: {e}")
+
     conn.commit()
     conn.close()
 
+# ---------------- Write batching -----------------
+def enable_write_batching(max_queue=1000, batch_size=64, flush_interval=0.05):
+    """Persist chat exchanges from a background thread in group commits.
+
+    save_chat/add_chat_message then return without touching disk. Reads of a
+    user's history wait for that user's queued writes, so replies are never
+    missing from their own history. Pending rows are flushed at shutdown.
+    """
+    global _chat_writer
+    if _chat_writer is None:
+        from chat_writer import ChatWriter
+        _chat_writer = ChatWriter(DB_PATH, max_queue=max_queue, batch_size=batch_size,
+                                  flush_interval=flush_interval)
+        atexit.register(disable_write_batching)
+    return _chat_writer
+
+def disable_write_batching():
+    """Flush queued chat rows and go back to synchronous writes."""
+    global _chat_writer
+    if _chat_writer is not None:
+        writer, _chat_writer = _chat_writer, None
+        writer.close()
+
+def _wait_for_writes(user_id=None):
+    """Read-your-writes: block until queued rows for this user (or everyone) are committed."""
+    if _chat_writer is None:
+        return
+    if user_id is None:
+        done = _chat_writer.flush()
+    else:
+        done = _chat_writer.wait_for_user(user_id)
+    if not done:
+        # Reading anyway; the newest messages may be missing from this read
+        print(f"Timed out waiting for queued chat writes (user {user_id}); reading without them")
+
 def save_chat(user_msg, ai_msg, user_id=None):
     """Store a user+AI exchange; optionally scoped to a user."""
+    if _chat_writer is not None:
+        _chat_writer.submit(user_id, datetime.datetime.now().isoformat(), user_msg, ai_msg)
+        return
     conn = sqlite3.connect(DB_PATH)
     c = conn.cursor()
     if user_id is None:
@@ -107,6 +294,7 @@ def save_chat(user_msg, ai_msg, user_id=None):
     conn.close()
 
 def get_recent_messages(limit=5, user_id=None):
+    _wait_for_writes(user_id)
     conn = sqlite3.connect(DB_PATH)
     c = conn.cursor()
     if user_id is None:
@@ -123,13 +311,109 @@ def get_recent_messages(limit=5, user_id=None):
     conn.close()
     return rows[::-1] 
 
+def get_chat_page(user_id, before_id=None, limit=20):
+    """Return one page of a user's chat history, walking backwards by id.
+
+    Pass the returned ``next_before`` as ``before_id`` to load the next older page.
+    Messages within a page are oldest-first, like get_recent_messages.
+    """
+    _wait_for_writes(user_id)
+    conn = sqlite3.connect(DB_PATH)
+    c = conn.cursor()
+    if before_id is None:
+        c.execute(
+            """
+            SELECT id, timestamp, user_message, ai_response
+            FROM chat_history
+            WHERE user_id = ?
+            ORDER BY id DESC
+            LIMIT ?
+            """,
+            (user_id, limit + 1),
+        )
+    else:
+        c.execute(
+            """
+            SELECT id, timestamp, user_message, ai_response
+            FROM chat_history
+            WHERE user_id = ? AND id < ?
+            ORDER BY id DESC
+            LIMIT ?
+            """,
+            (user_id, before_id, limit + 1),
+        )
+    rows = c.fetchall()
+    conn.close()
+
+    has_more = len(rows) > limit
+    rows = rows[:limit]
+    return {
+        "messages": [{
+            "id": row[0],
+            "timestamp": row[1],
+            "user_message": row[2],
+            "ai_response": row[3]
+        } for row in reversed(rows)],
+        "next_before": rows[-1][0] if has_more else None,
+        "has_more": has_more
+    }
+
+def _fts_query(keyword):
+    """Turn free text into an FTS5 query: every term must match, last term as a prefix."""
+    terms = re.findall(r"\w+", keyword or "")
+    if not terms:
+        return None
+    quoted = [f'"{t}"' for t in terms]
+    quoted[-1] += "*"
+    return " ".join(quoted)
+
+def _has_chat_fts(c):
+    c.execute("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'chat_history_fts'")
+    return c.fetchone() is not None
+
 def search_messages(keyword, limit=10, user_id=None):
+    """Full-text search over chat history, best matches first.
+
+    Returns (timestamp, user_message, ai_response, snippet) rows ranked by bm25.
+    Multi-word queries match messages containing all of the words.
+    """
+    query = _fts_query(keyword)
+    if query is None:
+        return []
+
+    _wait_for_writes(user_id)
     conn = sqlite3.connect(DB_PATH)
     c = conn.cursor()
+    if not _has_chat_fts(c):
+        rows = _search_messages_like(c, keyword, limit, user_id)
+        conn.close()
+        return rows
+
+    sql = """
+        SELECT h.timestamp, h.user_message, h.ai_response,
+               snippet(chat_history_fts, -1, '[', ']', '...', 12)
+        FROM chat_history_fts
+        JOIN chat_history h ON h.id = chat_history_fts.rowid
+        WHERE chat_history_fts MATCH ?
+        """
+    params = [query]
+    if user_id is not None:
+        sql += " AND h.user_id = ?"
+        params.append(user_id)
+    sql += " ORDER BY bm25(chat_history_fts) LIMIT ?"
+    params.append(limit)
+
+    c.execute(sql, params)
+    rows = c.fetchall()
+    conn.close()
+    return rows
+
+def _search_messages_like(c, keyword, limit, user_id):
+    """Unindexed substring search, used only when FTS5 is not available."""
     if user_id is None:
         c.execute(
             """
-            SELECT timestamp, user_message, ai_response
+            SELECT timestamp, user_message, ai_response, user_message
             FROM chat_history
             WHERE user_message LIKE ? OR ai_response LIKE ?
             ORDER BY id DESC
@@ -140,7 +424,7 @@ def search_messages(keyword, limit=10, user_id=None):
     else:
         c.execute(
             """
-            SELECT timestamp, user_message, ai_response
+            SELECT timestamp, user_message, ai_response, user_message
             FROM chat_history
             WHERE user_id = ? AND (user_message LIKE ? OR ai_response LIKE ?)
             ORDER BY id DESC
@@ -148,20 +432,210 @@ def search_messages(keyword, limit=10, user_id=None):
             """,
             (user_id, f"%{keyword}%", f"%{keyword}%", limit),
         )
-    rows = c.fetchall()
-    conn.close()
-    return rows
+    return c.fetchall()
 
 def clear_messages(user_id=None):
+    _wait_for_writes(user_id)
     conn = sqlite3.connect(DB_PATH)
     c = conn.cursor()
     if user_id is None:
         c.execute("DELETE FROM chat_history")
+        c.execute("DELETE FROM chat_summary")
     else:
         c.execute("DELETE FROM chat_history WHERE user_id = ?", (user_id,))
+        c.execute("DELETE FROM chat_summary WHERE user_id = ?", (user_id,))
+    conn.commit()
+    conn.close()
+
+# ---------------- Rolling summary -----------------
+def _user_key(user_id):
+    # The anonymous user (CLI, standalone quiz) is stored under 0
+    return 0 if user_id is None else user_id
+
+def get_chat_summary(user_id=None):
+    """Return (summary, last_message_id) for a user; ("", 0) if none yet."""
+    conn = sqlite3.connect(DB_PATH)
+    c = conn.cursor()
+    c.execute(
+        "SELECT summary, last_message_id FROM chat_summary WHERE user_id = ?",
+        (_user_key(user_id),),
+    )
+    row = c.fetchone()
+    conn.close()
+    return (row[0] or "", row[1] or 0) if row else ("", 0)
+
+def save_chat_summary(summary, last_message_id, user_id=None):
+    conn = sqlite3.connect(DB_PATH)
+    c = conn.cursor()
+    c.execute(
+        """
+        INSERT OR REPLACE INTO chat_summary (user_id, summary, last_message_id, updated_at)
+        VALUES (?, ?, ?, ?)
+        """,
+        (_user_key(user_id), summary, last_message_id, datetime.datetime.now().isoformat()),
+    )
     conn.commit()
     conn.close()
 
+def get_messages_after(after_id, limit=50, user_id=None):
+    """Return up to the newest ``limit`` (id, user_message, ai_response) rows with id > after_id, oldest first."""
+    _wait_for_writes(user_id)
+    conn = sqlite3.connect(DB_PATH)
+    c = conn.cursor()
+    if user_id is None:
+        c.execute(
+            "SELECT id, user_message, ai_response FROM chat_history WHERE id > ? ORDER BY id DESC LIMIT ?",
+            (after_id, limit),
+        )
+    else:
+        c.execute(
+            """
+            SELECT id, user_message, ai_response FROM chat_history
+            WHERE user_id = ? AND id > ?
+            ORDER BY id DESC LIMIT ?
+            """,
+            (user_id, after_id, limit),
+        )
+    rows = c.fetchall()
+    conn.close()
+    return rows[::-1]
+
+# ---------------- Retention -----------------
+ARCHIVE_CHUNK_SIZE = 500
+
+def _archive_where(c, where, params):
+    """Move matching chat rows into compressed archive chunks; returns rows moved."""
+    c.execute(
+        f"""
+        SELECT id, user_id, timestamp, user_message, ai_response
+        FROM chat_history
+        WHERE {where}
+        ORDER BY user_id, id
+        """,
+        params,
+    )
+    rows = c.fetchall()
+    if not rows:
+        return 0
+
+    archived_at = datetime.datetime.now().isoformat()
+    chunks = []
+    for user_id, user_rows in groupby(rows, key=lambda r: r[1]):
+        user_rows = list(user_rows)
+        for i in range(0, len(user_rows), ARCHIVE_CHUNK_SIZE):
+            chunk = user_rows[i:i + ARCHIVE_CHUNK_SIZE]
+            payload = json.dumps(
+                [{"id": r[0], "timestamp": r[2], "user_message": r[3], "ai_response": r[4]} for r in chunk],
+                ensure_ascii=False,
+            )
+            chunks.append((
+                user_id, chunk[0][0], chunk[-1][0], chunk[0][2], chunk[-1][2], len(chunk),
+                zlib.compress(payload.encode("utf-8"), 9), archived_at
+            ))
+    c.executemany(
+        """
+        INSERT INTO chat_history_archive
+        (user_id, first_message_id, last_message_id, first_timestamp, last_timestamp,
+         message_count, payload, archived_at)
+        VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+        """,
+        chunks,
+    )
+    c.execute(f"DELETE FROM chat_history WHERE {where}", params)
+    return len(rows)
+
+def archive_chat_history(max_messages_per_user=None, max_age_days=None):
+    """Trim chat_history to the newest N rows per user and/or rows younger than max_age_days.
+
+    Trimmed rows are moved to chat_history_archive rather than dropped.
+    Returns the number of rows archived.
+    """
+    _wait_for_writes()
+    conn = sqlite3.connect(DB_PATH, timeout=30)
+    c = conn.cursor()
+    archived = 0
+    try:
+        if max_age_days is not None:
+            cutoff = (datetime.datetime.now() - datetime.timedelta(days=max_age_days)).isoformat()
+            archived += _archive_where(c, "timestamp < ?", (cutoff,))
+
+        if max_messages_per_user is not None:
+            c.execute(
+                "SELECT user_id FROM chat_history GROUP BY user_id HAVING COUNT(*) > ?",
+                (max_messages_per_user,),
+            )
+            for (user_id,) in c.fetchall():
+                # id of the newest row that falls outside the cap
+                c.execute(
+                    "SELECT id FROM chat_history WHERE user_id IS ? ORDER BY id DESC LIMIT 1 OFFSET ?",
+                    (user_id, max_messages_per_user),
+                )
+                row = c.fetchone()
+                if row:
+                    archived += _archive_where(c, "user_id IS ? AND id <= ?", (user_id, row[0]))
+        conn.commit()
+    finally:
+        conn.close()
+    return archived
+
+def get_archived_chat_history(user_id, limit=None):
+    """Return a user's archived messages, oldest first."""
+    conn = sqlite3.connect(DB_PATH)
+    c = conn.cursor()
+    c.execute(
+        "SELECT payload FROM chat_history_archive WHERE user_id IS ? ORDER BY first_message_id ASC",
+        (user_id,),
+    )
+    messages = []
+    for (payload,) in c.fetchall():
+        messages.extend(json.loads(zlib.decompress(payload).decode("utf-8")))
+    conn.close()
+    return messages[-limit:] if limit else messages
+
+def compact_db(full=False):
+    """Reclaim free pages after trimming.
+
+    The first run switches the database to incremental auto-vacuum (this needs one
+    full VACUUM); later runs only release the free list unless ``full`` is set.
+    Returns (pages_before, pages_after).
+    """
+    _wait_for_writes()
+    conn = sqlite3.connect(DB_PATH, timeout=30, isolation_level=None)
+    c = conn.cursor()
+    pages_before = c.execute("PRAGMA page_count").fetchone()[0]
+    try:
+        c.execute("INSERT INTO chat_history_fts (chat_history_fts) VALUES ('optimize')")
+    except sqlite3.OperationalError:
+        pass  # No FTS index to merge
+    auto_vacuum = c.execute("PRAGMA auto_vacuum").fetchone()[0]
+    if full or auto_vacuum != 2:
+        c.execute("PRAGMA auto_vacuum = INCREMENTAL")
+        c.execute("VACUUM")
+    else:
+        c.execute("PRAGMA incremental_vacuum")
+    pages_after = c.execute("PRAGMA page_count").fetchone()[0]
+    conn.close()
+    return pages_before, pages_after
+
+def get_chat_storage_stats():
+    """Row and page counts for the chat tables, for the retention CLI."""
+    conn = sqlite3.connect(DB_PATH)
+    c = conn.cursor()
+    stats = {
+        "messages": c.execute("SELECT COUNT(*) FROM chat_history").fetchone()[0],
+        "users": c.execute("SELECT COUNT(DISTINCT user_id) FROM chat_history").fetchone()[0],
+        "oldest": c.execute("SELECT MIN(timestamp) FROM chat_history").fetchone()[0],
+        "archived_messages": c.execute(
+            "SELECT COALESCE(SUM(message_count), 0) FROM chat_history_archive"
+        ).fetchone()[0],
+        "archive_chunks": c.execute("SELECT COUNT(*) FROM chat_history_archive").fetchone()[0],
+        "page_count": c.execute("PRAGMA page_count").fetchone()[0],
+        "freelist_count": c.execute("PRAGMA freelist_count").fetchone()[0],
+        "page_size": c.execute("PRAGMA page_size").fetchone()[0],
+    }
+    conn.close()
+    return stats
+
 
 def save_profile_data(key, value, user_id=None):
     """Save structured info like class, subjects, career goal; optionally scoped to user."""
@@ -417,23 +891,60 @@ def get_user_preferences(user_id: int, preference_type: str = None):
             "metadata": ""
         } for row in rows]
 
-def get_user_analytics(user_id: int):
-    """Get comprehensive user analytics for better recommendations."""
-    profile_data = get_profile_data(user_id=user_id)
-    all_recommendations = get_career_recommendations(user_id)
-    preferences = get_user_preferences(user_id)
-    
-    # Remove duplicates based on career_path name
-    seen_careers = set()
-    unique_recommendations = []
-    for rec in all_recommendations:
-        if rec['career_path'] not in seen_careers:
-            unique_recommendations.append(rec)
-            seen_careers.add(rec['career_path'])
-    
+def get_user_analytics(user_id: int, recommendation_limit: int = 10):
+    """Get comprehensive user analytics for better recommendations.
+
+    Everything the analytics page needs is read over a single connection;
+    recommendations are deduplicated in SQL, keeping the latest row per career path.
+    """
+    conn = sqlite3.connect(DB_PATH)
+    c = conn.cursor()
+
+    c.execute("SELECT key, value FROM user_profile WHERE user_id = ? ORDER BY id ASC", (user_id,))
+    profile_data = {k: v for k, v in c.fetchall()}
+
+    # SQLite returns the bare columns from the row holding MAX(timestamp)
+    c.execute(
+        """
+        SELECT career_path, recommendation_type, details, confidence_score, MAX(timestamp)
+        FROM career_recommendations
+        WHERE user_id = ?
+        GROUP BY career_path
+        ORDER BY MAX(timestamp) DESC
+        LIMIT ?
+        """,
+        (user_id, recommendation_limit)
+    )
+    recommendations = [{
+        "career_path": row[0],
+        "type": row[1],
+        "details": row[2],
+        "confidence": row[3],
+        "timestamp": row[4]
+    } for row in c.fetchall()]
+
+    c.execute(
+        """
+        SELECT preference_type, preference_value, rating, timestamp, COALESCE(metadata, '')
+        FROM user_preferences
+        WHERE user_id = ?
+        ORDER BY timestamp DESC
+        """,
+        (user_id,)
+    )
+    preferences = [{
+        "type": row[0],
+        "value": row[1],
+        "rating": row[2],
+        "timestamp": row[3],
+        "metadata": row[4]
+    } for row in c.fetchall()]
+
+    conn.close()
+
     return {
         "profile": profile_data,
-        "recommendations": unique_recommendations,
+        "recommendations": recommendations,
         "preferences": preferences,
         "total_interactions": len(preferences),
         "profile_completion": len([k for k, v in profile_data.items() if v and v != "Not specified"])
@@ -441,6 +952,9 @@ def get_user_analytics(user_id: int):
 
 def add_chat_message(user_id: int, user_message: str, ai_response: str):
     """Add a chat message to the database"""
+    if _chat_writer is not None:
+        _chat_writer.submit(user_id, datetime.datetime.now().isoformat(), user_message, ai_response)
+        return
     conn = sqlite3.connect(DB_PATH)
     c = conn.cursor()
     
@@ -460,12 +974,13 @@ def add_chat_message(user_id: int, user_message: str, ai_response: str):
 
 def get_recent_chat_history(user_id: int, limit: int = 10):
     """Get recent chat history for a user"""
+    _wait_for_writes(user_id)
     conn = sqlite3.connect(DB_PATH)
     c = conn.cursor()
     
     # Check if user_id column exists
     try:
-        c.execute("SELECT user_id, timestamp, user_message, ai_response FROM chat_history WHERE user_id = ? ORDER BY timestamp DESC LIMIT ?", (user_id, limit))
+        c.execute("SELECT user_id, timestamp, user_message, ai_response FROM chat_history WHERE user_id = ? ORDER BY id DESC LIMIT ?", (user_id, limit))
         rows = c.fetchall()
     except sqlite3.OperationalError:
         # Fallback to global chat history if user_id column doesn't exist
@@ -538,5 +1053,271 @@ def remove_user_preference(user_id: int, preference_type: str, preference_value:
     except Exception as e:
         print(f"Error removing user preference: {e}")
         return False
-    
-# clear_profile_data()
\ No newline at end of file
+
+# ---------------- Notification state -----------------
+def _update_notification_state(user_id, notification_ids, dismiss=False):
+    """Upsert state rows for ``notification_ids`` and bump the user's counter; returns how many rows were new."""
+    notification_ids = list(dict.fromkeys(notification_ids))
+    if not notification_ids:
+        return 0
+    conn = sqlite3.connect(DB_PATH)
+    c = conn.cursor()
+    c.execute("BEGIN IMMEDIATE")
+    c.execute(
+        "SELECT COUNT(*) FROM notification_state WHERE user_id = ? AND notification_id IN (SELECT value FROM json_each(?))",
+        (user_id, json.dumps(notification_ids)),
+    )
+    added = len(notification_ids) - c.fetchone()[0]
+    now = datetime.datetime.now().isoformat()
+    set_clause = "read_at = COALESCE(read_at, excluded.read_at)" + (", dismissed = 1" if dismiss else "")
+    c.executemany(
+        f"""
+        INSERT INTO notification_state (user_id, notification_id, read_at, dismissed)
+        VALUES (?, ?, ?, ?)
+        ON CONFLICT (user_id, notification_id) DO UPDATE SET {set_clause}
+        """,
+        [(user_id, nid, now, 1 if dismiss else 0) for nid in notification_ids],
+    )
+    c.execute(
+        """
+        INSERT INTO notification_counters (user_id, seen_count, version) VALUES (?, ?, 1)
+        ON CONFLICT (user_id) DO UPDATE SET seen_count = seen_count + excluded.seen_count, version = version + 1
+        """,
+        (user_id, added),
+    )
+    conn.commit()
+    conn.close()
+    return added
+
+def mark_notifications_read(user_id: int, notification_ids):
+    """Mark notifications read for a user in one transaction; returns how many were unread."""
+    return _update_notification_state(user_id, notification_ids)
+
+def dismiss_notifications(user_id: int, notification_ids):
+    """Dismiss (and mark read) notifications for a user in one transaction."""
+    return _update_notification_state(user_id, notification_ids, dismiss=True)
+
+def get_notification_state(user_id: int):
+    """Return (read_ids, dismissed_ids, version) for a user."""
+    conn = sqlite3.connect(DB_PATH)
+    c = conn.cursor()
+    c.execute("SELECT notification_id, dismissed FROM notification_state WHERE user_id = ?", (user_id,))
+    rows = c.fetchall()
+    c.execute("SELECT version FROM notification_counters WHERE user_id = ?", (user_id,))
+    row = c.fetchone()
+    conn.close()
+    return {nid for nid, _ in rows}, {nid for nid, dismissed in rows if dismissed}, row[0] if row else 0
+
+def get_notification_counter(user_id: int):
+    """Return (seen_count, version) for a user from the counter row; no scan of notification_state."""
+    conn = sqlite3.connect(DB_PATH)
+    c = conn.cursor()
+    c.execute("SELECT seen_count, version FROM notification_counters WHERE user_id = ?", (user_id,))
+    row = c.fetchone()
+    conn.close()
+    return (row[0], row[1]) if row else (0, 0)
+
+def prune_notification_state(active_ids):
+    """Drop state for notifications no longer published and decrement the affected counters.
+
+    Called whenever the notification list changes, so every user's seen_count
+    only covers current notifications and unread = total - seen_count.
+    """
+    active = json.dumps(list(active_ids))
+    conn = sqlite3.connect(DB_PATH)
+    c = conn.cursor()
+    c.execute("BEGIN IMMEDIATE")
+    c.execute(
+        """
+        SELECT user_id, COUNT(*) FROM notification_state
+        WHERE notification_id NOT IN (SELECT value FROM json_each(?))
+        GROUP BY user_id
+        """,
+        (active,),
+    )
+    stale = c.fetchall()
+    if stale:
+        c.executemany(
+            "UPDATE notification_counters SET seen_count = MAX(seen_count - ?, 0), version = version + 1 WHERE user_id = ?",
+            [(count, user_id) for user_id, count in stale],
+        )
+        c.execute(
+            "DELETE FROM notification_state WHERE notification_id NOT IN (SELECT value FROM json_each(?))",
+            (active,),
+        )
+    conn.commit()
+    conn.close()
+    return sum(count for _, count in stale)
+
+# ---------------- Career assessment results -----------------
+def _career_test_row(row):
+    result_id, test_type, domain_scores, top_careers, recommendations, assessment_date, total_score = row
+    return {
+        "id": result_id,
+        "test_type": test_type,
+        "timestamp": assessment_date,
+        "domain_scores": json.loads(domain_scores) if domain_scores else {},
+        "top_careers": json.loads(top_careers) if top_careers else [],
+        "career_recommendations": json.loads(recommendations) if recommendations else None,
+        "total_score": total_score,
+    }
+
+_CAREER_TEST_COLUMNS = (
+    "id, test_type, domain_scores, top_careers, career_recommendations, assessment_date, total_score"
+)
+
+def save_career_test_result(user_id, domain_scores=None, top_careers=None, career_recommendations=None,
+                            assessment_date=None, total_score=None, test_type="career_assessment", responses=None):
+    """Store one assessment submission; returns its row id. Earlier attempts are kept as history.
+
+    Results always belong to a logged-in user; anonymous ones would share one row set.
+    """
+    if user_id is None:
+        raise ValueError("career test results need a user_id")
+    domain_scores = domain_scores or {}
+    if total_score is None:
+        total_score = sum(v for v in domain_scores.values() if isinstance(v, (int, float)))
+    conn = sqlite3.connect(DB_PATH, timeout=30)
+    c = conn.cursor()
+    c.execute(
+        """
+        INSERT INTO career_test_results
+            (user_id, test_type, domain_scores, top_careers, career_recommendations, assessment_date, total_score,
+             responses)
+        VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+        """,
+        (
+            user_id,
+            test_type,
+            json.dumps(domain_scores, ensure_ascii=False),
+            json.dumps(top_careers or [], ensure_ascii=False),
+            json.dumps(career_recommendations, ensure_ascii=False) if career_recommendations is not None else None,
+            assessment_date or datetime.datetime.now().isoformat(),
+            int(total_score),
+            json.dumps(responses, ensure_ascii=False) if responses else None,
+        ),
+    )
+    result_id = c.lastrowid
+    conn.commit()
+    conn.close()
+    return result_id
+
+def get_career_test_history(user_id, limit=20):
+    """A user's assessment results, newest first; none for anonymous visitors."""
+    if user_id is None:
+        return []
+    conn = sqlite3.connect(DB_PATH)
+    c = conn.cursor()
+    c.execute(
+        f"""
+        SELECT {_CAREER_TEST_COLUMNS} FROM career_test_results
+        WHERE user_id = ?
+        ORDER BY assessment_date DESC, id DESC
+        LIMIT ?
+        """,
+        (user_id, limit),
+    )
+    rows = c.fetchall()
+    conn.close()
+    return [_career_test_row(row) for row in rows]
+
+def get_latest_career_test_result(user_id):
+    """A user's most recent assessment result, or None."""
+    history = get_career_test_history(user_id, limit=1)
+    return history[0] if history else None
+
+def clear_career_test_results(user_id):
+    """Delete a user's assessment history; returns the number of rows removed."""
+    if user_id is None:
+        return 0
+    conn = sqlite3.connect(DB_PATH)
+    c = conn.cursor()
+    c.execute("DELETE FROM career_test_results WHERE user_id = ?", (user_id,))
+    removed = c.rowcount
+    conn.commit()
+    conn.close()
+    return removed
+
+# ---------------- Bulk re-scoring -----------------
+def iter_career_test_chunks(chunk_size=500):
+    """Yield lists of (id, user_id, responses, domain_scores, top_careers) rows in id order, one chunk at a time."""
+    last_id = 0
+    while True:
+        conn = sqlite3.connect(DB_PATH)
+        c = conn.cursor()
+        c.execute(
+            """
+            SELECT id, user_id, responses, domain_scores, top_careers FROM career_test_results
+            WHERE id > ? ORDER BY id LIMIT ?
+            """,
+            (last_id, chunk_size),
+        )
+        rows = c.fetchall()
+        conn.close()
+        if not rows:
+            return
+        yield rows
+        last_id = rows[-1][0]
+
+def get_latest_career_test_ids():
+    """Ids of each user's most recent assessment result."""
+    conn = sqlite3.connect(DB_PATH)
+    c = conn.cursor()
+    c.execute(
+        """
+        SELECT id FROM (
+            SELECT id, ROW_NUMBER() OVER (
+                PARTITION BY user_id ORDER BY assessment_date DESC, id DESC
+            ) AS position
+            FROM career_test_results
+        ) WHERE position = 1
+        """
+    )
+    ids = {row[0] for row in c.fetchall()}
+    conn.close()
+    return ids
+
+def apply_career_test_rescore(score_rows, profile_rows):
+    """Write one chunk of re-scored results and the profile fields derived from them in a single transaction.
+
+    score_rows: (id, domain_scores, top_careers, total_score), JSON fields as dicts/lists.
+    profile_rows: (user_id, key, value, previous_value). A field is only replaced
+    while it is missing or still holds previous_value, i.e. the user has not
+    edited it since the quiz wrote it. Returns the ids of the users whose
+    profile changed.
+    """
+    now = datetime.datetime.now().isoformat()
+    conn = sqlite3.connect(DB_PATH, timeout=30)
+    try:
+        c = conn.cursor()
+        c.executemany(
+            "UPDATE career_test_results SET domain_scores = ?, top_careers = ?, total_score = ? WHERE id = ?",
+            [
+                (json.dumps(domain_scores, ensure_ascii=False), json.dumps(top_careers, ensure_ascii=False),
+                 int(total_score), result_id)
+                for result_id, domain_scores, top_careers, total_score in score_rows
+            ],
+        )
+        updated = set()
+        for user_id, key, value, previous in profile_rows:
+            c.execute(
+                "SELECT value FROM user_profile WHERE key = ? AND user_id = ? ORDER BY id DESC LIMIT 1",
+                (key, user_id),
+            )
+            current = c.fetchone()
+            if current is not None and current[0] != previous:
+                continue
+            if current is not None and current[0] == value:
+                continue
+            c.execute("DELETE FROM user_profile WHERE key = ? AND user_id = ?", (key, user_id))
+            c.execute(
+                "INSERT INTO user_profile (key, value, timestamp, user_id) VALUES (?, ?, ?, ?)",
+                (key, value, now, user_id),
+            )
+            updated.add(user_id)
+        conn.commit()
+    finally:
+        conn.close()
+    return updated
+
+# clear_profile_data()
@@ -1,5 +1,5 @@
 
-from flask import Flask, render_template, request, redirect, session, url_for, send_from_directory, jsonify
+from flask import Flask, render_template, request, redirect, session, url_for, send_from_directory, jsonify, Response, stream_with_context
 from flask_cors import CORS
 import ai_chat
 import SIH_01
@@ -8,158 +8,88 @@ from college_locator import CollegeLocator
 from college_cache import CollegeCache
 import os
 import datetime
-import requests
+import http_client
+from provider_orchestrator import ProviderOrchestrator
+import sys
+# Shared notification modules live in the repository root
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from notification_events import etag_for
+from notification_engine import NotificationEngine
 import json
 import time
 from threading import Thread
 
 app = Flask(__name__)
 CORS(app)  # Enable CORS for all routes
-app.secret_key = "dev-secret"
+# Shared with the career backend, which reads this session to identify the user
+app.secret_key = os.environ.get("EDUPATH_SECRET_KEY", "dev-secret")
 
 # Initialize the college locator and cache
 locator = CollegeLocator()
 cache = CollegeCache()
+# Advise-mode chat keeps its Google Places lookups in a separate file, out of
+# the directory's search results and statistics
+SIH_01.college_store = CollegeCache("places_cache.json")
 
 ai_chat.init_db()
 
-# Notification cache for storing live data
-notification_cache = {
-    'last_updated': None,
-    'notifications': []
-}
+# Opt-in group commit for chat history writes
+if os.environ.get("EDUPATH_CHAT_WRITE_BATCHING") == "1":
+    ai_chat.enable_write_batching()
 
-def get_live_notification_data():
-    """Generate live notification data"""
-    notifications = []
-    current_year = datetime.datetime.now().year
-    
-    # JEE Main data with real calculations
-    jee_main_dates = {
-        'registration_start': f"{current_year}-12-01",
-        'registration_end': f"{current_year}-12-30",
-        'exam_date': f"{current_year + 1}-01-24"
-    }
-    
-    reg_end = datetime.datetime.strptime(jee_main_dates['registration_end'], '%Y-%m-%d')
-    days_left = (reg_end - datetime.datetime.now()).days
-    
-    if days_left > 0:
-        notifications.append({
-            'id': 'jee_main_2024',
-            'title': f'JEE Main {current_year + 1} Registration',
-            'message': f'Registration closes in {days_left} days on {reg_end.strftime("%B %d, %Y")}. Apply now!',
-            'date': '2 hours ago',
-            'category': 'exams',
-            'priority': 'urgent' if days_left <= 7 else 'high',
-            'read': False
-        })
-    
-    # NEET data
-    neet_exam_date = datetime.datetime(current_year + 1, 5, 5)
-    days_to_exam = (neet_exam_date - datetime.datetime.now()).days
-    
-    notifications.append({
-        'id': 'neet_2024',
-        'title': f'NEET {current_year + 1} Exam',
-        'message': f'NEET exam in {days_to_exam} days on {neet_exam_date.strftime("%B %d, %Y")}. Preparation time remaining!',
-        'date': '5 hours ago',
-        'category': 'exams',
-        'priority': 'high',
-        'read': False
-    })
-    
-    # Course notifications
-    courses = [
-        {
-            'title': 'AI & Machine Learning Certification',
-            'provider': 'IIT Delhi',
-            'discount': '30% Early Bird',
-            'deadline': '2024-01-15'
-        },
-        {
-            'title': 'Data Science Professional Certificate',
-            'provider': 'Google Career Certificates',
-            'discount': 'Financial Aid Available',
-            'deadline': '2024-02-01'
-        }
-    ]
-    
-    for i, course in enumerate(courses):
-        try:
-            deadline = datetime.datetime.strptime(course['deadline'], '%Y-%m-%d')
-            days_left = (deadline - datetime.datetime.now()).days
-            
-            if days_left > 0:
-                notifications.append({
-                    'id': f'course_{i}',
-                    'title': f"New Course: {course['title']}",
-                    'message': f"{course['provider']} - {course['discount']}. Enrollment closes in {days_left} days.",
-                    'date': f'{i + 1} day ago',
-                    'category': 'courses',
-                    'priority': 'medium' if days_left > 7 else 'high',
-                    'read': i % 2 == 0
-                })
-        except:
-            continue
-    
-    # Scholarship notifications
-    scholarships = [
-        {
-            'title': 'National Merit Scholarship',
-            'amount': '₹50,000',
-            'deadline': '2024-01-20',
-            'eligibility': 'Engineering Students'
-        },
-        {
-            'title': 'Microsoft Summer Internship',
-            'amount': '₹40,000/month',
-            'deadline': '2024-01-10',
-            'eligibility': 'CS/IT Students'
-        }
-    ]
-    
-    for i, scholarship in enumerate(scholarships):
-        try:
-            deadline = datetime.datetime.strptime(scholarship['deadline'], '%Y-%m-%d')
-            days_left = (deadline - datetime.datetime.now()).days
-            
-            if days_left > 0:
-                notifications.append({
-                    'id': f'scholarship_{i}',
-                    'title': f"{scholarship['title']} - {scholarship['amount']}",
-                    'message': f"For {scholarship['eligibility']}. Apply before {deadline.strftime('%B %d, %Y')} - {days_left} days left!",
-                    'date': f'{i + 2} days ago',
-                    'category': 'deadlines',
-                    'priority': 'urgent' if days_left <= 5 else 'high',
-                    'read': False
-                })
-        except:
-            continue
-    
-    return notifications
+# Opt-in periodic trimming/compaction of chat history
+if os.environ.get("EDUPATH_CHAT_RETENTION") == "1":
+    import chat_retention
+    chat_retention.start_retention_scheduler()
 
-def update_notification_cache():
-    """Update notification cache with fresh data"""
-    global notification_cache
-    try:
-        notifications = get_live_notification_data()
-        priority_order = {'urgent': 0, 'high': 1, 'medium': 2, 'low': 3}
-        notifications.sort(key=lambda x: (priority_order.get(x['priority'], 3), x['id']))
-        
-        notification_cache['notifications'] = notifications
-        notification_cache['last_updated'] = datetime.datetime.now().isoformat()
-    except Exception as e:
-        print(f"Error updating notifications: {e}")
-
-# Initialize notifications
-update_notification_cache()
+# Notifications come from the shared engine (repository root), also used by live_notifications_api.py
+notification_engine = NotificationEngine()
+notification_cache = notification_engine.cache
+notification_events = notification_engine.events
+# Keep per-user read counters limited to notifications that still exist
+notification_engine.on_change(lambda notifications: ai_chat.prune_notification_state([n['id'] for n in notifications]))
+notification_engine.start()
 
 # webflow animation 
 def get_current_user_id():
     return session.get("user_id")
 
 
+def wants_stream(data=None):
+    """Chat endpoints stream when the JSON body has "stream": true or the URL has ?stream=1."""
+    return bool((data or {}).get("stream")) or request.args.get("stream") == "1"
+
+
+def sse_response(chunks, on_complete=None):
+    """
+    Relay reply text chunks to the browser as Server-Sent Events.
+    Each chunk is a "message" event with {"delta": ...}; a final "done" event carries
+    the full response. on_complete(full_text) runs after the last chunk.
+    """
+    def generate():
+        parts = []
+        try:
+            for chunk in chunks:
+                if chunk:
+                    parts.append(chunk)
+                    yield f"data: {json.dumps({'delta': chunk})}\n\n"
+            full_text = "".join(parts)
+            if on_complete:
+                on_complete(full_text)
+            yield f"event: done\ndata: {json.dumps({'response': full_text})}\n\n"
+        except Exception as e:
+            print(f"Error while streaming response: {e}")
+            yield f"event: error\ndata: {json.dumps({'error': 'Sorry, I am having trouble processing your request.'})}\n\n"
+
+    return Response(stream_with_context(generate()), mimetype="text/event-stream",
+                    headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"})
+
+
+@app.route("/healthz")
+def healthz():
+    """Cheap readiness probe for the launcher"""
+    return jsonify({"status": "ok"})
+
 @app.route("/landing")
 def landing():
     return render_template("landing_page.html")
@@ -297,11 +227,13 @@ def chat():
 
 @app.route("/api/messages")
 def get_messages():
+    """Page through chat history; pass ?before=<next_before> to load older messages."""
     user_id = get_current_user_id()
     if not user_id:
-        return {"messages": []}
-    messages = ai_chat.get_recent_messages(limit=5, user_id=user_id)
-    return {"messages": messages}
+        return {"messages": [], "next_before": None, "has_more": False}
+    before_id = request.args.get("before", type=int)
+    limit = min(max(request.args.get("limit", 20, type=int), 1), 100)
+    return ai_chat.get_chat_page(user_id, before_id=before_id, limit=limit)
 
 @app.route("/api/chat", methods=["POST"])
 def api_chat():
@@ -314,6 +246,8 @@ def api_chat():
     quiz_results = data.get("quiz_results")  # Optional career quiz results
     
     if message:
+        if wants_stream(data):
+            return sse_response(SIH_01.Talk_Chat_Stream(message, user_id=user_id, quiz_results=quiz_results))
         try:
             # Use the new function from run_sih.py with quiz results
             response = run_sih.process_chat_message(message, user_id=user_id, quiz_results=quiz_results)
@@ -726,6 +660,9 @@ def career_guidance_chat():
         # Update session context
         session['chat_context'] = f"Previous: {user_message[:100]}..."
         
+        if wants_stream(data):
+            # The session intro is built locally, so it goes out as a single event
+            return sse_response([response])
         return jsonify({'success': True, 'response': response})
         
     except Exception as e:
@@ -748,12 +685,15 @@ def toggle_chat():
         # Get session context for continuity
         session_context = session.get('toggle_chat_context', '')
         
+        # Update session context (before streaming starts, while headers can still change)
+        session['toggle_chat_context'] = f"Previous: {user_message[:100]}..."
+        
+        if wants_stream(data):
+            return sse_response(SIH_01.Toggle_Button_Chat_Stream(user_message, user_id=user_id, session_context=session_context))
+        
         # Call the new Toggle Button Chat function
         response = SIH_01.Toggle_Button_Chat(user_message, user_id=user_id, session_context=session_context)
         
-        # Update session context
-        session['toggle_chat_context'] = f"Previous: {user_message[:100]}..."
-        
         return jsonify({'success': True, 'response': response})
         
     except Exception as e:
@@ -774,6 +714,12 @@ def career_chat():
         if not user_message:
             return jsonify({'success': False, 'error': 'Message is required'}), 400
         
+        if wants_stream(data):
+            return sse_response(
+                stream_career_response(user_message, user_id),
+                on_complete=lambda full_text: ai_chat.add_chat_message(user_id, user_message, full_text)
+            )
+        
         # Generate AI response based on message content
         response = generate_career_response(user_message, user_id)
         
@@ -804,15 +750,8 @@ def generate_career_response(message, user_id):
         # Get recent chat history for context
         chat_history = ai_chat.get_recent_chat_history(user_id, limit=5)
         
-        # Try multiple AI services in order of preference
-        ai_response = None
-        
-        # 1. Try Hugging Face Inference API (free)
-        ai_response = get_huggingface_response(message, user_name, user_interests, user_class, chat_history)
-        
-        if not ai_response:
-            # 2. Try Ollama local model (if available)
-            ai_response = get_ollama_response(message, user_name, user_interests, user_class, chat_history)
+        # Ask every healthy AI service at once; the preferred one that answers in time wins
+        provider, ai_response = career_providers.run(message, user_name, user_interests, user_class, chat_history)
         
         if not ai_response:
             # 3. Fallback to enhanced rule-based system with AI-like responses
@@ -824,7 +763,38 @@ def generate_career_response(message, user_id):
         print(f"Error in AI response generation: {e}")
         return get_enhanced_fallback_response(message, user_name if 'user_name' in locals() else 'Student', '', '')
 
-def get_huggingface_response(message, user_name, user_interests, user_class, chat_history):
+def stream_career_response(message, user_id):
+    """Streaming variant of generate_career_response: yields text as it is produced"""
+    user_profile = ai_chat.get_user_profile(user_id)
+    user_name = user_profile.get('name', 'Student')
+    user_interests = user_profile.get('interests', '')
+    user_class = user_profile.get('student_class', '')
+    chat_history = ai_chat.get_recent_chat_history(user_id, limit=5)
+    
+    # 1. Hugging Face has no token stream for this model; send its answer in one piece
+    ai_response = career_providers.call("huggingface", message, user_name, user_interests, user_class, chat_history)
+    if ai_response:
+        yield ai_response
+        return
+    
+    # 2. Ollama streams tokens; clean them incrementally
+    cleaner = SIH_01.StreamCleaner()
+    produced = False
+    for chunk in stream_ollama_response(message, user_name, user_interests, user_class):
+        text = cleaner.feed(chunk)
+        if text:
+            produced = True
+            yield text
+    text = cleaner.finish()
+    if text:
+        produced = True
+        yield text
+    
+    # 3. Rule-based fallback
+    if not produced:
+        yield get_enhanced_fallback_response(message, user_name, user_interests, user_class)
+
+def get_huggingface_response(message, user_name, user_interests, user_class, chat_history, timeout=10):
     """Get response from Hugging Face Inference API"""
     try:
         # Build context from user profile and chat history
@@ -875,7 +845,7 @@ Response:"""
             }
         }
         
-        response = requests.post(api_url, headers=headers, json=payload, timeout=10)
+        response = http_client.post(api_url, headers=headers, json=payload, timeout=timeout)
         
         if response.status_code == 200:
             result = response.json()
@@ -889,38 +859,42 @@ Response:"""
         
     return None
 
-def get_ollama_response(message, user_name, user_interests, user_class, chat_history):
-    """Get response from local Ollama model"""
-    try:
-        # Check if Ollama is running locally
-        ollama_url = "http://localhost:11434/api/generate"
+OLLAMA_URL = "http://localhost:11434/api/generate"
+
+def build_ollama_payload(message, user_name, user_interests, user_class, stream=False):
+    """Build the Ollama generate request for a career question"""
+    # Build context
+    context = f"User: {user_name}"
+    if user_class:
+        context += f", Class: {user_class}"
+    if user_interests:
+        context += f", Interests: {user_interests}"
         
-        # Build context
-        context = f"User: {user_name}"
-        if user_class:
-            context += f", Class: {user_class}"
-        if user_interests:
-            context += f", Interests: {user_interests}"
-            
-        prompt = f"""You are an expert AI Career Counselor for Indian students. 
+    prompt = f"""You are an expert AI Career Counselor for Indian students. 
 
 Context: {context}
 Question: {message}
 
 Provide personalized career guidance in 150 words or less. Use the user's name ({user_name}) and be specific about Indian education system, entrance exams, and career paths."""
 
-        payload = {
-            "model": "llama2",  # or "mistral", "codellama" etc.
-            "prompt": prompt,
-            "stream": False,
-            "options": {
-                "temperature": 0.7,
-                "top_p": 0.9,
-                "max_tokens": 200
-            }
+    return {
+        "model": "llama2",  # or "mistral", "codellama" etc.
+        "prompt": prompt,
+        "stream": stream,
+        "options": {
+            "temperature": 0.7,
+            "top_p": 0.9,
+            "max_tokens": 200
         }
+    }
+
+def get_ollama_response(message, user_name, user_interests, user_class, chat_history, timeout=15):
+    """Get response from local Ollama model"""
+    try:
+        # Check if Ollama is running locally
+        payload = build_ollama_payload(message, user_name, user_interests, user_class)
         
-        response = requests.post(ollama_url, json=payload, timeout=15)
+        response = http_client.post(OLLAMA_URL, json=payload, timeout=timeout)
         
         if response.status_code == 200:
             result = response.json()
@@ -933,6 +907,34 @@ Provide personalized career guidance in 150 words or less. Use the user's name (
         
     return None
 
+def stream_ollama_response(message, user_name, user_interests, user_class):
+    """Yield response tokens from the local Ollama model as they are generated"""
+    try:
+        payload = build_ollama_payload(message, user_name, user_interests, user_class, stream=True)
+        
+        with http_client.post(OLLAMA_URL, json=payload, timeout=15, stream=True) as response:
+            if response.status_code != 200:
+                return
+            # Ollama streams one JSON object per line
+            for line in response.iter_lines():
+                if not line:
+                    continue
+                chunk = json.loads(line)
+                if chunk.get('response'):
+                    yield chunk['response']
+                if chunk.get('done'):
+                    break
+                    
+    except Exception as e:
+        print(f"Ollama API error: {e}")
+
+# Providers for generate_career_response, most preferred first; the rule-based
+# fallback is instant, so the global deadline bounds how long a user can wait.
+# Each provider gets the time left before its deadline as its request timeout.
+career_providers = ProviderOrchestrator(global_deadline=float(os.environ.get("EDUPATH_PROVIDER_DEADLINE", 10)))
+career_providers.register("huggingface", get_huggingface_response, priority=0, deadline=8)
+career_providers.register("ollama", get_ollama_response, priority=1, deadline=10)
+
 def get_enhanced_fallback_response(message, user_name, user_interests, user_class):
     """Enhanced fallback with AI-like contextual responses"""
     message_lower = message.lower()
@@ -1021,21 +1023,124 @@ def get_notifications():
     
     category_filter = request.args.get('category', 'all')
     
-    notifications = notification_cache['notifications']
+    # Read the version before the views: a concurrent update can only make the body newer than its ETag
+    seen_count, state_version = ai_chat.get_notification_counter(user_id)
+    etag = etag_for(notification_cache['version'], f"u{user_id}.{state_version}", category_filter)
+    if etag in request.if_none_match:
+        return Response(status=304, headers={'ETag': f'"{etag}"'})
+    views = notification_cache['views']
     
-    # Apply filters
-    if category_filter != 'all':
-        if category_filter == 'urgent':
-            notifications = [n for n in notifications if n['priority'] == 'urgent']
-        else:
-            notifications = [n for n in notifications if n['category'] == category_filter]
+    # Apply this user's read/dismissed state to the shared view
+    read_ids, dismissed_ids, _ = ai_chat.get_notification_state(user_id)
+    notifications = [
+        dict(n, read=n['id'] in read_ids)
+        for n in views['by_category'].get(category_filter, [])
+        if n['id'] not in dismissed_ids
+    ]
     
-    return jsonify({
+    response = jsonify({
         'notifications': notifications,
         'last_updated': notification_cache['last_updated'],
-        'total_count': len(notification_cache['notifications']),
-        'filtered_count': len(notifications)
+        'total_count': len(views['by_category']['all']),
+        'filtered_count': len(notifications),
+        'unread_count': max(len(views['by_category']['all']) - seen_count, 0)
     })
+    response.set_etag(etag)
+    return response
+
+def _requested_notification_ids(data):
+    """Current notification ids named in a read/dismiss request body ("ids", or "all" with an optional "category")."""
+    views = notification_cache['views']
+    if data.get('all'):
+        return [n['id'] for n in views['by_category'].get(data.get('category', 'all'), [])]
+    # Only ids that are still published count towards the unread counter
+    current = {n['id'] for n in views['by_category']['all']}
+    return [nid for nid in data.get('ids') or [] if nid in current]
+
+@app.route('/api/notifications/read', methods=['POST'])
+def mark_notifications_read():
+    """Mark notifications read for the current user (bulk)"""
+    user_id = get_current_user_id()
+    if not user_id:
+        return jsonify({'success': False, 'error': 'Please log in'}), 401
+    
+    data = request.get_json(silent=True) or {}
+    marked = ai_chat.mark_notifications_read(user_id, _requested_notification_ids(data))
+    seen_count, _ = ai_chat.get_notification_counter(user_id)
+    return jsonify({
+        'success': True,
+        'marked': marked,
+        'unread_count': max(notification_cache['views']['stats']['total'] - seen_count, 0)
+    })
+
+@app.route('/api/notifications/dismiss', methods=['POST'])
+def dismiss_notifications():
+    """Dismiss notifications for the current user (bulk)"""
+    user_id = get_current_user_id()
+    if not user_id:
+        return jsonify({'success': False, 'error': 'Please log in'}), 401
+    
+    data = request.get_json(silent=True) or {}
+    ai_chat.dismiss_notifications(user_id, _requested_notification_ids(data))
+    seen_count, _ = ai_chat.get_notification_counter(user_id)
+    return jsonify({
+        'success': True,
+        'unread_count': max(notification_cache['views']['stats']['total'] - seen_count, 0)
+    })
+
+@app.route('/api/notifications/state')
+def get_notification_read_state():
+    """The current user's read and dismissed notification ids, for clients fed by the shared stream"""
+    user_id = get_current_user_id()
+    if not user_id:
+        return jsonify({'success': False, 'error': 'Please log in'}), 401
+    
+    seen_count, state_version = ai_chat.get_notification_counter(user_id)
+    etag = etag_for(notification_cache['version'], f"u{user_id}.{state_version}", 'state')
+    if etag in request.if_none_match:
+        return Response(status=304, headers={'ETag': f'"{etag}"'})
+    
+    read_ids, dismissed_ids, _ = ai_chat.get_notification_state(user_id)
+    response = jsonify({
+        'read_ids': sorted(read_ids),
+        'dismissed_ids': sorted(dismissed_ids),
+        'unread_count': max(notification_cache['views']['stats']['total'] - seen_count, 0)
+    })
+    response.set_etag(etag)
+    return response
+
+@app.route('/api/notifications/stats')
+def get_notification_stats():
+    """Notification statistics with the current user's unread count"""
+    user_id = get_current_user_id()
+    if not user_id:
+        return jsonify({'success': False, 'error': 'Please log in'}), 401
+    
+    seen_count, state_version = ai_chat.get_notification_counter(user_id)
+    etag = etag_for(notification_cache['version'], f"u{user_id}.{state_version}", 'stats')
+    if etag in request.if_none_match:
+        return Response(status=304, headers={'ETag': f'"{etag}"'})
+    
+    stats = dict(notification_cache['views']['stats'], last_updated=notification_cache['last_updated'])
+    stats['unread'] = max(stats['total'] - seen_count, 0)
+    
+    response = jsonify(stats)
+    response.set_etag(etag)
+    return response
+
+@app.route('/api/notifications/stream')
+def stream_notifications():
+    """Server-Sent Events stream of notification changes (supports Last-Event-ID resume)"""
+    user_id = get_current_user_id()
+    if not user_id:
+        return jsonify({'success': False, 'error': 'Please log in'}), 401
+    
+    last_event_id = request.headers.get('Last-Event-ID') or request.args.get('last_event_id')
+    return Response(
+        stream_with_context(notification_events.stream(last_event_id)),
+        mimetype='text/event-stream',
+        headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'}
+    )
 
 @app.route('/api/notifications/refresh')
 def refresh_notifications():
@@ -1044,8 +1149,9 @@ def refresh_notifications():
     if not user_id:
         return jsonify({'success': False, 'error': 'Please log in'}), 401
     
-    update_notification_cache()
-    return jsonify({'status': 'success', 'message': 'Notifications refreshed'})
+    # The scheduler thread does the refresh; this only wakes it
+    notification_engine.request_refresh()
+    return jsonify({'status': 'success', 'message': 'Notification refresh requested'})
 
 
 if __name__ == "__main__":
@@ -0,0 +1,175 @@
+"""
+Asyncio variants of the Gemini chat functions.
+Retries and quota waits are awaited on an event loop instead of sleeping on a
+request thread. Blocking pieces (SQLite, geocoding and the HTTP call itself
+over the pooled session) run via asyncio.to_thread. Synchronous callers use
+``run_sync``, which runs a coroutine on a shared background loop.
+"""
+
+import asyncio
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import requests
+
+import ai_chat
+import http_client
+import response_cache
+import SIH_01
+
+HEADERS = {"Content-Type": "application/json"}
+
+# Threads for the blocking steps awaited by the event loop
+IO_WORKERS = int(os.environ.get("EDUPATH_ASYNC_IO_WORKERS", 16))
+
+_loop = None
+_loop_lock = threading.Lock()
+
+def _get_loop():
+    """Start the shared event loop in a daemon thread on first use."""
+    global _loop
+    if _loop is None:
+        with _loop_lock:
+            if _loop is None:
+                loop = asyncio.new_event_loop()
+                loop.set_default_executor(ThreadPoolExecutor(max_workers=IO_WORKERS, thread_name_prefix="async-chat-io"))
+                threading.Thread(target=loop.run_forever, name="async-chat", daemon=True).start()
+                _loop = loop
+    return _loop
+
+def run_sync(coro, timeout=None):
+    """Run a coroutine on the shared loop and wait for its result (sync shim)."""
+    return asyncio.run_coroutine_threadsafe(coro, _get_loop()).result(timeout)
+
+
+# ---------- Gemini client ----------
+async def make_api_request_async(url, data, headers=HEADERS, max_retries=SIH_01.MAX_RETRIES, user_id=None):
+    """Async make_api_request_with_retry: quota waits and retry delays are awaited."""
+    scheduler = SIH_01.gemini_scheduler
+    for attempt in range(max_retries):
+        try:
+            request_url = await scheduler.acquire_async(url, user_id)
+            response = await asyncio.to_thread(http_client.post, request_url, headers=headers, json=data, timeout=30)
+            scheduler.report(request_url, response.status_code, response.headers.get("Retry-After"))
+
+            if response.status_code == 200:
+                return response
+            elif response.status_code in (429, 503):
+                if attempt < max_retries - 1:
+                    print(f"API overloaded ({response.status_code}), retrying... (attempt {attempt + 1}/{max_retries})")
+                    continue
+                print("API still overloaded after all retries. Please try again later.")
+                return response
+            else:
+                return response
+
+        except requests.exceptions.Timeout:
+            if attempt < max_retries - 1:
+                delay = min(SIH_01.BASE_DELAY * (2 ** attempt), SIH_01.MAX_DELAY)
+                print(f"Request timeout, retrying in {delay:.1f}s... (attempt {attempt + 1}/{max_retries})")
+                await asyncio.sleep(delay)
+                continue
+            print("Request timed out after all retries.")
+            raise
+        except requests.exceptions.RequestException as e:
+            print(f"Request failed: {e}")
+            raise
+
+    return response
+
+async def get_confidence_async(user_input, profile_data):
+    response = await make_api_request_async(SIH_01.API_URL, SIH_01._confidence_payload(user_input, profile_data))
+    return SIH_01._parse_confidence(response)
+
+async def _score_confidence_async(user_input, profile_data):
+    try:
+        return await get_confidence_async(user_input, profile_data)
+    except Exception as e:
+        print(f"Confidence scoring failed: {e}")
+        return 0
+
+async def _generate_talk_reply_async(mode, new_conf, profile_data, has_quiz_data, recent_text, user_input, user_id=None):
+    prompt_text, nearby_colleges = await asyncio.to_thread(
+        SIH_01.build_talk_prompt, mode, new_conf, profile_data, has_quiz_data, recent_text, user_input
+    )
+    response = await make_api_request_async(SIH_01.API_URL, SIH_01._gemini_payload(prompt_text), user_id=user_id)
+    return SIH_01._reply_text(response), nearby_colleges
+
+
+# ---------- Chat functions ----------
+async def Talk_Chat_async(user_input, user_id=None, quiz_results=None):
+    """Async Talk_Chat: scoring and candidate replies run as concurrent tasks on the loop."""
+    turn = await asyncio.to_thread(SIH_01._prepare_talk_turn, user_input, user_id, quiz_results)
+    profile_data = turn["profile_data"]
+    prev_conf = turn["prev_conf"]
+
+    added_conf = SIH_01._local_confidence(user_input, turn)
+    score_task = None
+    if added_conf is None:
+        score_task = asyncio.create_task(_score_confidence_async(user_input, profile_data))
+
+    conf_estimate, candidate_modes = SIH_01._talk_candidate_modes(turn, added_conf)
+    cached_replies = {m: response_cache.lookup(user_input, profile_data, m, turn["recent_text"]) for m in candidate_modes}
+    reply_tasks = {
+        m: asyncio.create_task(_generate_talk_reply_async(
+            m, conf_estimate if m == "advise" else prev_conf,
+            profile_data, turn["has_quiz_data"], turn["recent_text"], user_input, user_id
+        ))
+        for m in candidate_modes
+        if cached_replies[m] is None
+    }
+
+    if score_task is not None:
+        added_conf = await score_task // turn["score_divisor"]
+    new_conf = min(prev_conf + added_conf, 100)
+    await asyncio.to_thread(ai_chat.save_profile_data, "confidence", str(new_conf), user_id=user_id)
+
+    mode = "ask" if new_conf < turn["confidence_threshold"] else "advise"
+    for other_mode, task in reply_tasks.items():
+        if other_mode != mode:
+            task.cancel()
+    if cached_replies.get(mode) is not None:
+        await asyncio.to_thread(SIH_01._record_talk_reply, user_input, user_id, cached_replies[mode], new_conf)
+        return cached_replies[mode]
+    reply, nearby_colleges = await reply_tasks[mode]
+
+    if reply is not None:
+        short_reply = SIH_01.clean_and_shorten(reply, new_conf)
+        response_cache.store(user_input, short_reply, profile_data, mode, turn["recent_text"])
+        await asyncio.to_thread(SIH_01._record_talk_reply, user_input, user_id, short_reply, new_conf)
+        return short_reply
+    return await asyncio.to_thread(SIH_01._talk_fallback, user_input, user_id, turn, nearby_colleges, new_conf)
+
+async def Career_Guidance_Chat_async(user_input, user_id=None, session_context=None):
+    # Career_Guidance_Chat makes no API call; only its database reads are moved off the loop
+    return await asyncio.to_thread(SIH_01.Career_Guidance_Chat, user_input, user_id, session_context)
+
+async def Toggle_Button_Chat_async(user_input, user_id=None, session_context=None):
+    """Async Toggle_Button_Chat."""
+    toggle_chat_context, profile_data, recent_context = await asyncio.to_thread(
+        SIH_01.build_toggle_prompt, user_input, user_id
+    )
+
+    cached = response_cache.lookup(user_input, profile_data, "toggle", recent_context)
+    if cached is not None:
+        await asyncio.to_thread(SIH_01._record_toggle_reply, user_input, user_id, profile_data, cached)
+        return cached
+
+    try:
+        response = await make_api_request_async(
+            SIH_01.API_URL2, SIH_01._gemini_payload(toggle_chat_context), user_id=user_id
+        )
+        counseling_response = SIH_01._reply_text(response)
+        if counseling_response is None:
+            print(f"Counseling API Error: {response.status_code} {response.text}")
+            return SIH_01.TOGGLE_UNAVAILABLE_MESSAGE
+
+        formatted_response = SIH_01.clean_and_shorten(counseling_response)
+        response_cache.store(user_input, formatted_response, profile_data, "toggle", recent_context)
+        await asyncio.to_thread(SIH_01._record_toggle_reply, user_input, user_id, profile_data, formatted_response)
+        return formatted_response
+
+    except Exception as e:
+        print(f"Error in Career Guidance Chat: {e}")
+        return SIH_01.TOGGLE_ERROR_MESSAGE
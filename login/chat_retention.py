@@ -0,0 +1,111 @@
+#!/usr/bin/env python3
+"""
+Chat History Retention
+Trims chat_history into the compressed archive table and compacts ai_chat.db.
+Run it from the command line or start the background scheduler from the app.
+"""
+
+import os
+import sys
+import time
+from threading import Thread
+import ai_chat
+
+# Limits can be overridden from the environment
+MAX_MESSAGES_PER_USER = int(os.environ.get("EDUPATH_CHAT_MAX_MESSAGES", 500))
+MAX_AGE_DAYS = int(os.environ.get("EDUPATH_CHAT_MAX_AGE_DAYS", 180))
+RETENTION_INTERVAL_HOURS = float(os.environ.get("EDUPATH_CHAT_RETENTION_HOURS", 6))
+
+def run_retention(max_messages_per_user=MAX_MESSAGES_PER_USER, max_age_days=MAX_AGE_DAYS, full_vacuum=False):
+    """Archive old rows, then release the freed pages."""
+    archived = ai_chat.archive_chat_history(
+        max_messages_per_user=max_messages_per_user,
+        max_age_days=max_age_days,
+    )
+    pages_before, pages_after = ai_chat.compact_db(full=full_vacuum)
+    print(f"🗄️ Archived {archived} chat messages; database pages {pages_before} -> {pages_after}")
+    return archived
+
+def start_retention_scheduler(interval_hours=RETENTION_INTERVAL_HOURS):
+    """Run retention in a daemon thread every ``interval_hours``."""
+    def loop():
+        while True:
+            try:
+                run_retention()
+            except Exception as e:
+                print(f"Error running chat retention: {e}")
+            time.sleep(interval_hours * 3600)
+
+    thread = Thread(target=loop, name="chat-retention", daemon=True)
+    thread.start()
+    return thread
+
+def main():
+    """Main function to handle command line arguments."""
+    if len(sys.argv) < 2:
+        print_help()
+        return
+
+    command = sys.argv[1].lower()
+    if command == 'help':
+        print_help()
+        return
+
+    # An optional trailing *.db argument selects which database to maintain
+    args = sys.argv[2:]
+    db_paths = [a for a in args if a.endswith('.db')]
+    args = [a for a in args if not a.endswith('.db')]
+    if db_paths:
+        ai_chat.DB_PATH = db_paths[0]
+    ai_chat.init_db()
+
+    if command == 'run':
+        max_messages = int(args[0]) if len(args) > 0 else MAX_MESSAGES_PER_USER
+        max_age = int(args[1]) if len(args) > 1 else MAX_AGE_DAYS
+        run_retention(max_messages, max_age)
+
+    elif command == 'vacuum':
+        pages_before, pages_after = ai_chat.compact_db(full=True)
+        print(f"✅ Full VACUUM done; database pages {pages_before} -> {pages_after}")
+
+    elif command == 'stats':
+        print_stats()
+
+    else:
+        print(f"❌ Unknown command: {command}")
+        print_help()
+
+def print_stats():
+    """Print chat storage statistics."""
+    stats = ai_chat.get_chat_storage_stats()
+    size_kb = stats['page_count'] * stats['page_size'] / 1024
+
+    print("\n📊 Chat Storage Statistics:")
+    print(f"  Database: {os.path.abspath(ai_chat.DB_PATH)}")
+    print(f"  Live Messages: {stats['messages']} across {stats['users']} users")
+    print(f"  Oldest Live Message: {stats['oldest'] or 'n/a'}")
+    print(f"  Archived Messages: {stats['archived_messages']} in {stats['archive_chunks']} chunks")
+    print(f"  File Size: {size_kb:.1f} KB ({stats['freelist_count']} free pages)")
+
+def print_help():
+    """Print help information."""
+    print(f"""
+💬 Chat History Retention
+
+Usage: python chat_retention.py <command> [arguments] [path/to/ai_chat.db]
+
+Commands:
+  run [max_messages] [max_age_days]   Archive messages beyond the per-user cap or age
+                                      (defaults: {MAX_MESSAGES_PER_USER} messages, {MAX_AGE_DAYS} days)
+  vacuum                              Full VACUUM of the database
+  stats                               Show chat storage statistics
+  help                                Show this help message
+
+Examples:
+  python chat_retention.py stats
+  python chat_retention.py run 200 90
+  python chat_retention.py run ../ai_chat.db
+""")
+
+if __name__ == '__main__':
+    main()
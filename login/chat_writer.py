@@ -0,0 +1,118 @@
+import sqlite3
+import threading
+import queue
+import time
+from collections import defaultdict
+
+_STOP = object()
+
+class ChatWriter:
+    """Background writer that persists chat exchanges in group commits.
+
+    Request threads enqueue rows and return immediately; a single thread drains
+    the bounded queue and commits up to ``batch_size`` rows per transaction.
+    Readers call ``wait_for_user`` so a user always sees their own writes.
+    """
+
+    def __init__(self, db_path: str, max_queue: int = 1000, batch_size: int = 64,
+                 flush_interval: float = 0.05):
+        self.db_path = db_path
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self._queue = queue.Queue(maxsize=max_queue)
+        self._pending = defaultdict(int)
+        self._cond = threading.Condition()
+        # Held across the closed check and the put, so nothing is queued behind _STOP
+        self._submit_lock = threading.Lock()
+        self._closed = False
+        self._thread = threading.Thread(target=self._run, name="chat-writer", daemon=True)
+        self._thread.start()
+
+    def submit(self, user_id, timestamp: str, user_message: str, ai_response: str):
+        """Queue one exchange; blocks only when the queue is full (backpressure)."""
+        with self._submit_lock:
+            if self._closed:
+                raise RuntimeError("ChatWriter is closed")
+            with self._cond:
+                self._pending[user_id] += 1
+            self._queue.put((user_id, timestamp, user_message, ai_response))
+
+    def wait_for_user(self, user_id, timeout: float = 5.0) -> bool:
+        """Block until every queued write for ``user_id`` has been committed."""
+        deadline = time.monotonic() + timeout
+        with self._cond:
+            while self._pending.get(user_id):
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    return False
+                self._cond.wait(remaining)
+        return True
+
+    def flush(self, timeout: float = 30.0) -> bool:
+        """Block until the queue is fully drained and committed."""
+        deadline = time.monotonic() + timeout
+        with self._cond:
+            while any(self._pending.values()):
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    return False
+                self._cond.wait(remaining)
+        return True
+
+    def close(self, timeout: float = 30.0):
+        """Flush outstanding writes and stop the writer thread."""
+        with self._submit_lock:
+            if self._closed:
+                return
+            self._closed = True
+            self._queue.put(_STOP)
+        self._thread.join(timeout)
+
+    def _run(self):
+        conn = sqlite3.connect(self.db_path, timeout=30)
+        stopping = False
+        while not stopping:
+            item = self._queue.get()
+            if item is _STOP:
+                break
+            batch = [item]
+            deadline = time.monotonic() + self.flush_interval
+            while len(batch) < self.batch_size:
+                remaining = deadline - time.monotonic()
+                try:
+                    item = self._queue.get(timeout=max(remaining, 0)) if remaining > 0 else self._queue.get_nowait()
+                except queue.Empty:
+                    break
+                if item is _STOP:
+                    stopping = True
+                    break
+                batch.append(item)
+            self._write(conn, batch)
+        conn.close()
+
+    def _write(self, conn, batch):
+        rows = [(ts, user_msg, ai_msg, user_id) for user_id, ts, user_msg, ai_msg in batch]
+        try:
+            with conn:
+                conn.executemany(
+                    "INSERT INTO chat_history (timestamp, user_message, ai_response, user_id) VALUES (?, ?, ?, ?)",
+                    rows,
+                )
+        except sqlite3.Error as e:
+            print(f"Chat writer batch of {len(rows)} failed ({e}), retrying row by row")
+            for row in rows:
+                try:
+                    with conn:
+                        conn.execute(
+                            "INSERT INTO chat_history (timestamp, user_message, ai_response, user_id) VALUES (?, ?, ?, ?)",
+                            row,
+                        )
+                except sqlite3.Error as row_error:
+                    print(f"Chat writer dropped a message for user {row[3]}: {row_error}")
+        finally:
+            with self._cond:
+                for user_id, _, _, _ in batch:
+                    self._pending[user_id] -= 1
+                    if self._pending[user_id] <= 0:
+                        del self._pending[user_id]
+                self._cond.notify_all()
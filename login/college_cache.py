@@ -1,13 +1,24 @@
 import json
 import os
 import math
+import threading
+from functools import wraps
 from typing import List, Dict, Optional, Tuple
 from datetime import datetime, timedelta
 
+def _locked(method):
+    """Run a CollegeCache method under the instance lock (the chat thread pool shares one cache)."""
+    @wraps(method)
+    def wrapper(self, *args, **kwargs):
+        with self._lock:
+            return method(self, *args, **kwargs)
+    return wrapper
+
 class CollegeCache:
     def __init__(self, cache_file: str = "college_cache.json"):
         """Initialize the college cache system."""
         self.cache_file = cache_file
+        self._lock = threading.RLock()
         self.cache_data = self._load_cache()
         
     def _load_cache(self) -> Dict:
@@ -23,11 +34,13 @@ class CollegeCache:
             return {"locations": {}, "metadata": {"created": datetime.now().isoformat()}}
     
     def _save_cache(self):
-        """Save cache data to JSON file."""
+        """Save cache data to JSON file (written to a temp file and swapped in, so it is never half-written)."""
         try:
             self.cache_data["metadata"]["last_updated"] = datetime.now().isoformat()
-            with open(self.cache_file, 'w', encoding='utf-8') as f:
+            tmp_file = f"{self.cache_file}.tmp"
+            with open(tmp_file, 'w', encoding='utf-8') as f:
                 json.dump(self.cache_data, f, indent=2, ensure_ascii=False)
+            os.replace(tmp_file, self.cache_file)
             print(f"💾 Cache saved to {self.cache_file}")
         except Exception as e:
             print(f"❌ Error saving cache: {e}")
@@ -58,7 +71,9 @@ class CollegeCache:
         
         return R * c
     
-    def get_cached_colleges(self, lat: float, lon: float, radius: int, stream: str, location_name: str = "") -> Optional[List[Dict]]:
+    @_locked
+    def get_cached_colleges(self, lat: float, lon: float, radius: int, stream: str, location_name: str = "",
+                            max_age: timedelta = timedelta(days=7)) -> Optional[List[Dict]]:
         """
         Get cached colleges for a location if available.
         
@@ -68,6 +83,7 @@ class CollegeCache:
             radius: Search radius in meters
             stream: Course stream (pcm, pcb, arts, commerce, all)
             location_name: Name of the location
+            max_age: Entries older than this are treated as expired
             
         Returns:
             List of colleges if found in cache, None otherwise
@@ -80,13 +96,12 @@ class CollegeCache:
                     entry.get("stream", "").lower() == stream.lower()):
                     
                     cached_time = datetime.fromisoformat(entry["timestamp"])
-                    if datetime.now() - cached_time < timedelta(days=7):
+                    if datetime.now() - cached_time < max_age:
                         print(f"✅ Found cached Bhopal colleges for {stream} stream ({len(entry['colleges'])} colleges)")
                         
-                        # Update access count and last accessed time
+                        # Update access count and last accessed time (saved with the next write)
                         entry["access_count"] = entry.get("access_count", 0) + 1
                         entry["last_accessed"] = datetime.now().isoformat()
-                        self._save_cache()
                         
                         return entry["colleges"]
         
@@ -97,13 +112,12 @@ class CollegeCache:
             
             # Check if cache is not too old (7 days)
             cached_time = datetime.fromisoformat(cached_entry["timestamp"])
-            if datetime.now() - cached_time < timedelta(days=7):
+            if datetime.now() - cached_time < max_age:
                 print(f"✅ Found cached colleges for {location_name} ({len(cached_entry['colleges'])} colleges)")
                 
-                # Update access count and last accessed time
+                # Update access count and last accessed time (saved with the next write)
                 cached_entry["access_count"] = cached_entry.get("access_count", 0) + 1
                 cached_entry["last_accessed"] = datetime.now().isoformat()
-                self._save_cache()
                 
                 return cached_entry["colleges"]
             else:
@@ -128,7 +142,7 @@ class CollegeCache:
                         self._calculate_distance(lat, lon, cached_lat, cached_lon) <= 2000):  # Within 2km distance
                         
                         cached_time = datetime.fromisoformat(entry["timestamp"])
-                        if datetime.now() - cached_time < timedelta(days=7):
+                        if datetime.now() - cached_time < max_age:
                             print(f"✅ Found nearby cached colleges for {location_name}")
                             
                             # Filter colleges by actual radius
@@ -141,13 +155,13 @@ class CollegeCache:
                             if filtered_colleges:
                                 entry["access_count"] = entry.get("access_count", 0) + 1
                                 entry["last_accessed"] = datetime.now().isoformat()
-                                self._save_cache()
                                 return filtered_colleges
             except (ValueError, KeyError):
                 continue
         
         return None
     
+    @_locked
     def cache_colleges(self, lat: float, lon: float, radius: int, stream: str, 
                       colleges: List[Dict], location_name: str = ""):
         """
@@ -180,6 +194,7 @@ class CollegeCache:
         
         print(f"💾 Cached {len(colleges)} colleges for {location_name}")
     
+    @_locked
     def get_cached_locations(self) -> List[Dict]:
         """Get list of all cached locations with statistics."""
         locations = []
@@ -201,6 +216,7 @@ class CollegeCache:
         locations.sort(key=lambda x: x["access_count"], reverse=True)
         return locations
     
+    @_locked
     def search_cached_colleges(self, query: str, stream: str = "all") -> List[Dict]:
         """Search for colleges in cache by name or location."""
         results = []
@@ -228,12 +244,14 @@ class CollegeCache:
         
         return results
     
+    @_locked
     def clear_cache(self):
         """Clear all cached data."""
         self.cache_data = {"locations": {}, "metadata": {"created": datetime.now().isoformat()}}
         self._save_cache()
         print("🗑️ Cache cleared")
     
+    @_locked
     def clear_expired_cache(self, days: int = 7):
         """Clear cache entries older than specified days."""
         current_time = datetime.now()
@@ -256,6 +274,7 @@ class CollegeCache:
         
         return len(expired_keys)
     
+    @_locked
     def get_cache_stats(self) -> Dict:
         """Get cache statistics."""
         total_locations = len(self.cache_data["locations"])
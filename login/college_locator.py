@@ -1,4 +1,5 @@
 import requests
+import http_client
 import folium
 from geopy.geocoders import Nominatim
 import json
@@ -64,7 +65,7 @@ class CollegeLocator:
         last_error = None
         for base_url in self.overpass_mirrors:
             try:
-                response = requests.get(base_url, params={'data': query}, timeout=timeout_seconds)
+                response = http_client.get(base_url, params={'data': query}, timeout=timeout_seconds)
                 response.raise_for_status()
                 return response.json()
             except Exception as error:
@@ -307,7 +308,7 @@ class CollegeLocator:
         
         for url, parser in services:
             try:
-                response = requests.get(url, timeout=3)  # Reduced from 10 to 3 seconds
+                response = http_client.get(url, timeout=3)  # Reduced from 10 to 3 seconds
                 if response.status_code == 200:
                     data = response.json()
                     result = parser(data)
@@ -583,7 +584,7 @@ class CollegeLocator:
             out center;
             """
             print("Trying fallback search...")
-            response = requests.get(self.overpass_url, params={'data': query}, timeout=30)
+            response = http_client.get(self.overpass_url, params={'data': query}, timeout=30)
             response.raise_for_status()
             data = response.json()
 
@@ -0,0 +1,191 @@
+#!/usr/bin/env python3
+"""
+Local Confidence Scorer
+Rates how informative a student's message is for career guidance (0-100)
+with a keyword feature extractor and a small linear model, instead of a
+remote Gemini call per message. The model is a ridge fit on the hand-labelled
+messages in confidence_training.jsonl (scored against the Gemini rubric) and
+can be refitted with calibration samples logged from Gemini.
+"""
+
+import json
+import os
+import re
+import sys
+
+MODULE_DIR = os.path.dirname(os.path.abspath(__file__))
+MODEL_FILE = os.path.join(MODULE_DIR, "confidence_model.json")
+CALIBRATION_FILE = os.path.join(MODULE_DIR, "confidence_calibration.jsonl")
+TRAINING_FILE = os.path.join(MODULE_DIR, "confidence_training.jsonl")
+
+# "local" (default), "remote" (Gemini only) or "calibrate" (local score, Gemini logged for training)
+CONFIDENCE_MODE = os.environ.get("EDUPATH_CONFIDENCE_MODE", "local").lower()
+
+# A bare number or short word is not a fact: class numbers need an ordinal or a
+# "class"/"grade" prefix, and ambiguous words (CA, law, science) need context
+_CLASS_RE = re.compile(
+    r"\b(?:class|grade|std|standard)\s*(?:9|10|11|12|ix|x|xi|xii)\b|\b(?:9|10|11|12)th\b"
+    r"|\b(?:ninth|tenth|eleventh|twelfth)\b"
+    r"|\b(?:first|second|third|final|1st|2nd|3rd)\s+year\b|\b(?:b\.?\s?tech|b\.?\s?sc|b\.?\s?com|graduat\w*|diploma)\b",
+    re.IGNORECASE,
+)
+_SUBJECT_RE = re.compile(
+    r"\b(?:physics|chemistry|maths?|mathematics|biology|pcm|pcb|pcmb|commerce|humanities|economics|"
+    r"accounts|accountancy|business studies|computer science|history|geography|political science|"
+    r"psychology|sociology|literature|statistics|fine arts|science stream|arts stream)\b",
+    re.IGNORECASE,
+)
+_CAREER_RE = re.compile(
+    r"\b(?:engineer\w*|doctor|mbbs|medical|medicine|scientist|teacher|lawyer|llb|(?:study|studying|pursue) law|"
+    r"(?-i:CA)|chartered accountant|\w+ designer|architect|pilot|developer|programmer|software|data scien\w*|"
+    r"ias|civil services|army|navy|air force|nurse|nursing|pharmacist|journalist|artist|entrepreneur|"
+    r"own business|manager|management|mba|banking|dentist|veterinar\w*|psychologist)\b",
+    re.IGNORECASE,
+)
+_GOAL_RE = re.compile(
+    r"\b(?:want to (?:be|become|do|study|pursue|join)|wanna be|become an?|my (?:goal|dream|aim)|aim (?:is|to)|"
+    r"planning to|career in|dream of|aspire|target(?:ing)?)\b",
+    re.IGNORECASE,
+)
+_INTEREST_RE = re.compile(r"\b(?:like|love|enjoy|interested|interest|passion\w*|fond of|favou?rite)\b", re.IGNORECASE)
+_SKILL_RE = re.compile(
+    r"\b(?:good at|skilled|skills?|strength\w*|talent\w*|coding|drawing|writing|speaking|problem solving|"
+    r"leadership|creative)\b",
+    re.IGNORECASE,
+)
+_LOCATION_RE = re.compile(r"\b(?:in|from|at|near)\s+[A-Z][a-zA-Z]+")
+_EXAM_RE = re.compile(r"\b(?:jee|neet|cuet|clat|nift|upsc|olympiad|(?-i:NDA|CAT|GATE|NID|SSC))\b", re.IGNORECASE)
+_VAGUE_RE = re.compile(
+    r"^\s*(?:idk|i don'?t know|dunno|maybe|not sure|no idea|nothing|ok(?:ay)?|hmm+|yes|no|nah|k|fine|sure)\W*$"
+    r"|\b(?:idk|don'?t know|not sure|no idea|confused)\b",
+    re.IGNORECASE,
+)
+
+FEATURES = [
+    "mentions_class", "mentions_subjects", "mentions_career", "states_goal", "mentions_interest",
+    "mentions_skills", "mentions_location", "mentions_exam", "length", "vague",
+    "fills_class", "fills_subjects", "fills_career_goal",
+]
+
+# Fitted by 'python confidence_scorer.py train confidence_training.jsonl' (MAE ~2.5 points on that set)
+DEFAULT_MODEL = {
+    "bias": 0.0675,
+    "weights": {
+        "mentions_class": 0.1045,
+        "mentions_subjects": 0.0656,
+        "mentions_career": 0.0966,
+        "states_goal": 0.0795,
+        "mentions_interest": 0.0527,
+        "mentions_skills": 0.0436,
+        "mentions_location": 0.0041,
+        "mentions_exam": 0.1533,
+        "length": 0.0914,
+        "vague": -0.0593,
+        "fills_class": 0.1379,
+        "fills_subjects": 0.1443,
+        "fills_career_goal": 0.1416,
+    },
+}
+
+def _load_model():
+    if os.path.exists(MODEL_FILE):
+        try:
+            with open(MODEL_FILE, "r", encoding="utf-8") as f:
+                model = json.load(f)
+            if set(model.get("weights", {})) == set(FEATURES):
+                return model
+            print(f"⚠️ Ignoring {MODEL_FILE}: feature set does not match")
+        except Exception as e:
+            print(f"⚠️ Error loading confidence model: {e}")
+    return DEFAULT_MODEL
+
+_model = _load_model()
+
+def extract_features(user_input, profile_data=None):
+    """Map a message (and the profile so far) to the model's feature dict."""
+    text = user_input or ""
+    profile_data = profile_data or {}
+    words = len(text.split())
+
+    has_class = bool(_CLASS_RE.search(text))
+    has_subjects = bool(_SUBJECT_RE.search(text))
+    has_career = bool(_CAREER_RE.search(text))
+    return {
+        "mentions_class": float(has_class),
+        "mentions_subjects": float(has_subjects),
+        "mentions_career": float(has_career),
+        "states_goal": float(bool(_GOAL_RE.search(text))),
+        "mentions_interest": float(bool(_INTEREST_RE.search(text))),
+        "mentions_skills": float(bool(_SKILL_RE.search(text))),
+        "mentions_location": float(bool(_LOCATION_RE.search(text))),
+        "mentions_exam": float(bool(_EXAM_RE.search(text))),
+        "length": min(words / 30.0, 1.0),
+        "vague": float(bool(_VAGUE_RE.search(text))),
+        # New information counts for more when the profile is missing that field
+        "fills_class": float(has_class and not profile_data.get("class")),
+        "fills_subjects": float(has_subjects and not profile_data.get("subjects")),
+        "fills_career_goal": float(has_career and not profile_data.get("career_goal")),
+    }
+
+def score_message(user_input, profile_data=None):
+    """Return a 0-100 informativeness score, same scale as get_confidence_from_ai."""
+    features = extract_features(user_input, profile_data)
+    weights = _model["weights"]
+    raw = _model["bias"] + sum(weights[name] * value for name, value in features.items())
+    return max(0, min(100, int(round(raw * 100))))
+
+def log_calibration_sample(user_input, profile_data, remote_score):
+    """Append a (features, remote score) pair for later retraining."""
+    try:
+        sample = {"features": extract_features(user_input, profile_data), "score": remote_score}
+        with open(CALIBRATION_FILE, "a", encoding="utf-8") as f:
+            f.write(json.dumps(sample) + "\n")
+    except Exception as e:
+        print(f"⚠️ Error logging confidence calibration sample: {e}")
+
+def _sample_features(sample):
+    """Features of a training sample: labelled messages are re-extracted, logged samples carry their own."""
+    if "message" in sample:
+        return extract_features(sample["message"], sample.get("profile"))
+    return sample["features"]
+
+def fit(samples, l2=0.01):
+    """Ridge least-squares fit of the linear model to 0-100 scored samples (the bias is not penalised)."""
+    import numpy as np
+
+    if not samples:
+        return DEFAULT_MODEL
+    X = np.array([[f[name] for name in FEATURES] + [1.0] for f in map(_sample_features, samples)])
+    y = np.array([sample["score"] / 100.0 for sample in samples])
+    penalty = l2 * len(samples) * np.eye(len(FEATURES) + 1)
+    penalty[-1, -1] = 0.0
+    coef = np.linalg.solve(X.T @ X + penalty, X.T @ y)
+    return {
+        "bias": round(float(coef[-1]), 4),
+        "weights": {name: round(float(w), 4) for name, w in zip(FEATURES, coef[:-1])},
+    }
+
+def train(paths=None, output=MODEL_FILE):
+    """Fit on the labelled set plus any calibration log and save the model next to this module."""
+    global _model
+    if not paths:
+        paths = [p for p in (TRAINING_FILE, CALIBRATION_FILE) if os.path.exists(p)]
+    samples = []
+    for path in paths:
+        with open(path, "r", encoding="utf-8") as f:
+            samples.extend(json.loads(line) for line in f if line.strip())
+    model = fit(samples)
+    with open(output, "w", encoding="utf-8") as f:
+        json.dump(model, f, indent=2)
+    _model = model
+    return model, len(samples)
+
+if __name__ == "__main__":
+    if len(sys.argv) > 1 and sys.argv[1] == "train":
+        model, count = train(sys.argv[2:])
+        print(f"✅ Trained on {count} samples, saved to {MODEL_FILE}")
+    elif len(sys.argv) > 1 and sys.argv[1] == "score":
+        text = " ".join(sys.argv[2:])
+        print(f"{score_message(text)}  {extract_features(text)}")
+    else:
+        print("Usage: python confidence_scorer.py train [samples.jsonl ...] | score <message>")
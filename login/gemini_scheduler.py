@@ -0,0 +1,186 @@
+"""
+Process-wide request scheduler for the Gemini API.
+Each API key gets a token bucket and a shared backoff window that is opened by
+429/503 replies, so concurrent chats wait together instead of retrying into an
+overloaded endpoint. Waiting requests are served round-robin across users.
+With balancing enabled, a request may go out on whichever registered key has
+capacity first.
+"""
+
+import asyncio
+import random
+import re
+import threading
+import time
+from collections import OrderedDict, deque
+from urllib.parse import parse_qs, urlsplit
+
+import requests
+
+_KEY_RE = re.compile(r"([?&]key=)[^&]*")
+
+class SchedulerTimeout(requests.exceptions.RequestException):
+    """No quota became available within the acquire timeout."""
+
+class TokenBucket:
+    def __init__(self, rate_per_minute: float, capacity: int):
+        self.rate = rate_per_minute / 60.0
+        self.capacity = capacity
+        self.tokens = float(capacity)
+        self.updated = time.monotonic()
+
+    def _refill(self, now):
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def wait_time(self, now) -> float:
+        """Seconds until one token is available (0 if available now)."""
+        self._refill(now)
+        return 0.0 if self.tokens >= 1 else (1 - self.tokens) / self.rate
+
+    def take(self, now):
+        self._refill(now)
+        self.tokens -= 1
+
+class _KeyState:
+    def __init__(self, api_key, rate_per_minute, burst):
+        self.api_key = api_key
+        self.bucket = TokenBucket(rate_per_minute, burst)
+        self.backoff_until = 0.0
+        self.failures = 0
+
+class GeminiScheduler:
+    def __init__(self, rate_per_minute: float = 60, burst: int = 10, balance: bool = False,
+                 base_backoff: float = 1.0, max_backoff: float = 30.0, acquire_timeout: float = 60.0):
+        """Initialize the scheduler; keys are registered on first use or with ``register_key``."""
+        self.rate_per_minute = rate_per_minute
+        self.burst = burst
+        self.balance = balance
+        self.base_backoff = base_backoff
+        self.max_backoff = max_backoff
+        self.acquire_timeout = acquire_timeout
+        self._keys = OrderedDict()
+        self._queues = {}  # key group -> OrderedDict(user -> deque of waiting tickets), in round-robin order
+        self._cond = threading.Condition()
+        self._next_ticket = 0
+
+    @staticmethod
+    def api_key_of(url: str) -> str:
+        return parse_qs(urlsplit(url).query).get("key", [""])[0]
+
+    def register_key(self, api_key: str):
+        with self._cond:
+            self._key_state(api_key)
+
+    def _key_state(self, api_key):
+        state = self._keys.get(api_key)
+        if state is None:
+            state = self._keys[api_key] = _KeyState(api_key, self.rate_per_minute, self.burst)
+        return state
+
+    def _candidates(self, api_key):
+        preferred = self._key_state(api_key)
+        if not self.balance:
+            return [preferred]
+        return [preferred] + [s for k, s in self._keys.items() if k != api_key and k]
+
+    def _enqueue(self, url, user_id):
+        user = user_id if user_id is not None else "anonymous"
+        # Requests that can share keys share one line; otherwise each key has its own
+        queues = self._queues.setdefault(None if self.balance else self.api_key_of(url), OrderedDict())
+        ticket = self._next_ticket
+        self._next_ticket += 1
+        queues.setdefault(user, deque()).append(ticket)
+        return queues, user, ticket
+
+    def _try_grant(self, url, queues, user, ticket):
+        """Return (url_to_use, None) if granted, else (None, seconds to wait or None if not at the head)."""
+        # Only the oldest request of the user at the head of the rotation may go
+        if next(iter(queues)) != user or queues[user][0] != ticket:
+            return None, None
+        now = time.monotonic()
+        wait = float("inf")
+        for state in self._candidates(self.api_key_of(url)):
+            state_wait = max(state.backoff_until - time.time(), state.bucket.wait_time(now))
+            if state_wait <= 0:
+                state.bucket.take(now)
+                return _KEY_RE.sub(lambda m: m.group(1) + state.api_key, url), None
+            wait = min(wait, state_wait)
+        return None, wait
+
+    def _dequeue(self, queues, user, ticket):
+        queue = queues.pop(user)
+        queue.remove(ticket)
+        # Rotate: the user goes to the back of the line (or leaves it)
+        if queue:
+            queues[user] = queue
+        self._cond.notify_all()
+
+    def acquire(self, url: str, user_id=None) -> str:
+        """Block until this request may be sent; returns the URL to use (possibly on another key)."""
+        deadline = time.monotonic() + self.acquire_timeout
+        with self._cond:
+            queues, user, ticket = self._enqueue(url, user_id)
+            try:
+                while True:
+                    granted, wait = self._try_grant(url, queues, user, ticket)
+                    if granted:
+                        return granted
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        raise SchedulerTimeout(f"Gemini quota not available within {self.acquire_timeout:.0f}s")
+                    self._cond.wait(min(wait, remaining) if wait is not None else remaining)
+            finally:
+                self._dequeue(queues, user, ticket)
+
+    async def acquire_async(self, url: str, user_id=None, poll_interval: float = 0.05) -> str:
+        """Awaitable acquire for the asyncio client; waits without holding a thread."""
+        deadline = time.monotonic() + self.acquire_timeout
+        with self._cond:
+            queues, user, ticket = self._enqueue(url, user_id)
+        try:
+            while True:
+                with self._cond:
+                    granted, wait = self._try_grant(url, queues, user, ticket)
+                if granted:
+                    return granted
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    raise SchedulerTimeout(f"Gemini quota not available within {self.acquire_timeout:.0f}s")
+                # Threads are woken by the condition; a coroutine behind others in line polls instead
+                await asyncio.sleep(min(wait if wait is not None else poll_interval, remaining))
+        finally:
+            with self._cond:
+                self._dequeue(queues, user, ticket)
+
+    def report(self, url: str, status_code: int, retry_after=None):
+        """Record a response; 429/503 opens a shared backoff window for the key."""
+        with self._cond:
+            state = self._key_state(self.api_key_of(url))
+            if status_code in (429, 503):
+                state.failures += 1
+                delay = min(self.base_backoff * 2 ** (state.failures - 1) + random.uniform(0, 1), self.max_backoff)
+                try:
+                    delay = max(delay, float(retry_after)) if retry_after else delay
+                except ValueError:
+                    pass
+                state.backoff_until = max(state.backoff_until, time.time() + delay)
+                print(f"Gemini overloaded ({status_code}), pausing this key for {delay:.1f}s")
+            elif status_code < 500:
+                state.failures = 0
+            self._cond.notify_all()
+
+    def stats(self) -> dict:
+        now = time.time()
+        with self._cond:
+            return {
+                "waiting": sum(len(q) for queues in self._queues.values() for q in queues.values()),
+                "keys": [
+                    {
+                        "tokens": round(s.bucket.tokens, 2),
+                        "backoff_seconds": max(0, round(s.backoff_until - now, 1)),
+                        "failures": s.failures,
+                    }
+                    for s in self._keys.values()
+                ],
+            }
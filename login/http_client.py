@@ -0,0 +1,57 @@
+"""
+Shared outbound HTTP client.
+Keeps one pooled requests.Session per host so repeated calls to the same API
+reuse keep-alive connections instead of paying a new TCP+TLS handshake each time.
+"""
+
+import os
+import threading
+from urllib.parse import urlsplit
+
+import requests
+from requests.adapters import HTTPAdapter
+
+# Pool sizing and default timeout can be overridden from the environment
+POOL_CONNECTIONS = int(os.environ.get("EDUPATH_HTTP_POOL_CONNECTIONS", 4))
+POOL_MAXSIZE = int(os.environ.get("EDUPATH_HTTP_POOL_MAXSIZE", 16))
+DEFAULT_TIMEOUT = float(os.environ.get("EDUPATH_HTTP_TIMEOUT", 10))
+
+_sessions = {}
+_lock = threading.Lock()
+
+def _host_key(url):
+    parts = urlsplit(url)
+    return f"{parts.scheme}://{parts.netloc}"
+
+def session_for(url):
+    """Return the pooled session for the scheme+host of ``url``, creating it on first use."""
+    key = _host_key(url)
+    session = _sessions.get(key)
+    if session is None:
+        with _lock:
+            session = _sessions.get(key)
+            if session is None:
+                session = requests.Session()
+                adapter = HTTPAdapter(pool_connections=POOL_CONNECTIONS, pool_maxsize=POOL_MAXSIZE)
+                session.mount("http://", adapter)
+                session.mount("https://", adapter)
+                _sessions[key] = session
+    return session
+
+def request(method, url, **kwargs):
+    """Same signature as requests.request, over the shared per-host pool."""
+    kwargs.setdefault("timeout", DEFAULT_TIMEOUT)
+    return session_for(url).request(method, url, **kwargs)
+
+def get(url, **kwargs):
+    return request("GET", url, **kwargs)
+
+def post(url, **kwargs):
+    return request("POST", url, **kwargs)
+
+def close_all():
+    """Close every pooled session (used at shutdown and in scripts)."""
+    with _lock:
+        for session in _sessions.values():
+            session.close()
+        _sessions.clear()
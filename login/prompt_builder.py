@@ -0,0 +1,154 @@
+"""
+Token-budgeted prompt sections for the chat functions.
+Prompts stay roughly constant-size however long a conversation gets: only the
+profile fields a mode actually uses, a rolling per-user summary of older turns
+(kept in ai_chat's chat_summary table) and the last few raw exchanges, each
+trimmed to its own token budget.
+"""
+
+import re
+import ai_chat
+
+# Rough estimate for English text; avoids shipping a tokenizer
+CHARS_PER_TOKEN = 4
+
+# Token budget per prompt section
+BUDGETS = {
+    "profile": 120,
+    "assessment": 120,
+    "summary": 150,
+    "recent": 250,
+    "message": 300,
+}
+
+# Raw exchanges kept verbatim; older ones are folded into the summary
+RECENT_EXCHANGES = 3
+RECENT_USER_TOKENS = 60
+RECENT_AI_TOKENS = 80
+SUMMARY_USER_TOKENS = 25
+SUMMARY_AI_TOKENS = 15
+
+# Profile fields worth sending per chat mode (or prompt section), as (key, label)
+PROFILE_FIELDS = {
+    "ask": [
+        ("class", "Class/Level"),
+        ("subjects", "Favorite Subjects"),
+        ("interests", "Areas of Interest"),
+        ("career_goal", "Career Goal"),
+        ("skills", "Skills & Strengths"),
+        ("city", "Location"),
+        ("top_career_domain", "Top Career Domain"),
+    ],
+    "advise": [
+        ("class", "Class/Level"),
+        ("subjects", "Favorite Subjects"),
+        ("interests", "Areas of Interest"),
+        ("career_goal", "Career Goal"),
+        ("skills", "Skills & Strengths"),
+        ("city", "Location"),
+        ("additional_info", "Additional Info"),
+    ],
+    # Career quiz results, rendered as their own section of the advise prompt
+    "assessment": [
+        ("top_career_domain", "Top Career Domain"),
+        ("career_score", "Domain Score"),
+        ("career_recommendations", "Career Recommendations"),
+        ("competitive_exams", "Recommended Competitive Exams"),
+        ("higher_studies", "Higher Studies Options"),
+    ],
+    "toggle": [
+        ("name", "Name"),
+        ("class", "Class"),
+        ("stream", "Stream"),
+        ("subjects", "Subjects"),
+        ("interests", "Interests"),
+        ("career_goal", "Career Goals"),
+        ("location", "Location"),
+        ("city", "City"),
+    ],
+}
+
+_TAG_RE = re.compile(r"^\[(?:COUNSELING|Dr\. Spark)\]\s*")
+
+def estimate_tokens(text):
+    return (len(text) + CHARS_PER_TOKEN - 1) // CHARS_PER_TOKEN
+
+def truncate_tokens(text, budget, keep="head"):
+    """Trim ``text`` to about ``budget`` tokens at a word boundary; keep="tail" keeps the end."""
+    text = text or ""
+    max_chars = budget * CHARS_PER_TOKEN
+    if len(text) <= max_chars:
+        return text
+    if keep == "tail":
+        cut = text[-max_chars:]
+        space = cut.find(" ")
+        return "…" + (cut[space + 1:] if 0 <= space < 20 else cut)
+    cut = text[:max_chars]
+    space = cut.rfind(" ")
+    return (cut[:space] if space > max_chars - 20 else cut) + "…"
+
+def _compact(text, budget):
+    text = " ".join(_TAG_RE.sub("", text or "").split())
+    return truncate_tokens(text, budget)
+
+def format_profile(profile_data, mode, budget=BUDGETS["profile"]):
+    """Known profile fields for ``mode`` as "- Label: value" lines within the budget."""
+    lines = []
+    used = 0
+    for key, label in PROFILE_FIELDS.get(mode, []):
+        value = (profile_data or {}).get(key)
+        if not value:
+            continue
+        line = f"- {label}: {_compact(str(value), 30)}"
+        used += estimate_tokens(line)
+        if used > budget:
+            break
+        lines.append(line)
+    return "\n".join(lines)
+
+def _summary_line(user_message, ai_response):
+    line = f"- Student: {_compact(user_message, SUMMARY_USER_TOKENS)}"
+    first_sentence = re.split(r"(?<=[.!?])\s", _compact(ai_response, 60), maxsplit=1)[0]
+    if first_sentence:
+        line += f" | Reply: {truncate_tokens(first_sentence, SUMMARY_AI_TOKENS)}"
+    return line
+
+def update_summary(user_id=None, keep_recent=RECENT_EXCHANGES):
+    """Fold exchanges older than the last ``keep_recent`` into the stored summary.
+
+    Returns (summary, recent) where recent holds the raw (id, user_message,
+    ai_response) rows not covered by the summary. Only new rows are read, and
+    the oldest summary lines roll off once the summary exceeds its budget;
+    durable facts live in the profile, not the summary.
+    """
+    summary, last_id = ai_chat.get_chat_summary(user_id=user_id)
+    rows = ai_chat.get_messages_after(last_id, limit=50, user_id=user_id)
+    split = max(len(rows) - keep_recent, 0)
+    to_fold, recent = rows[:split], rows[split:]
+    if to_fold:
+        lines = summary.splitlines() if summary else []
+        lines.extend(_summary_line(u, a) for _, u, a in to_fold)
+        while len(lines) > 1 and estimate_tokens("\n".join(lines)) > BUDGETS["summary"]:
+            lines.pop(0)
+        summary = "\n".join(lines)
+        ai_chat.save_chat_summary(summary, to_fold[-1][0], user_id=user_id)
+    return summary, recent
+
+def conversation_context(user_id=None, user_label="User", ai_label="AI"):
+    """Summary of older turns plus the last few exchanges, within the summary and recent budgets."""
+    summary, recent = update_summary(user_id)
+    recent_text = "\n".join(
+        f"{user_label}: {_compact(u, RECENT_USER_TOKENS)}\n{ai_label}: {_compact(a, RECENT_AI_TOKENS)}"
+        for _, u, a in recent
+    )
+    recent_text = truncate_tokens(recent_text, BUDGETS["recent"], keep="tail")
+    parts = []
+    if summary:
+        parts.append(f"Earlier in the conversation:\n{summary}")
+    if recent_text:
+        parts.append(recent_text)
+    return "\n\n".join(parts)
+
+def user_message(user_input):
+    """The student's message, capped at the message budget."""
+    return truncate_tokens(user_input, BUDGETS["message"])
@@ -0,0 +1,143 @@
+"""
+Concurrent AI provider fan-out.
+Every healthy provider is started at once. The caller gets the answer from the
+most preferred provider that finishes within its own deadline and the global
+deadline. Each provider is passed the time it has left as a ``timeout`` keyword,
+so abandoned calls give up their worker thread at the deadline instead of
+holding it for their own, longer request timeout. Providers that keep failing
+are skipped for a cooldown period.
+"""
+
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+
+class _Provider:
+    def __init__(self, name, fn, priority, deadline):
+        self.name = name
+        self.fn = fn
+        self.priority = priority
+        self.deadline = deadline
+        self.failures = 0
+        self.skip_until = 0.0
+
+class ProviderOrchestrator:
+    def __init__(self, global_deadline: float = 10.0, failure_threshold: int = 2,
+                 base_cooldown: float = 30.0, max_cooldown: float = 600.0, max_workers: int = 8):
+        """Initialize the orchestrator; register providers with ``register``."""
+        self.global_deadline = global_deadline
+        self.failure_threshold = failure_threshold
+        self.base_cooldown = base_cooldown
+        self.max_cooldown = max_cooldown
+        self._providers = []
+        self._lock = threading.Lock()
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="provider")
+
+    def register(self, name: str, fn, priority: int = 0, deadline: float = 10.0):
+        """Add a provider; a lower ``priority`` is preferred.
+
+        ``fn(*args, timeout=seconds, **kwargs)`` returns text or None; it should use
+        ``timeout`` for its outbound request.
+        """
+        self._providers.append(_Provider(name, fn, priority, deadline))
+        self._providers.sort(key=lambda p: p.priority)
+
+    def _get(self, name):
+        return next(p for p in self._providers if p.name == name)
+
+    def is_healthy(self, name: str) -> bool:
+        """False while the provider is in its failure cooldown."""
+        return time.time() >= self._get(name).skip_until
+
+    def record(self, name: str, ok: bool):
+        """Update health; consecutive failures open an exponentially growing cooldown."""
+        provider = self._get(name)
+        with self._lock:
+            if ok:
+                provider.failures = 0
+                provider.skip_until = 0.0
+                return
+            provider.failures += 1
+            if provider.failures >= self.failure_threshold:
+                cooldown = min(self.base_cooldown * 2 ** (provider.failures - self.failure_threshold),
+                               self.max_cooldown)
+                provider.skip_until = time.time() + cooldown
+                print(f"⚠️ Provider {name} failed {provider.failures} times, skipping for {cooldown:.0f}s")
+
+    def call(self, name: str, *args, **kwargs):
+        """Run one provider synchronously with health tracking; None if skipped or failed."""
+        if not self.is_healthy(name):
+            return None
+        provider = self._get(name)
+        try:
+            result = provider.fn(*args, timeout=provider.deadline, **kwargs)
+        except Exception as e:
+            print(f"Provider {name} error: {e}")
+            result = None
+        self.record(name, bool(result))
+        return result
+
+    def _invoke(self, provider, started, args, kwargs):
+        """Worker body: run ``provider`` with whatever is left of its deadline, if anything."""
+        remaining = min(provider.deadline, self.global_deadline) - (time.monotonic() - started)
+        if remaining <= 0:
+            # Queued behind other calls until past the deadline; nobody is waiting for it any more
+            return None
+        return provider.fn(*args, timeout=remaining, **kwargs)
+
+    def _on_done(self, provider, started):
+        def callback(future):
+            if future.cancelled():
+                return
+            ok = (future.exception() is None and bool(future.result())
+                  and time.monotonic() - started <= provider.deadline)
+            if future.exception() is not None:
+                print(f"Provider {provider.name} error: {future.exception()}")
+            self.record(provider.name, ok)
+        return callback
+
+    def run(self, *args, **kwargs):
+        """Fan out to all healthy providers; returns (name, result) or (None, None)."""
+        started = time.monotonic()
+        pending = {}
+        for provider in self._providers:
+            if not self.is_healthy(provider.name):
+                continue
+            future = self._executor.submit(self._invoke, provider, started, args, kwargs)
+            future.add_done_callback(self._on_done(provider, started))
+            pending[future] = provider
+
+        best = None
+        while pending:
+            # Nothing still running can beat the best answer we already have
+            if best is not None and all(p.priority > best.priority for p in pending.values()):
+                break
+            now = time.monotonic()
+            # Stop waiting for providers past their own deadline
+            for future, provider in list(pending.items()):
+                if now - started >= provider.deadline:
+                    future.cancel()
+                    del pending[future]
+            remaining = self.global_deadline - (now - started)
+            if not pending or remaining <= 0:
+                break
+            timeout = min([remaining] + [p.deadline - (now - started) for p in pending.values()])
+            done, _ = wait(pending, timeout=timeout, return_when=FIRST_COMPLETED)
+            for future in done:
+                provider = pending.pop(future)
+                if future.exception() is None and future.result():
+                    if best is None or provider.priority < best.priority:
+                        best, best_result = provider, future.result()
+
+        for future in pending:
+            future.cancel()
+        if best is None:
+            return None, None
+        return best.name, best_result
+
+    def stats(self) -> dict:
+        now = time.time()
+        return {
+            p.name: {"failures": p.failures, "skipped_for": max(0, round(p.skip_until - now))}
+            for p in self._providers
+        }
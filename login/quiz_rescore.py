@@ -0,0 +1,171 @@
+#!/usr/bin/env python3
+"""
+Career Assessment Re-scoring
+Recomputes every stored result in career_test_results after the quiz weights
+(career_quiz.json) or the domain -> profile mappings (quiz_scoring) change,
+rewrites each user's quiz-derived profile fields from their latest result
+(leaving fields the user has since edited alone), and reports the domain
+distribution of the cohort. Results are streamed in chunks, scored vectorised
+in a process pool and written back one transaction per chunk.
+"""
+
+import json
+import os
+import sys
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+import ai_chat
+import quiz_scoring
+
+CHUNK_SIZE = int(os.environ.get("EDUPATH_RESCORE_CHUNK_SIZE", 1000))
+WORKERS = int(os.environ.get("EDUPATH_RESCORE_WORKERS", os.cpu_count() or 1))
+
+def score_chunk(rows):
+    """Score one chunk of (id, user_id, responses, domain_scores, top_careers) rows; runs in a worker process.
+
+    Returns (id, user_id, result, previous_fields) for every row that could be
+    scored: rows with raw responses are scored together in one matmul, older
+    rows without them are re-ranked from their stored domain scores.
+    previous_fields are the profile fields the stored result implied.
+    """
+    scorer = quiz_scoring.get_scorer()
+    previous = {
+        rid: quiz_scoring.profile_fields({"top_careers": json.loads(top_careers) if top_careers else []})
+        for rid, _, _, _, top_careers in rows
+    }
+    with_responses = [(r[0], r[1], json.loads(r[2])) for r in rows if r[2]]
+    scored = []
+    if with_responses:
+        results = scorer.score_submissions([responses for _, _, responses in with_responses])
+        scored.extend((rid, uid, result, previous[rid]) for (rid, uid, _), result in zip(with_responses, results))
+    for rid, uid, responses, domain_scores, _ in rows:
+        if not responses and domain_scores:
+            scored.append((rid, uid, scorer.rank_domain_scores(json.loads(domain_scores)), previous[rid]))
+    return scored
+
+class CohortReport:
+    """Running domain statistics over scored results."""
+
+    def __init__(self, domains):
+        self.domains = domains
+        self.count = 0
+        self.score_sums = np.zeros(len(domains))
+        self.top_counts = np.zeros(len(domains), dtype=int)
+
+    def add(self, results):
+        if not results:
+            return
+        scores = np.array([[r["domain_scores"][d] for d in self.domains] for r in results], dtype=float)
+        self.count += len(results)
+        self.score_sums += scores.sum(axis=0)
+        top = np.array([self.domains.index(r["top_careers"][0]["domain"]) for r in results if r["top_careers"]])
+        self.top_counts += np.bincount(top, minlength=len(self.domains))
+
+    def print(self):
+        print(f"\n📊 Domain distribution over {self.count} users:")
+        if not self.count:
+            return
+        means = self.score_sums / self.count
+        for i in np.argsort(-self.top_counts, kind="stable"):
+            share = 100 * self.top_counts[i] / self.count
+            print(f"  {self.domains[i]:<12} top for {self.top_counts[i]:>6} ({share:5.1f}%)   mean score {means[i]:6.2f}")
+
+def _scored_chunks(workers, chunk_size):
+    chunks = ai_chat.iter_career_test_chunks(chunk_size)
+    if workers <= 1:
+        for rows in chunks:
+            yield score_chunk(rows)
+        return
+    # Executor.map would read every chunk up front; keep only a couple per worker in flight
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        pending = deque()
+        for rows in chunks:
+            pending.append(pool.submit(score_chunk, rows))
+            if len(pending) >= 2 * workers:
+                yield pending.popleft().result()
+        while pending:
+            yield pending.popleft().result()
+
+def rescore(workers=WORKERS, chunk_size=CHUNK_SIZE, dry_run=False):
+    """Re-score every stored result and refresh profiles from each user's latest one."""
+    latest_ids = ai_chat.get_latest_career_test_ids()
+    report = CohortReport(quiz_scoring.get_scorer().domains)
+    rescored = profiles = 0
+    for scored in _scored_chunks(workers, chunk_size):
+        latest = [(uid, result, old) for rid, uid, result, old in scored if rid in latest_ids]
+        report.add([result for _, result, _ in latest])
+        rescored += len(scored)
+        if dry_run:
+            continue
+        score_rows = [
+            (rid, result["domain_scores"], result["top_careers"], result["total_score"])
+            for rid, _, result, _ in scored
+        ]
+        # The anonymous user (0) has no profile to update
+        profile_rows = [
+            (uid, key, value, old.get(key))
+            for uid, result, old in latest if uid
+            for key, value in quiz_scoring.profile_fields(result).items()
+        ]
+        profiles += len(ai_chat.apply_career_test_rescore(score_rows, profile_rows))
+    action = "Would re-score" if dry_run else "Re-scored"
+    print(f"✅ {action} {rescored} assessment results (weights {quiz_scoring.get_scorer().version}); "
+          f"updated {profiles} user profiles")
+    report.print()
+    return rescored
+
+def main():
+    """Main function to handle command line arguments."""
+    if len(sys.argv) < 2:
+        print_help()
+        return
+
+    command = sys.argv[1].lower()
+    if command == 'help':
+        print_help()
+        return
+
+    # An optional trailing *.db argument selects which database to use
+    args = sys.argv[2:]
+    db_paths = [a for a in args if a.endswith('.db')]
+    args = [a for a in args if not a.endswith('.db')]
+    if db_paths:
+        ai_chat.DB_PATH = db_paths[0]
+    ai_chat.init_db()
+
+    if command == 'run':
+        workers = int(args[0]) if len(args) > 0 else WORKERS
+        chunk_size = int(args[1]) if len(args) > 1 else CHUNK_SIZE
+        rescore(workers, chunk_size)
+
+    elif command == 'report':
+        rescore(workers=1, dry_run=True)
+
+    else:
+        print(f"❌ Unknown command: {command}")
+        print_help()
+
+def print_help():
+    """Print help information."""
+    print(f"""
+🎯 Career Assessment Re-scoring
+
+Usage: python quiz_rescore.py <command> [arguments] [path/to/ai_chat.db]
+
+Commands:
+  run [workers] [chunk_size]   Re-score all stored results and update user profiles
+                               (defaults: {WORKERS} workers, {CHUNK_SIZE} rows per chunk)
+  report                       Show the domain distribution without writing anything
+  help                         Show this help message
+
+Examples:
+  python quiz_rescore.py report
+  python quiz_rescore.py run 8 2000
+  python quiz_rescore.py run 1 ../ai_chat.db
+""")
+
+if __name__ == '__main__':
+    main()
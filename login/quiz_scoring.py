@@ -0,0 +1,203 @@
+"""
+Server-side scoring for the career assessment.
+The question bank is turned once into a question x domain weight matrix, so a
+submission is one matrix-vector product, a batch of submissions is one matmul,
+and the top domains come from argpartition. Only questions in the bank count,
+each at most once, so a submission cannot inflate a domain with made-up or
+repeated answers.
+"""
+
+import hashlib
+import json
+import os
+
+import numpy as np
+
+QUIZ_DATA_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "career_quiz.json")
+
+MIN_RATING, MAX_RATING = 1, 5
+TOP_K = 3
+
+# Profile fields derived from the top domain (see profile_fields)
+DOMAIN_TO_SUBJECTS = {
+    'Engineering': 'Mathematics, Physics, Computer Science',
+    'Medical': 'Biology, Chemistry, Physics',
+    'Business': 'Commerce, Economics, Mathematics',
+    'Arts': 'Literature, Fine Arts, Creative Writing',
+    'Science': 'Physics, Chemistry, Biology, Mathematics',
+    'Education': 'Psychology, Sociology, Subject specialization',
+    'Law': 'Political Science, History, Economics',
+    'Finance': 'Mathematics, Economics, Accounting'
+}
+
+DOMAIN_TO_CLASS = {
+    'Engineering': '11th/12th PCM',
+    'Medical': '11th/12th PCB',
+    'Business': '11th/12th Commerce',
+    'Arts': '11th/12th Arts',
+    'Science': '11th/12th Science',
+    'Education': '11th/12th (Any stream)',
+    'Law': '11th/12th (Any stream)',
+    'Finance': '11th/12th Commerce/Science'
+}
+
+class QuizScorer:
+    def __init__(self, questions, career_paths):
+        """Build the weight matrix from ``questions`` ({question, domain, weights?}) and ``career_paths``."""
+        self.domains = list(career_paths)
+        self.career_paths = career_paths
+        self.domain_index = {d: i for i, d in enumerate(self.domains)}
+        self.question_index = {q["question"]: i for i, q in enumerate(questions)}
+
+        n_questions, n_domains = len(questions), len(self.domains)
+        weights = np.zeros((n_questions, n_domains))
+        for i, q in enumerate(questions):
+            for domain, weight in (q.get("weights") or {q["domain"]: 1.0}).items():
+                weights[i, self.domain_index[domain]] = weight
+        self.weights = weights
+        # Identifies the weights a stored score was computed with, for re-scoring
+        self.version = hashlib.sha1(weights.tobytes()).hexdigest()[:12]
+
+    def vectorize(self, responses, out=None):
+        """Response vector for one submission: [{question, domain, rating}, ...] or {question: rating}.
+
+        Questions outside the bank are ignored and a repeated question keeps
+        its first rating.
+        """
+        x = np.zeros(self.weights.shape[0]) if out is None else out
+        items = responses.items() if isinstance(responses, dict) else (
+            (r.get("question"), r.get("rating")) for r in responses or [] if isinstance(r, dict))
+        for question, rating in items:
+            row = self.question_index.get(question) if isinstance(question, str) else None
+            # Ratings are clamped to >= MIN_RATING, so a non-zero entry means already answered
+            if row is None or x[row]:
+                continue
+            try:
+                rating = float(rating)
+            except (TypeError, ValueError):
+                continue
+            if rating == rating:  # skip NaN
+                x[row] = min(max(rating, MIN_RATING), MAX_RATING)
+        return x
+
+    def vectorize_batch(self, submissions):
+        X = np.zeros((len(submissions), self.weights.shape[0]))
+        for i, responses in enumerate(submissions):
+            self.vectorize(responses, out=X[i])
+        return X
+
+    def score(self, x):
+        """Domain scores for one response vector."""
+        return x @ self.weights
+
+    def score_batch(self, X):
+        """Domain scores for a (submissions x questions) matrix in one matmul."""
+        return X @ self.weights
+
+    def top_k(self, scores, k=TOP_K):
+        """Indices of the ``k`` best domains per row, best first; ties keep domain order like the quiz page."""
+        scores = np.atleast_2d(scores)
+        k = min(k, scores.shape[1])
+        top = np.argpartition(-scores, k - 1, axis=1)[:, :k]
+        kth = np.take_along_axis(scores, top, axis=1).min(axis=1, keepdims=True)
+        # argpartition cuts ties at the k-th score arbitrarily; keep the lowest-index tied domains instead
+        above = scores > kth
+        tied = scores == kth
+        needed = k - above.sum(axis=1, keepdims=True)
+        selected = above | (tied & (np.cumsum(tied, axis=1) <= needed))
+        top = np.nonzero(selected)[1].reshape(len(scores), k)
+        top_scores = np.take_along_axis(scores, top, axis=1)
+        order = np.lexsort((top, -top_scores), axis=1)
+        return np.take_along_axis(top, order, axis=1)
+
+    def results(self, scores, top):
+        """Result dict for one row of scores and its top-k indices, in the shape the quiz page saves."""
+        domain_scores = {d: _number(scores[i]) for i, d in enumerate(self.domains)}
+        top_careers = []
+        for i in top:
+            domain = self.domains[i]
+            path = self.career_paths[domain]
+            top_careers.append({
+                "domain": domain,
+                "score": domain_scores[domain],
+                "careers": path["careers"],
+                "competitive_exams": path["competitive_exams"],
+                "higher_studies": path["higher_studies"],
+                "pathways": path["pathways"],
+            })
+        return {
+            "domain_scores": domain_scores,
+            "top_careers": top_careers,
+            "total_score": _number(scores.sum()),
+            "scoring_version": self.version,
+        }
+
+    def score_submission(self, responses, k=TOP_K):
+        scores = self.score(self.vectorize(responses))
+        return self.results(scores, self.top_k(scores, k)[0])
+
+    def score_submissions(self, submissions, k=TOP_K):
+        scores = self.score_batch(self.vectorize_batch(submissions))
+        top = self.top_k(scores, k)
+        return [self.results(row, row_top) for row, row_top in zip(scores, top)]
+
+    def rank_domain_scores(self, domain_scores, k=TOP_K):
+        """Top-k results for precomputed {domain: score} (stored results saved without responses)."""
+        scores = np.array([float(domain_scores.get(d) or 0) for d in self.domains])
+        return self.results(scores, self.top_k(scores, k)[0])
+
+def profile_fields(quiz_results):
+    """User profile fields (key -> value) implied by scored quiz results; {} without top careers."""
+    top_careers = quiz_results.get('top_careers') or []
+    if not top_careers:
+        return {}
+    # Get the top career domain and details
+    top_career = top_careers[0]
+    career_domain = top_career['domain']
+    career_options = top_career.get('careers', [])
+    
+    # Store all career recommendations for reference
+    career_summary = "Top 3 Career Domains: "
+    for i, career in enumerate(top_careers[:3]):
+        career_summary += f"{i+1}. {career['domain']} (Score: {career['score']}) "
+    
+    return {
+        'career_quiz_completed': 'true',
+        'top_career_domain': career_domain,
+        'career_score': str(top_career['score']),
+        'career_goal': f"{career_domain} field - {', '.join(career_options[:3])}",
+        'subjects': DOMAIN_TO_SUBJECTS.get(career_domain, 'Not specified'),
+        'interests': f"{career_domain}, {', '.join(career_options[:2])}",
+        'class': DOMAIN_TO_CLASS.get(career_domain, 'High School'),
+        'competitive_exams': ', '.join(top_career.get('competitive_exams', [])[:3]),
+        'higher_studies': ', '.join(top_career.get('higher_studies', [])[:3]),
+        'career_recommendations': career_summary,
+    }
+
+def _number(value):
+    value = float(value)
+    return int(value) if value.is_integer() else round(value, 2)
+
+def load_scorer(path=QUIZ_DATA_PATH):
+    with open(path, encoding="utf-8") as f:
+        data = json.load(f)
+    return QuizScorer(data["questions"], data["career_paths"])
+
+_scorer = None
+
+def get_scorer():
+    """Shared scorer built from career_quiz.json on first use."""
+    global _scorer
+    if _scorer is None:
+        _scorer = load_scorer()
+    return _scorer
+
+def score_quiz_results(quiz_results):
+    """Recompute domain scores and top careers server-side.
+
+    Only the raw ``responses`` are scored; submitted ``domain_scores`` are never
+    trusted. Returns None if the submission has no responses.
+    """
+    if not quiz_results.get("responses"):
+        return None
+    return get_scorer().score_submission(quiz_results["responses"])
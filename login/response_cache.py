@@ -0,0 +1,195 @@
+"""
+Semantic response cache for chat replies.
+Near-identical questions ("what after 12th PCB", "JEE preparation tips") from students
+with the same class, subjects and career domain are answered from memory instead of
+another LLM call. Replies are stored with the asking student's personal details (name,
+city, interests...) replaced by placeholders and filled in for the next student, and
+only opening questions are cached: mid-conversation replies depend on the history.
+Similarity uses a local TF-IDF vector over words and character trigrams, so it works offline.
+"""
+
+import math
+import os
+import re
+import threading
+import time
+from collections import Counter, OrderedDict
+
+_WORD_RE = re.compile(r"[a-z0-9]+")
+
+# Common chat filler that says nothing about the question
+_STOPWORDS = {
+    "a", "an", "the", "is", "are", "am", "i", "me", "my", "to", "for", "of", "in", "on", "and", "or",
+    "what", "which", "how", "can", "should", "do", "does", "please", "tell", "about", "after", "you",
+}
+
+# Profile fields that decide which students may share a reply (with the career domain)
+_BUCKET_FIELDS = ("class", "subjects")
+# Profile fields that are never quoted back as personal details
+_NON_PERSONAL_FIELDS = {"confidence", "lat", "lng", "career_quiz_completed", "career_score"}
+# Fields whose presence changes what ask-mode replies ask for
+_ASKED_FIELDS = ("class", "subjects", "interests", "career_goal", "skills", "city")
+# Shorter values ("IT", "12") are too likely to occur as ordinary words
+_MIN_PERSONAL_VALUE = 3
+_PLACEHOLDER_RE = re.compile("\x00([^\x00]+)\x00")
+
+class ResponseCache:
+    def __init__(self, ttl_seconds: float = 24 * 3600, max_entries: int = 1000,
+                 threshold: float = 0.85, min_words: int = 3):
+        """Initialize the cache; entries expire after ``ttl_seconds`` and are evicted LRU-first."""
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self.threshold = threshold
+        self.min_words = min_words
+        self._entries = OrderedDict()  # key -> (bucket, vector, template, created_at)
+        self._df = Counter()  # document frequency of each feature across cached prompts
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def normalize(text: str) -> str:
+        """Lowercase, drop punctuation and collapse whitespace."""
+        return " ".join(_WORD_RE.findall((text or "").lower()))
+
+    @staticmethod
+    def _features(normalized: str) -> Counter:
+        words = [w for w in normalized.split() if w not in _STOPWORDS] or normalized.split()
+        features = Counter(f"w:{w}" for w in words)
+        features.update(f"b:{a}_{b}" for a, b in zip(words, words[1:]))
+        # Character trigrams make "prep"/"preparation" and typos overlap
+        for w in words:
+            padded = f" {w} "
+            features.update(f"c:{padded[i:i + 3]}" for i in range(len(padded) - 2))
+        return features
+
+    def _vectorize(self, features: Counter) -> dict:
+        n_docs = len(self._entries) + 1
+        vector = {
+            f: (1 + math.log(tf)) * (math.log((1 + n_docs) / (1 + self._df.get(f, 0))) + 1)
+            for f, tf in features.items()
+        }
+        norm = math.sqrt(sum(v * v for v in vector.values())) or 1.0
+        return {f: v / norm for f, v in vector.items()}
+
+    @staticmethod
+    def _cosine(a: dict, b: dict) -> float:
+        if len(a) > len(b):
+            a, b = b, a
+        return sum(v * b.get(f, 0.0) for f, v in a.items())
+
+    @staticmethod
+    def profile_bucket(profile_data: dict, mode: str = "") -> tuple:
+        """Coarse key (mode, class, subjects, career domain, filled fields); only prompts in one bucket are compared.
+
+        The career goal stands in for the domain until the quiz sets one, and the
+        filled-in fields matter because ask-mode replies ask for the missing ones.
+        """
+        profile_data = profile_data or {}
+        domain = profile_data.get("top_career_domain") or profile_data.get("career_goal")
+        fields = [ResponseCache.normalize(str(profile_data.get(key) or "")) for key in _BUCKET_FIELDS]
+        filled = tuple(key for key in _ASKED_FIELDS if profile_data.get(key))
+        return (mode, *fields, ResponseCache.normalize(str(domain or "")), filled)
+
+    @staticmethod
+    def _personal_values(profile_data: dict) -> list:
+        """(field, value) pairs that may be quoted in a reply, longest value first."""
+        values = [
+            (key, str(value).strip()) for key, value in (profile_data or {}).items()
+            if key not in _NON_PERSONAL_FIELDS and value and len(str(value).strip()) >= _MIN_PERSONAL_VALUE
+        ]
+        return sorted(values, key=lambda kv: -len(kv[1]))
+
+    @classmethod
+    def generalize(cls, response: str, profile_data: dict) -> str:
+        """Replace the student's own profile values in a reply with placeholders."""
+        for key, value in cls._personal_values(profile_data):
+            response = re.sub(re.escape(value), f"\x00{key}\x00", response, flags=re.IGNORECASE)
+        return response
+
+    @staticmethod
+    def personalize(template: str, profile_data: dict):
+        """Fill a generalized reply with this student's values; None if one of them is missing."""
+        profile_data = profile_data or {}
+        if any(not profile_data.get(key) for key in _PLACEHOLDER_RE.findall(template)):
+            return None
+        return _PLACEHOLDER_RE.sub(lambda m: str(profile_data[m.group(1)]).strip(), template)
+
+    def lookup(self, prompt: str, profile_data: dict = None, mode: str = "", context: str = ""):
+        """Return the cached reply for the most similar prompt above the threshold, or None.
+
+        Nothing is served when ``context`` (the conversation so far) is non-empty.
+        """
+        normalized = self.normalize(prompt)
+        if context or len(normalized.split()) < self.min_words:
+            return None
+        bucket = self.profile_bucket(profile_data, mode)
+        now = time.time()
+        with self._lock:
+            vector = self._vectorize(self._features(normalized))
+            best_key, best_score, best_reply = None, 0.0, None
+            for key, (entry_bucket, entry_vector, template, created_at) in list(self._entries.items()):
+                if now - created_at > self.ttl_seconds:
+                    self._remove(key)
+                    continue
+                if entry_bucket != bucket:
+                    continue
+                score = self._cosine(vector, entry_vector)
+                if score > best_score and score >= self.threshold:
+                    reply = self.personalize(template, profile_data)
+                    if reply is not None:
+                        best_key, best_score, best_reply = key, score, reply
+            if best_key is not None:
+                self._entries.move_to_end(best_key)
+                self.hits += 1
+                return best_reply
+            self.misses += 1
+            return None
+
+    def store(self, prompt: str, response: str, profile_data: dict = None, mode: str = "", context: str = ""):
+        """Cache a reply for a prompt; short messages and mid-conversation replies are not cached."""
+        normalized = self.normalize(prompt)
+        if context or len(normalized.split()) < self.min_words or not response:
+            return
+        bucket = self.profile_bucket(profile_data, mode)
+        key = (bucket, normalized)
+        with self._lock:
+            if key in self._entries:
+                self._remove(key)
+            features = self._features(normalized)
+            self._df.update(features.keys())
+            self._entries[key] = (bucket, self._vectorize(features), self.generalize(response, profile_data), time.time())
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._remove(next(iter(self._entries)))
+
+    def _remove(self, key):
+        bucket, vector, _, _ = self._entries.pop(key)
+        for feature in vector:
+            self._df[feature] -= 1
+            if self._df[feature] <= 0:
+                del self._df[feature]
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._df.clear()
+
+    def stats(self) -> dict:
+        return {"entries": len(self._entries), "hits": self.hits, "misses": self.misses}
+
+
+# Shared instance used by the chat functions; EDUPATH_RESPONSE_CACHE=0 turns it off
+ENABLED = os.environ.get("EDUPATH_RESPONSE_CACHE", "1") != "0"
+response_cache = ResponseCache(
+    ttl_seconds=float(os.environ.get("EDUPATH_RESPONSE_CACHE_TTL", 24 * 3600)),
+    max_entries=int(os.environ.get("EDUPATH_RESPONSE_CACHE_SIZE", 1000)),
+    threshold=float(os.environ.get("EDUPATH_RESPONSE_CACHE_THRESHOLD", 0.85)),
+)
+
+def lookup(prompt, profile_data=None, mode="", context=""):
+    return response_cache.lookup(prompt, profile_data, mode, context) if ENABLED else None
+
+def store(prompt, response, profile_data=None, mode="", context=""):
+    if ENABLED:
+        response_cache.store(prompt, response, profile_data, mode, context)
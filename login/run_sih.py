@@ -1,5 +1,6 @@
 import ai_chat
 import SIH_01
+import async_chat
 
 ai_chat.init_db()
 
@@ -9,8 +10,10 @@ def process_chat_message(message, user_id=None, quiz_results=None):
     This function can be called from the Flask app.
     """
     try:
-        # Call the main AI function with quiz results
-        response = SIH_01.Talk_Chat(message, user_id=user_id, quiz_results=quiz_results)
+        # Call the main AI function with quiz results; retries wait on the shared event loop
+        response = async_chat.run_sync(
+            async_chat.Talk_Chat_async(message, user_id=user_id, quiz_results=quiz_results)
+        )
         return response
     except Exception as e:
         return f"Sorry, I encountered an error: {str(e)}"
@@ -0,0 +1,55 @@
+#!/usr/bin/env python3
+"""
+Test that StreamCleaner produces exactly what clean_and_shorten does,
+however the reply is split into streamed chunks
+"""
+
+import os
+import random
+import tempfile
+
+import ai_chat
+
+# SIH_01 initialises the chat database on import; keep the real one untouched
+ai_chat.DB_PATH = os.path.join(tempfile.mkdtemp(), "ai_chat.db")
+
+from SIH_01 import StreamCleaner, clean_and_shorten
+
+# Weighted towards the characters the cleaning rules care about
+ALPHABET = ["a", "b", "Z", "x", "Q"] * 6 + [" "] * 8 + ["  ", "\t", "\n", "\n\n", "*", "**", ".", ":", "\r", "\xa0"]
+
+def random_reply(rng):
+    return "".join(rng.choice(ALPHABET) for _ in range(rng.randint(0, 400)))
+
+def random_chunks(rng, text):
+    chunks, i = [], 0
+    while i < len(text):
+        size = rng.randint(1, 120)
+        chunks.append(text[i:i + size])
+        i += size
+    return chunks
+
+def stream(chunks):
+    cleaner = StreamCleaner()
+    return "".join(cleaner.feed(chunk) for chunk in chunks) + cleaner.finish()
+
+def test_stream_cleaner_matches_clean_and_shorten(cases=5000, seed=1234):
+    """Random replies, random chunkings: streamed output must equal the one-shot clean"""
+    rng = random.Random(seed)
+    for _ in range(cases):
+        text = random_reply(rng)
+        chunks = random_chunks(rng, text)
+        assert stream(chunks) == clean_and_shorten(text), (text, chunks)
+
+def test_whitespace_across_partial_flush():
+    """A space run split by a partial flush of a long line collapses to one space"""
+    text = "word " * 20 + "  \t  next line ends with spaces   \n\n\n  second paragraph  "
+    for size in range(1, 40):
+        chunks = [text[i:i + size] for i in range(0, len(text), size)]
+        assert stream(chunks) == clean_and_shorten(text)
+
+if __name__ == "__main__":
+    print("🧪 Testing StreamCleaner against clean_and_shorten...")
+    test_whitespace_across_partial_flush()
+    test_stream_cleaner_matches_clean_and_shorten()
+    print("✅ Streamed output matches clean_and_shorten")
@@ -12,6 +12,11 @@ CORS(app)  # Enable CORS for all routes
 locator = CollegeLocator()
 cache = CollegeCache()
 
+@app.route('/healthz')
+def healthz():
+    """Cheap readiness probe for the launcher"""
+    return jsonify({'status': 'ok'})
+
 @app.route('/')
 def index():
     """Serve the main HTML page"""
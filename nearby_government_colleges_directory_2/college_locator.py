@@ -3,9 +3,14 @@ import folium
 from geopy.geocoders import Nominatim
 import json
 import os
+import sys
 import webbrowser
 from typing import List, Dict, Optional, Tuple
 
+# The shared HTTP session pool lives with the main app in login/
+sys.path.append(os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'login'))
+import http_client
+
 class CollegeLocator:
     def __init__(self):
         self.geolocator = Nominatim(user_agent="college_locator")
@@ -64,7 +69,7 @@ class CollegeLocator:
         last_error = None
         for base_url in self.overpass_mirrors:
             try:
-                response = requests.get(base_url, params={'data': query}, timeout=timeout_seconds)
+                response = http_client.get(base_url, params={'data': query}, timeout=timeout_seconds)
                 response.raise_for_status()
                 return response.json()
             except Exception as error:
@@ -307,7 +312,7 @@ class CollegeLocator:
         
         for url, parser in services:
             try:
-                response = requests.get(url, timeout=3)  # Reduced from 10 to 3 seconds
+                response = http_client.get(url, timeout=3)  # Reduced from 10 to 3 seconds
                 if response.status_code == 200:
                     data = response.json()
                     result = parser(data)
@@ -583,7 +588,7 @@ class CollegeLocator:
             out center;
             """
             print("Trying fallback search...")
-            response = requests.get(self.overpass_url, params={'data': query}, timeout=30)
+            response = http_client.get(self.overpass_url, params={'data': query}, timeout=30)
             response.raise_for_status()
             data = response.json()
 
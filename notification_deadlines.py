@@ -0,0 +1,117 @@
+"""
+Deadline-indexed rendering of notifications.
+Notifications are stored with their deadline; the "days left" text, escalated
+priority and expiry are derived from it when rendered. A min-heap holds the
+next moment each notification's rendering changes, so only those items are
+re-rendered and the scheduler can sleep until exactly then.
+
+Notification fields used here:
+    deadline  - 'YYYY-MM-DD' (or an ISO datetime); no deadline means never changes
+    message   - may contain "{days_left}"
+    escalate  - optional [[days, priority], ...]: use ``priority`` once days_left <= days
+"""
+
+import datetime
+import heapq
+import math
+import time
+from bisect import bisect_left, insort
+
+from notification_sources import sort_key
+
+DAY = 86400
+
+_DATE_FORMATS = ('%Y-%m-%d', '%d-%m-%Y', '%Y-%m-%d %H:%M:%S')
+
+def parse_deadline(value):
+    """Deadline as a Unix timestamp, or None if missing or unparseable."""
+    if not value:
+        return None
+    for fmt in _DATE_FORMATS:
+        try:
+            return datetime.datetime.strptime(value, fmt).timestamp()
+        except ValueError:
+            continue
+    try:
+        return datetime.datetime.fromisoformat(value).timestamp()
+    except ValueError:
+        return None
+
+class DeadlineIndex:
+    def __init__(self):
+        self._specs = {}       # id -> (notification as stored, deadline timestamp or None)
+        self._rendered = {}    # id -> notification as served; expired ones are absent
+        self._keys = {}        # id -> sort key of the rendered notification
+        self._order = []       # sort keys, kept sorted
+        self._heap = []        # (when, generation, id): next change of each rendered notification
+        self._generation = {}  # id -> generation; older heap entries are stale
+
+    def _unrender(self, nid):
+        key = self._keys.pop(nid, None)
+        if key is not None:
+            del self._order[bisect_left(self._order, key)]
+            del self._rendered[nid]
+
+    def _render(self, nid, now):
+        """Re-derive one notification at ``now`` and schedule its next change."""
+        self._unrender(nid)
+        generation = self._generation[nid] = self._generation.get(nid, 0) + 1
+        spec, deadline = self._specs[nid]
+        notification = {k: v for k, v in spec.items() if k != 'escalate'}
+        if deadline is not None:
+            # Whole days left; drops by one at the instant the deadline is exactly that many days away
+            days_left = math.ceil((deadline - now) / DAY) - 1
+            # Shown while at least one whole day is left, as the generators always did
+            if days_left < 1:
+                return
+            notification['days_left'] = days_left
+            notification['message'] = notification.get('message', '').replace('{days_left}', str(days_left))
+            for days, priority in sorted(spec.get('escalate') or []):
+                if days_left <= days:
+                    notification['priority'] = priority
+                    break
+            # days_left (and so text, priority or expiry) next changes at that instant
+            heapq.heappush(self._heap, (deadline - days_left * DAY, generation, nid))
+        key = sort_key(notification)
+        insort(self._order, key)
+        self._keys[nid] = key
+        self._rendered[nid] = notification
+
+    def load(self, notifications, now=None):
+        """Replace the indexed set; only new or changed notifications are re-rendered. True if anything changed."""
+        now = time.time() if now is None else now
+        new = {n['id']: n for n in notifications}
+        changed = False
+        for nid in self._specs.keys() - new.keys():
+            changed = changed or nid in self._rendered
+            self._unrender(nid)
+            del self._specs[nid]
+            self._generation.pop(nid, None)
+        for nid, spec in new.items():
+            if nid in self._specs and self._specs[nid][0] == spec:
+                continue
+            self._specs[nid] = (spec, parse_deadline(spec.get('deadline')))
+            self._render(nid, now)
+            changed = True
+        return changed
+
+    def advance(self, now=None):
+        """Re-render notifications whose next change is due; True if anything changed."""
+        now = time.time() if now is None else now
+        changed = False
+        while self._heap and self._heap[0][0] <= now:
+            _, generation, nid = heapq.heappop(self._heap)
+            if self._generation.get(nid) != generation:
+                continue
+            self._render(nid, now)
+            changed = True
+        return changed
+
+    def next_change(self):
+        """Timestamp of the next scheduled change, or None."""
+        while self._heap and self._generation.get(self._heap[0][2]) != self._heap[0][1]:
+            heapq.heappop(self._heap)
+        return self._heap[0][0] if self._heap else None
+
+    def notifications(self):
+        return [self._rendered[nid] for _, nid in self._order]
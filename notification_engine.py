@@ -0,0 +1,390 @@
+"""
+Shared notification engine for the main app and the live notifications API.
+One process at a time holds a lease in the notifications database and runs the
+refresh schedule; the merged list is stored there as a versioned snapshot.
+Every process follows that snapshot with a cheap version check and serves it
+from an in-memory cache with precomputed views and its own SSE channel.
+Snapshots hold deadlines rather than "days left" text, so they only change
+when a source does; each process re-renders items from its deadline index at
+the moment their text, priority or expiry changes.
+"""
+
+import datetime
+import json
+import os
+import socket
+import sqlite3
+import threading
+import time
+import uuid
+
+from notification_deadlines import DeadlineIndex
+from notification_events import NotificationEvents, build_views
+from notification_sources import NotificationIngestor, FunctionSource, load_sources
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+
+# Runtime data lives under instance/ (git-ignored), not next to the code
+DB_PATH = os.environ.get('EDUPATH_NOTIFICATIONS_DB', os.path.join(BASE_DIR, 'instance', 'notifications.db'))
+# Built-in generators plus any file/HTTP/feed sources listed in the sources config
+SOURCES_CONFIG = os.environ.get('EDUPATH_NOTIFICATION_SOURCES', os.path.join(BASE_DIR, 'notification_sources.json'))
+# How often the lease holder refetches the sources, and how often every process checks for a new snapshot
+REFRESH_INTERVAL = float(os.environ.get('EDUPATH_NOTIFICATION_REFRESH', 1800))
+SYNC_INTERVAL = float(os.environ.get('EDUPATH_NOTIFICATION_SYNC', 5))
+
+def get_live_exam_data():
+    """Fetch live exam data from various sources"""
+    notifications = []
+    
+    # Real exam data with actual dates
+    current_year = datetime.datetime.now().year
+    
+    # JEE Main data
+    jee_main_dates = {
+        'registration_start': f"{current_year}-12-01",
+        'registration_end': f"{current_year}-12-30",
+        'exam_date': f"{current_year + 1}-01-24"
+    }
+    
+    # Days left, urgency and expiry are derived from the deadline when rendered (see notification_deadlines)
+    reg_end = datetime.datetime.strptime(jee_main_dates['registration_end'], '%Y-%m-%d')
+    notifications.append({
+        'id': 'jee_main_2024',
+        'title': f'JEE Main {current_year + 1} Registration',
+        'message': f'Registration closes in {{days_left}} days on {reg_end.strftime("%B %d, %Y")}. Apply now!',
+        'date': '2 hours ago',
+        'category': 'exams',
+        'priority': 'high',
+        'escalate': [[7, 'urgent']],
+        'read': False,
+        'deadline': jee_main_dates['registration_end']
+    })
+    
+    # NEET data
+    neet_exam_date = datetime.datetime(current_year + 1, 5, 5)
+    
+    notifications.append({
+        'id': 'neet_2024',
+        'title': f'NEET {current_year + 1} Exam',
+        'message': f'NEET exam in {{days_left}} days on {neet_exam_date.strftime("%B %d, %Y")}. Preparation time remaining!',
+        'date': '5 hours ago',
+        'category': 'exams',
+        'priority': 'high',
+        'read': False,
+        'deadline': neet_exam_date.strftime('%Y-%m-%d')
+    })
+    
+    # GATE data
+    gate_deadline = datetime.datetime(current_year, 10, 12)
+    notifications.append({
+        'id': 'gate_2024',
+        'title': f'GATE {current_year + 1} Application',
+        'message': 'GATE application deadline in {days_left} days. Last chance to apply!',
+        'date': '1 day ago',
+        'category': 'deadlines',
+        'priority': 'high',
+        'escalate': [[3, 'urgent']],
+        'read': False,
+        'deadline': gate_deadline.strftime('%Y-%m-%d')
+    })
+    
+    return notifications
+
+def get_live_course_data():
+    """Fetch live course data"""
+    notifications = []
+    
+    # Simulated live course data (in real implementation, this would fetch from APIs)
+    courses = [
+        {
+            'title': 'AI & Machine Learning Certification',
+            'provider': 'IIT Delhi',
+            'discount': '30% Early Bird',
+            'deadline': '2024-01-15',
+            'category': 'courses'
+        },
+        {
+            'title': 'Data Science Professional Certificate',
+            'provider': 'Google Career Certificates',
+            'discount': 'Financial Aid Available',
+            'deadline': '2024-02-01',
+            'category': 'courses'
+        },
+        {
+            'title': 'Full Stack Web Development',
+            'provider': 'Microsoft Learn',
+            'discount': 'Free for Students',
+            'deadline': '2024-01-30',
+            'category': 'courses'
+        }
+    ]
+    
+    for i, course in enumerate(courses):
+        notifications.append({
+            'id': f'course_{i}',
+            'title': f"New Course: {course['title']}",
+            'message': f"{course['provider']} - {course['discount']}. Enrollment closes in {{days_left}} days.",
+            'date': f'{i + 1} day ago',
+            'category': 'courses',
+            'priority': 'medium',
+            'escalate': [[7, 'high']],
+            'read': False,
+            'deadline': course['deadline']
+        })
+    
+    return notifications
+
+def get_scholarship_data():
+    """Fetch live scholarship and internship data"""
+    notifications = []
+    
+    # Current scholarships and opportunities
+    opportunities = [
+        {
+            'title': 'National Merit Scholarship',
+            'type': 'scholarship',
+            'deadline': '2024-01-20',
+            'amount': '₹50,000',
+            'eligibility': 'Engineering Students'
+        },
+        {
+            'title': 'Microsoft Summer Internship',
+            'type': 'internship',
+            'deadline': '2024-01-10',
+            'amount': '₹40,000/month',
+            'eligibility': 'CS/IT Students'
+        },
+        {
+            'title': 'Google Developer Scholarship',
+            'type': 'scholarship',
+            'deadline': '2024-02-15',
+            'amount': 'Full Course Fee',
+            'eligibility': 'All Streams'
+        }
+    ]
+    
+    for i, opp in enumerate(opportunities):
+        deadline = datetime.datetime.strptime(opp['deadline'], '%Y-%m-%d')
+        notifications.append({
+            'id': f'opportunity_{i}',
+            'title': f"{opp['title']} - {opp['amount']}",
+            'message': f"For {opp['eligibility']}. Apply before {deadline.strftime('%B %d, %Y')} - {{days_left}} days left!",
+            'date': f'{i + 2} days ago',
+            'category': 'deadlines',
+            'priority': 'high',
+            'escalate': [[5, 'urgent']],
+            'read': False,
+            'deadline': opp['deadline']
+        })
+    
+    return notifications
+
+def default_sources():
+    return [
+        FunctionSource('exams', get_live_exam_data),
+        FunctionSource('courses', get_live_course_data),
+        FunctionSource('scholarships', get_scholarship_data),
+    ] + load_sources(SOURCES_CONFIG)
+
+class NotificationEngine:
+    def __init__(self, db_path=DB_PATH, sources=None, refresh_interval=REFRESH_INTERVAL, sync_interval=SYNC_INTERVAL):
+        """Initialize the engine; ``start`` loads the shared snapshot and starts the scheduler thread."""
+        self.db_path = db_path
+        self.refresh_interval = refresh_interval
+        self.sync_interval = sync_interval
+        self.lease_ttl = max(3 * sync_interval, 30)
+        self.ingestor = NotificationIngestor(default_sources() if sources is None else sources)
+        self.events = NotificationEvents()
+        self.deadlines = DeadlineIndex()
+        self.cache = {
+            'last_updated': None,
+            'notifications': [],
+            # Bumped only when the list changes; views are rebuilt with it
+            'version': 0,
+            'views': build_views([])
+        }
+        self.owner = f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:6]}"
+        self._listeners = []
+        self._snapshot_version = 0  # shared snapshot version last applied to the cache
+        self._refresh_lock = threading.Lock()
+        # Guards the deadline index and the served cache: the scheduler thread and request threads both touch them
+        self._lock = threading.RLock()
+        # Set by request_refresh to wake the scheduler thread early
+        self._wake = threading.Event()
+        self._refresh_requested = False
+        self._thread = None
+        self._init_db()
+
+    def _connect(self):
+        return sqlite3.connect(self.db_path, timeout=10)
+
+    def _init_db(self):
+        os.makedirs(os.path.dirname(os.path.abspath(self.db_path)), exist_ok=True)
+        conn = self._connect()
+        c = conn.cursor()
+        # Several processes read while one writes
+        c.execute("PRAGMA journal_mode=WAL")
+        c.execute(
+            """
+            CREATE TABLE IF NOT EXISTS notification_snapshot (
+                id INTEGER PRIMARY KEY CHECK (id = 1),
+                version INTEGER NOT NULL,
+                last_updated TEXT,
+                refreshed_at REAL,
+                payload TEXT
+            )
+            """
+        )
+        c.execute(
+            """
+            CREATE TABLE IF NOT EXISTS notification_lease (
+                id INTEGER PRIMARY KEY CHECK (id = 1),
+                owner TEXT,
+                expires_at REAL
+            )
+            """
+        )
+        conn.commit()
+        conn.close()
+
+    def on_change(self, callback):
+        """Call ``callback(notifications)`` in this process whenever the list it serves changes."""
+        self._listeners.append(callback)
+
+    def _hold_lease(self):
+        """Take or renew the scheduler lease; True if this process runs the refreshes."""
+        now = time.time()
+        conn = self._connect()
+        c = conn.cursor()
+        c.execute("BEGIN IMMEDIATE")
+        c.execute("SELECT owner, expires_at FROM notification_lease WHERE id = 1")
+        row = c.fetchone()
+        held = row is None or row[0] == self.owner or row[1] < now
+        if held:
+            c.execute(
+                "INSERT OR REPLACE INTO notification_lease (id, owner, expires_at) VALUES (1, ?, ?)",
+                (self.owner, now + self.lease_ttl),
+            )
+        conn.commit()
+        conn.close()
+        return held
+
+    def _refresh_due(self):
+        conn = self._connect()
+        row = conn.execute("SELECT refreshed_at FROM notification_snapshot WHERE id = 1").fetchone()
+        conn.close()
+        return row is None or time.time() - (row[0] or 0) >= self.refresh_interval
+
+    def refresh(self):
+        """Fetch the sources now and store a new snapshot if the list changed; returns True if it did."""
+        with self._refresh_lock:
+            notifications, _ = self.ingestor.refresh()
+            payload = json.dumps(notifications, sort_keys=True)
+            conn = self._connect()
+            c = conn.cursor()
+            c.execute("BEGIN IMMEDIATE")
+            c.execute("SELECT version, payload FROM notification_snapshot WHERE id = 1")
+            row = c.fetchone()
+            # Another process may have stored the same list; only a real change bumps the version
+            changed = row is None or row[1] != payload
+            if changed:
+                c.execute(
+                    "INSERT OR REPLACE INTO notification_snapshot (id, version, last_updated, refreshed_at, payload) "
+                    "VALUES (1, ?, ?, ?, ?)",
+                    ((row[0] if row else 0) + 1, datetime.datetime.now().isoformat(), time.time(), payload),
+                )
+            else:
+                c.execute("UPDATE notification_snapshot SET refreshed_at = ? WHERE id = 1", (time.time(),))
+            conn.commit()
+            conn.close()
+            print(f"Refreshed {len(notifications)} notifications ({'changed' if changed else 'unchanged'})")
+            return changed
+
+    def sync(self):
+        """Load the shared snapshot into this process if its version moved; returns True if it did."""
+        with self._lock:
+            conn = self._connect()
+            row = conn.execute("SELECT version FROM notification_snapshot WHERE id = 1").fetchone()
+            if row is None or row[0] == self._snapshot_version:
+                conn.close()
+                return False
+            version, last_updated, payload = conn.execute(
+                "SELECT version, last_updated, payload FROM notification_snapshot WHERE id = 1"
+            ).fetchone()
+            conn.close()
+            if self.deadlines.load(json.loads(payload)):
+                self._apply(self.deadlines.notifications(), last_updated)
+            self._snapshot_version = version
+            return True
+
+    def _apply(self, notifications, last_updated):
+        """Serve a new list; called with self._lock held."""
+        self.cache['views'] = build_views(notifications)
+        self.cache['notifications'] = notifications
+        self.cache['last_updated'] = last_updated
+        changed = self.events.publish(notifications, last_updated) is not None
+        self.cache['version'] = self.events.last_event_id
+        if changed:
+            for callback in self._listeners:
+                try:
+                    callback(notifications)
+                except Exception as e:
+                    print(f"Notification change listener failed: {e}")
+
+    def tick(self, force_refresh=False):
+        """One scheduler step: refresh if forced, or if this process holds the lease and a refresh is due; sync, then re-render due deadlines."""
+        if force_refresh or (self._hold_lease() and self._refresh_due()):
+            self.refresh()
+        self.sync()
+        with self._lock:
+            if self.deadlines.advance():
+                self._apply(self.deadlines.notifications(), datetime.datetime.now().isoformat())
+
+    def request_refresh(self):
+        """Ask for an immediate refresh; the scheduler thread does it, so request threads never touch the index."""
+        if self._thread is None:
+            # No scheduler in this process (e.g. not started yet): do it here, under the locks
+            self.tick(force_refresh=True)
+            return
+        self._refresh_requested = True
+        self._wake.set()
+
+    def _next_wait(self):
+        # Sleep until the next deadline transition if it comes before the next sync
+        wait = self.sync_interval
+        with self._lock:
+            next_change = self.deadlines.next_change()
+        if next_change is not None:
+            wait = min(wait, max(next_change - time.time(), 0))
+        return wait
+
+    def _run(self):
+        while True:
+            self._wake.wait(self._next_wait())
+            self._wake.clear()
+            force_refresh, self._refresh_requested = self._refresh_requested, False
+            try:
+                self.tick(force_refresh)
+            except Exception as e:
+                print(f"Error updating notifications: {e}")
+
+    def start(self):
+        """Load the current snapshot (refreshing first if there is none) and start the scheduler thread."""
+        if self._thread is not None:
+            return
+        try:
+            self.tick()
+        except Exception as e:
+            print(f"Error updating notifications: {e}")
+        self._thread = threading.Thread(target=self._run, name="notification-engine", daemon=True)
+        self._thread.start()
+
+    def stats(self):
+        with self._lock:
+            next_change = self.deadlines.next_change()
+        return {
+            'version': self._snapshot_version,
+            'next_change': next_change,
+            'last_updated': self.cache['last_updated'],
+            'sources': self.ingestor.stats(),
+        }
@@ -0,0 +1,144 @@
+"""
+Server-Sent Events channel for live notifications.
+Each refresh of the notification list is diffed against the previous one and,
+if anything changed, published as a numbered delta event. Clients keep an
+EventSource open instead of polling; on reconnect the browser sends
+Last-Event-ID and only the missed deltas are replayed (or a fresh snapshot if
+they are no longer buffered, or the id is from before a restart). The same change counter versions the
+precomputed views, so polling endpoints can answer with ETag/304.
+"""
+
+import json
+import threading
+import uuid
+from collections import deque
+
+# Distinguishes versions across restarts, where the counter starts over
+_BOOT_ID = uuid.uuid4().hex[:8]
+
+def build_views(notifications):
+    """Precompute the filtered lists and stats the endpoints serve.
+
+    ``by_category`` has 'all', 'urgent' and one list per category;
+    ``by_priority`` has one list per priority.
+    """
+    by_category = {'all': list(notifications), 'urgent': []}
+    by_priority = {}
+    for n in notifications:
+        by_category.setdefault(n['category'], []).append(n)
+        by_priority.setdefault(n['priority'], []).append(n)
+    by_category['urgent'] = by_priority.get('urgent', [])
+    stats = {
+        'total': len(notifications),
+        'urgent': len(by_category['urgent']),
+        'unread': len([n for n in notifications if not n.get('read')]),
+        'categories': {
+            category: len(by_category.get(category, []))
+            for category in ('exams', 'courses', 'deadlines')
+        },
+    }
+    return {'by_category': by_category, 'by_priority': by_priority, 'stats': stats}
+
+def etag_for(version, *parts):
+    """Strong ETag for a view of snapshot ``version``."""
+    return '-'.join([_BOOT_ID, str(version)] + [str(p) for p in parts if p])
+
+class NotificationEvents:
+    def __init__(self, history: int = 256, heartbeat: float = 15.0):
+        """Initialize the channel; keeps the last ``history`` deltas for resume."""
+        self.heartbeat = heartbeat
+        self._events = deque(maxlen=history)  # (event_id, payload)
+        self._current = {}  # notification id -> notification, in list order
+        self._last_updated = None
+        self._last_id = 0
+        self._cond = threading.Condition()
+
+    @property
+    def last_event_id(self) -> int:
+        return self._last_id
+
+    def publish(self, notifications, last_updated=None):
+        """Diff ``notifications`` against the previous list; returns the new event id or None if unchanged."""
+        new = {n['id']: n for n in notifications}
+        with self._cond:
+            added = [n for nid, n in new.items() if nid not in self._current]
+            updated = [n for nid, n in new.items() if nid in self._current and self._current[nid] != n]
+            removed = [nid for nid in self._current if nid not in new]
+            reordered = not (added or updated or removed) and list(new) != list(self._current)
+            self._current = new
+            self._last_updated = last_updated
+            if not (added or updated or removed or reordered):
+                return None
+            self._last_id += 1
+            payload = {
+                'added': added,
+                'updated': updated,
+                'removed': removed,
+                'order': list(new),
+                'last_updated': last_updated,
+            }
+            self._events.append((self._last_id, payload))
+            self._cond.notify_all()
+            return self._last_id
+
+    def _snapshot(self):
+        return {
+            'notifications': list(self._current.values()),
+            'last_updated': self._last_updated,
+        }
+
+    @staticmethod
+    def _format(event_id, event, payload):
+        # Scoped to this boot: after a restart the counter starts over
+        return f"id: {_BOOT_ID}-{event_id}\nevent: {event}\ndata: {json.dumps(payload)}\n\n"
+
+    @staticmethod
+    def _parse_event_id(last_event_id):
+        """Counter from a Last-Event-ID sent by this boot, else None (the client needs a snapshot)."""
+        boot_id, _, counter = (last_event_id or '').partition('-')
+        if boot_id != _BOOT_ID or not counter.isdigit():
+            return None
+        return int(counter)
+
+    def _events_after(self, event_id):
+        """Buffered events newer than ``event_id``, or None if some were already dropped."""
+        if event_id == self._last_id:
+            return []
+        if not self._events or event_id < self._events[0][0] - 1 or event_id > self._last_id:
+            return None
+        return [(eid, payload) for eid, payload in self._events if eid > event_id]
+
+    def stream(self, last_event_id=None):
+        """Generator of SSE text: a snapshot or missed deltas first, then live deltas and heartbeats."""
+        resume_from = self._parse_event_id(last_event_id)
+        with self._cond:
+            missed = self._events_after(resume_from) if resume_from is not None else None
+            if missed is None:
+                cursor = self._last_id
+                first = [self._format(cursor, 'snapshot', self._snapshot())]
+            else:
+                cursor = missed[-1][0] if missed else resume_from
+                first = [self._format(eid, 'delta', payload) for eid, payload in missed]
+        # Tell the browser how long to wait before reconnecting
+        yield "retry: 5000\n\n"
+        for chunk in first:
+            yield chunk
+
+        while True:
+            with self._cond:
+                if self._last_id == cursor:
+                    self._cond.wait(self.heartbeat)
+                pending = self._events_after(cursor)
+                if pending is None:
+                    # Fell behind the buffer: resynchronise with a snapshot
+                    cursor = self._last_id
+                    chunks = [self._format(cursor, 'snapshot', self._snapshot())]
+                else:
+                    chunks = [self._format(eid, 'delta', payload) for eid, payload in pending]
+                    if pending:
+                        cursor = pending[-1][0]
+            if chunks:
+                for chunk in chunks:
+                    yield chunk
+            else:
+                yield ": keep-alive\n\n"
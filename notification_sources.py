@@ -0,0 +1,268 @@
+"""
+Pluggable notification sources.
+Each source (a built-in generator, a local JSON file, a JSON HTTP endpoint or an
+RSS/Atom feed) is fetched concurrently with its own timeout. File and HTTP
+sources skip unchanged data (mtime, ETag / Last-Modified), and results are
+merged into the list incrementally by id. A source that fails or times out
+keeps contributing its last good data.
+"""
+
+import json
+import os
+import re
+import sys
+import threading
+import time
+import xml.etree.ElementTree as ET
+from abc import ABC, abstractmethod
+from bisect import bisect_left, insort
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FuturesTimeout
+
+# The shared HTTP session pool lives with the main app in login/
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), "login"))
+import http_client
+
+PRIORITY_ORDER = {'urgent': 0, 'high': 1, 'medium': 2, 'low': 3}
+
+_TAG_RE = re.compile(r"<[^>]+>")
+_SAFE_LINK_RE = re.compile(r"^https?://", re.IGNORECASE)
+_ATOM = "{http://www.w3.org/2005/Atom}"
+
+def sort_key(notification):
+    """Position in the merged list: priority first, then id."""
+    return (PRIORITY_ORDER.get(notification['priority'], 3), notification['id'])
+
+class NotificationSource(ABC):
+    """Base class; ``fetch`` returns a list of notifications, or None if unchanged since the last fetch."""
+
+    def __init__(self, name, timeout=10.0, category='deadlines', priority='medium'):
+        self.name = name
+        self.timeout = timeout
+        self.defaults = {'category': category, 'priority': priority, 'date': 'Recently', 'read': False}
+
+    @abstractmethod
+    def fetch(self):
+        """Return the source's full list of notifications, or None if unchanged."""
+
+    def normalize(self, items):
+        """Fill in missing fields from the source defaults; items without id or title are dropped.
+
+        Links other than http(s) (e.g. ``javascript:``) are removed; pages still
+        escape the text fields when rendering them.
+        """
+        notifications = []
+        for item in items:
+            if not isinstance(item, dict) or not item.get('id') or not item.get('title'):
+                continue
+            notification = dict(self.defaults, message='')
+            notification.update(item)
+            if 'link' in notification and not _SAFE_LINK_RE.match(str(notification['link'] or '')):
+                del notification['link']
+            notifications.append(notification)
+        return notifications
+
+class FunctionSource(NotificationSource):
+    """Wraps a function that returns the full list of notifications (the built-in generators)."""
+
+    def __init__(self, name, fn, timeout=10.0):
+        super().__init__(name, timeout)
+        self.fn = fn
+
+    def fetch(self):
+        return self.normalize(self.fn())
+
+class FileSource(NotificationSource):
+    """A local JSON file holding a list (or {"notifications": [...]}); re-read only when it changes."""
+
+    def __init__(self, name, path, timeout=5.0, **defaults):
+        super().__init__(name, timeout, **defaults)
+        self.path = path
+        self._stamp = None
+
+    def fetch(self):
+        stat = os.stat(self.path)
+        stamp = (stat.st_mtime_ns, stat.st_size)
+        if stamp == self._stamp:
+            return None
+        with open(self.path, encoding='utf-8') as f:
+            data = json.load(f)
+        self._stamp = stamp
+        return self.normalize(data.get('notifications', []) if isinstance(data, dict) else data)
+
+class HttpSource(NotificationSource):
+    """A JSON endpoint polled with conditional GETs; a 304 means unchanged."""
+
+    def __init__(self, name, url, timeout=10.0, headers=None, **defaults):
+        super().__init__(name, timeout, **defaults)
+        self.url = url
+        self.headers = headers or {}
+        self._validators = {}
+
+    def fetch(self):
+        headers = dict(self.headers)
+        if 'etag' in self._validators:
+            headers['If-None-Match'] = self._validators['etag']
+        if 'last_modified' in self._validators:
+            headers['If-Modified-Since'] = self._validators['last_modified']
+        response = http_client.get(self.url, headers=headers, timeout=self.timeout)
+        if response.status_code == 304:
+            return None
+        response.raise_for_status()
+        notifications = self.parse(response)
+        # Only remember validators once the body parsed, so a bad reply is fetched again
+        self._validators = {
+            key: response.headers[header]
+            for key, header in (('etag', 'ETag'), ('last_modified', 'Last-Modified'))
+            if header in response.headers
+        }
+        return notifications
+
+    def parse(self, response):
+        data = response.json()
+        return self.normalize(data.get('notifications', []) if isinstance(data, dict) else data)
+
+class FeedSource(HttpSource):
+    """An RSS 2.0 or Atom feed; each item becomes a notification with the source's category and priority."""
+
+    def parse(self, response):
+        root = ET.fromstring(response.content)
+        items = []
+        for item in root.iter('item'):
+            items.append(self._item(
+                item.findtext('guid') or item.findtext('link'), item.findtext('title'),
+                item.findtext('description'), item.findtext('link'), item.findtext('pubDate'),
+            ))
+        for entry in root.iter(_ATOM + 'entry'):
+            link = entry.find(_ATOM + 'link')
+            items.append(self._item(
+                entry.findtext(_ATOM + 'id'), entry.findtext(_ATOM + 'title'),
+                entry.findtext(_ATOM + 'summary') or entry.findtext(_ATOM + 'content'),
+                link.get('href') if link is not None else None, entry.findtext(_ATOM + 'updated'),
+            ))
+        return self.normalize(items)
+
+    def _item(self, guid, title, description, link, published):
+        message = " ".join(_TAG_RE.sub(" ", description or "").split())
+        item = {
+            'id': f"{self.name}:{guid or title}",
+            'title': " ".join(_TAG_RE.sub(" ", title or "").split()),
+            'message': message[:300],
+            'date': (published or "").strip() or 'Recently',
+        }
+        if link:
+            item['link'] = link.strip()
+        return item
+
+SOURCE_TYPES = {'file': FileSource, 'http': HttpSource, 'feed': FeedSource}
+
+def load_sources(config_path):
+    """Build sources from a JSON list of {"type", "name", "path"|"url", ...}; missing file means none."""
+    if not config_path or not os.path.isfile(config_path):
+        return []
+    with open(config_path, encoding='utf-8') as f:
+        config = json.load(f)
+    base_dir = os.path.dirname(os.path.abspath(config_path))
+    sources = []
+    for entry in config:
+        entry = dict(entry)
+        source_type = SOURCE_TYPES.get(entry.pop('type', None))
+        if source_type is None:
+            print(f"Skipping notification source with unknown type: {entry}")
+            continue
+        if 'path' in entry:
+            entry['path'] = os.path.join(base_dir, entry['path'])
+        sources.append(source_type(**entry))
+    return sources
+
+class NotificationIngestor:
+    def __init__(self, sources=(), max_workers=8):
+        """Initialize the ingestor; ``refresh`` fetches every source concurrently."""
+        self._sources = {}
+        self._by_source = {}  # source name -> {id: notification}, the last good data
+        self._merged = {}     # id -> notification
+        self._keys = {}       # id -> sort key
+        self._order = []      # sort keys, kept sorted
+        self._inflight = {}   # source name -> fetch that overran its timeout
+        self._status = {}
+        self._lock = threading.Lock()
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="notification-source")
+        for source in sources:
+            self.add(source)
+
+    def add(self, source):
+        self._sources[source.name] = source
+
+    def _remove(self, nid):
+        key = self._keys.pop(nid)
+        del self._order[bisect_left(self._order, key)]
+        del self._merged[nid]
+
+    def _merge(self, name, notifications):
+        """Apply one source's new list by id; returns True if the merged list changed."""
+        new = {n['id']: n for n in notifications}
+        old = self._by_source.get(name, {})
+        changed = False
+        for nid in old.keys() - new.keys():
+            # Ids are expected to be unique across sources; never drop another source's entry
+            if self._merged.get(nid) is old[nid]:
+                self._remove(nid)
+                changed = True
+        for nid, notification in new.items():
+            if old.get(nid) == notification:
+                continue
+            if nid in self._merged:
+                self._remove(nid)
+            key = sort_key(notification)
+            insort(self._order, key)
+            self._keys[nid] = key
+            self._merged[nid] = notification
+            changed = True
+        self._by_source[name] = new
+        return changed
+
+    def refresh(self):
+        """Fetch all sources concurrently and merge; returns (notifications, changed)."""
+        started = time.monotonic()
+        futures = {}
+        for name, source in self._sources.items():
+            inflight = self._inflight.get(name)
+            if inflight is not None:
+                # Never run two fetches of one source at once: they share its ETag/mtime state
+                if not inflight.done():
+                    self._status[name] = {'ok': False, 'error': 'previous fetch still running', 'at': time.time()}
+                    continue
+                # The late fetch already consumed the change (its stamp/validators are stored),
+                # so merge its result rather than fetching again and getting "unchanged"
+                del self._inflight[name]
+                futures[name] = inflight
+                continue
+            futures[name] = self._executor.submit(source.fetch)
+
+        changed = False
+        for name, future in futures.items():
+            source = self._sources[name]
+            try:
+                notifications = future.result(timeout=max(source.timeout - (time.monotonic() - started), 0))
+            except FuturesTimeout:
+                self._inflight[name] = future
+                self._status[name] = {'ok': False, 'error': f'timed out after {source.timeout:.0f}s', 'at': time.time()}
+                continue
+            except Exception as e:
+                print(f"Notification source {name} failed: {e}")
+                self._status[name] = {'ok': False, 'error': str(e), 'at': time.time()}
+                continue
+            self._status[name] = {'ok': True, 'unchanged': notifications is None, 'at': time.time()}
+            if notifications is not None:
+                with self._lock:
+                    changed = self._merge(name, notifications) or changed
+        return self.notifications(), changed
+
+    def notifications(self):
+        with self._lock:
+            return [self._merged[nid] for _, nid in self._order]
+
+    def stats(self):
+        return {
+            name: dict(self._status.get(name, {}), count=len(self._by_source.get(name, {})))
+            for name in self._sources
+        }
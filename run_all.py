@@ -11,13 +11,15 @@ import socket
 
 BASE_DIR = os.path.dirname(os.path.abspath(__file__))
 
+# Services start concurrently; add "depends_on": ["<name>", ...] to start one only
+# after the named services are healthy
 SERVICES = [
     {
         "name": "Main App",
         "path": os.path.join(BASE_DIR, "login", "app.py"),
         "port": 5000,
         "url": "http://127.0.0.1:5000",
-        "health_endpoint": "/"
+        "health_endpoint": "/healthz"
     },
     # {
     #     "name": "Aptitude Service", 
@@ -32,7 +34,7 @@ SERVICES = [
         "path": os.path.join(BASE_DIR, "nearby_government_colleges_directory_2", "start_college_app.py"),
         "port": 5002,
         "url": "http://127.0.0.1:5002",
-        "health_endpoint": "/"
+        "health_endpoint": "/healthz"
     }
 ]
 
@@ -60,7 +62,7 @@ def is_port_in_use(port, host="127.0.0.1"):
         s.settimeout(0.5)
         return s.connect_ex((host, port)) == 0
 
-def check_service_health(service, timeout=10):
+def check_service_health(service, session, timeout=10):
     """Check if a service is responding to HTTP requests"""
     try:
         # For aptitude service, try multiple ports
@@ -68,7 +70,7 @@ def check_service_health(service, timeout=10):
             for port in range(5001, 5010):
                 try:
                     health_url = f"http://127.0.0.1:{port}{service['health_endpoint']}"
-                    response = requests.get(health_url, timeout=2)
+                    response = session.get(health_url, timeout=2)
                     if response.status_code == 200:
                         # Update service URL with the working port
                         service["url"] = f"http://127.0.0.1:{port}"
@@ -79,88 +81,122 @@ def check_service_health(service, timeout=10):
             return False
         else:
             health_url = service["url"] + service["health_endpoint"]
-            response = requests.get(health_url, timeout=timeout)
+            response = session.get(health_url, timeout=timeout)
             return response.status_code == 200
     except:
         return False
 
-def wait_for_service_startup(service, max_wait=180):
-    """Wait for a service to become healthy"""
+def wait_for_service_startup(service, process=None, max_wait=180):
+    """Wait for a service to become healthy, polling with exponential backoff"""
     print(f"   Waiting for {service['name']} to become ready...")
-    start_time = time.time()
+    deadline = time.monotonic() + max_wait
+    delay = 0.1
     
-    # For Flask services, give them more time to start
-    if service['name'] == 'Aptitude Service':
-        time.sleep(3)  # Initial wait for Flask to start
-    
-    while time.time() - start_time < max_wait:
-        if check_service_health(service, timeout=2):
-            return True
-        time.sleep(1)
+    # One keep-alive session per service, reused for every probe
+    with requests.Session() as session:
+        while time.monotonic() < deadline:
+            if check_service_health(service, session, timeout=2):
+                return True
+            # No point waiting out the timeout if the process already died
+            if process is not None and process.poll() is not None:
+                return False
+            time.sleep(min(delay, max(deadline - time.monotonic(), 0)))
+            delay = min(delay * 2, 2.0)
     
     return False
 
-def start_services():
-    """Start all EduPath services"""
-    processes = []
+def launch_service(service):
+    """Start one service process; returns the Popen, or None if it was not started"""
+    print(f"Starting {service['name']}...")
     
-    print("🚀 Starting EduPath Services...")
-    print("=" * 50)
+    # Get the directory of the service file for proper working directory
+    service_dir = os.path.dirname(service["path"])
     
-    # Check dependencies first
-    if not check_dependencies():
-        print("\n❌ Cannot start services due to missing files.")
-        return []
+    # Prepare environment variables
+    env = os.environ.copy()
+    # Flag to let child apps know they are launched by the unified launcher
+    env["EDUPATH_LAUNCHER"] = "1"
+    if "env" in service:
+        env.update(service["env"])
     
-    # Start each service
-    for service in SERVICES:
-        try:
-            print(f"Starting {service['name']}...")
-            
-            # Get the directory of the service file for proper working directory
-            service_dir = os.path.dirname(service["path"])
-            
-            # Prepare environment variables
-            env = os.environ.copy()
-            # Flag to let child apps know they are launched by the unified launcher
-            env["EDUPATH_LAUNCHER"] = "1"
-            if "env" in service:
-                env.update(service["env"])
-            
-            # Special handling for Flask apps
-            if service["name"] == "Aptitude Service":
-                # Set Flask to run the API server part only
-                env["PYTHONPATH"] = service_dir
-                env["FLASK_APP"] = "ap1_flask.py"
-                env["FLASK_RUN_HOST"] = "127.0.0.1"
-                # Let the Flask app find its own available port
-                
-            # Check port availability before starting
-            if is_port_in_use(service["port"]):
-                print(f"⚠️  Port {service['port']} is already in use. Skipping start for {service['name']}.")
-                continue
+    # Special handling for Flask apps
+    if service["name"] == "Aptitude Service":
+        # Set Flask to run the API server part only
+        env["PYTHONPATH"] = service_dir
+        env["FLASK_APP"] = "ap1_flask.py"
+        env["FLASK_RUN_HOST"] = "127.0.0.1"
+        # Let the Flask app find its own available port
+        
+    # Check port availability before starting
+    if is_port_in_use(service["port"]):
+        print(f"⚠️  Port {service['port']} is already in use. Skipping start for {service['name']}.")
+        return None
 
-            # Start the process without capturing output to allow it to run freely
-            process = subprocess.Popen(
-                [sys.executable, service["path"]], 
-                cwd=service_dir,
-                env=env,
-                creationflags=subprocess.CREATE_NEW_CONSOLE if os.name == 'nt' else 0
-            )
-            
+    # Start the process without capturing output to allow it to run freely
+    return subprocess.Popen(
+        [sys.executable, service["path"]], 
+        cwd=service_dir,
+        env=env,
+        creationflags=subprocess.CREATE_NEW_CONSOLE if os.name == 'nt' else 0
+    )
+
+def start_service(service, ready, processes, lock):
+    """Start a service once its declared dependencies are ready, then wait for it to become healthy"""
+    try:
+        for dependency in service.get("depends_on", []):
+            if dependency not in ready:
+                print(f"⚠️  {service['name']} depends on unknown service {dependency}; ignoring")
+                continue
+            ready[dependency].wait()
+        
+        process = launch_service(service)
+        if process is None:
+            return
+        with lock:
             processes.append({
                 "process": process,
                 "service": service
             })
+        
+        # Wait for service to become healthy
+        if wait_for_service_startup(service, process):
+            print(f"✅ {service['name']} is running and healthy")
+        else:
+            print(f"⚠️  {service['name']} started but may not be fully ready")
             
-            # Wait for service to become healthy
-            if wait_for_service_startup(service):
-                print(f"✅ {service['name']} is running and healthy")
-            else:
-                print(f"⚠️  {service['name']} started but may not be fully ready")
-                
-        except Exception as e:
-            print(f"❌ Error starting {service['name']}: {str(e)}")
+    except Exception as e:
+        print(f"❌ Error starting {service['name']}: {str(e)}")
+    finally:
+        # Dependents start even if this one failed, as they did when startup was sequential
+        ready[service["name"]].set()
+
+def start_services(processes=None):
+    """Start all EduPath services concurrently; a service only waits for the ones in its depends_on"""
+    processes = [] if processes is None else processes
+    
+    print("🚀 Starting EduPath Services...")
+    print("=" * 50)
+    
+    # Check dependencies first
+    if not check_dependencies():
+        print("\n❌ Cannot start services due to missing files.")
+        return processes
+    
+    ready = {service["name"]: threading.Event() for service in SERVICES}
+    lock = threading.Lock()
+    threads = [
+        threading.Thread(target=start_service, args=(service, ready, processes, lock), daemon=True)
+        for service in SERVICES
+    ]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        # Joined with a timeout so Ctrl+C still reaches the main thread
+        while thread.is_alive():
+            thread.join(0.5)
+    
+    # Report in declaration order rather than the order services happened to start
+    processes.sort(key=lambda proc_info: SERVICES.index(proc_info["service"]))
     
     if processes:
         print("\n🌐 Services running at:")
@@ -186,7 +222,8 @@ def main():
     processes = []
     
     try:
-        processes = start_services()
+        # Filled in as services start, so Ctrl+C during startup still stops them
+        start_services(processes)
         
         if not processes:
             print("❌ No services could be started.")